@@ -13,6 +13,8 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 
+from k8s_ml_predictive_autoscaling.preprocessor import load_split
+
 sns.set_theme(style="darkgrid")
 
 
@@ -25,9 +27,9 @@ def load_model(model_path: Path):
 
 
 def load_test_data(data_path: Path, target_col: str) -> pd.DataFrame:
-    """Load test data."""
+    """Load the timestamp and target of the test split."""
     print(f"Loading test data from {data_path}...")
-    df = pd.read_csv(data_path, parse_dates=["timestamp"])
+    df = load_split(data_path, "test", columns=[target_col])
     print(f"Loaded {len(df):,} samples")
 
     # Remove timezone for Prophet compatibility
@@ -159,8 +161,8 @@ def main():
     parser.add_argument(
         "--test-data",
         type=Path,
-        default=Path("data/processed/test.csv"),
-        help="Path to test data",
+        default=Path("data/processed"),
+        help="Preprocessing output directory or test split file",
     )
     parser.add_argument(
         "--target",
@@ -11,11 +11,13 @@ import joblib
 import pandas as pd
 from prophet import Prophet
 
+from k8s_ml_predictive_autoscaling.preprocessor import load_split
 
-def load_data(data_path: Path) -> pd.DataFrame:
-    """Load preprocessed training data."""
+
+def load_data(data_path: Path, target_col: str = "request_rate") -> pd.DataFrame:
+    """Load the timestamp and target of the preprocessed training split."""
     print(f"Loading data from {data_path}...")
-    df = pd.read_csv(data_path, parse_dates=["timestamp"])
+    df = load_split(data_path, "train", columns=[target_col])
     print(f"Loaded {len(df):,} samples")
     print(f"Date range: {df['timestamp'].min()} to {df['timestamp'].max()}")
     return df
@@ -79,7 +81,7 @@ def evaluate_on_validation(
     print("VALIDATION EVALUATION")
     print("=" * 70)
 
-    val_df = pd.read_csv(val_path, parse_dates=["timestamp"])
+    val_df = load_split(val_path, "validation", columns=[target_col])
     prophet_val = prepare_prophet_data(val_df, target_col)
 
     # Predict
@@ -113,14 +115,14 @@ def main():
     parser.add_argument(
         "--train-data",
         type=Path,
-        default=Path("data/processed/train.csv"),
-        help="Path to training data",
+        default=Path("data/processed"),
+        help="Preprocessing output directory or training split file",
     )
     parser.add_argument(
         "--val-data",
         type=Path,
-        default=Path("data/processed/validation.csv"),
-        help="Path to validation data",
+        default=Path("data/processed"),
+        help="Preprocessing output directory or validation split file",
     )
     parser.add_argument(
         "--target",
@@ -159,7 +161,7 @@ def main():
     print("=" * 70)
 
     # Load data
-    train_df = load_data(args.train_data)
+    train_df = load_data(args.train_data, args.target)
     prophet_train = prepare_prophet_data(train_df, args.target)
 
     # Train model
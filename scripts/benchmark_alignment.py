@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Benchmark aligning raw samples onto the resample grid.
+
+Compares the pandas chain (`pivot_table` -> `resample().mean()` ->
+`interpolate` -> `ffill` -> `bfill`) with the single-pass epoch-grid engine on
+a month of 30s Prometheus-style samples with jitter and scrape gaps, and
+checks that both produce the same grid.
+
+Usage:
+    poetry run python scripts/benchmark_alignment.py --days 30 --metrics 3
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from k8s_ml_predictive_autoscaling.preprocessor.alignment import align_samples, fill_gaps
+
+
+def build_samples(days: int, metrics: int, step: str) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    stamps = pd.date_range("2024-01-01", periods=days * 86_400 // 30, freq=step, tz="UTC")
+    frames = []
+    for i in range(metrics):
+        jitter = pd.to_timedelta(rng.integers(0, 2_000, len(stamps)), unit="ms")
+        kept = rng.random(len(stamps)) > 0.01
+        frames.append(
+            pd.DataFrame(
+                {
+                    "timestamp": (stamps + jitter)[kept],
+                    "metric": f"metric_{i}",
+                    "value": rng.normal(100, 10, int(kept.sum())),
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def pandas_grid(samples: pd.DataFrame, rule: str) -> pd.DataFrame:
+    ordered = samples.sort_values(by="timestamp", kind="stable")
+    pivot = ordered.pivot_table(index="timestamp", columns="metric", values="value")
+    resampled = pivot.sort_index().resample(rule).mean()
+    return resampled.interpolate(method="time").ffill().bfill()
+
+
+def epoch_grid(samples: pd.DataFrame, rule: str) -> pd.DataFrame:
+    grid = align_samples(
+        samples,
+        rule=rule,
+        timestamp_column="timestamp",
+        metric_column="metric",
+        value_column="value",
+    )
+    assert grid is not None
+    return fill_gaps(grid, method="time")
+
+
+def timed(func, repeat: int) -> tuple[float, pd.DataFrame]:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--metrics", type=int, default=3)
+    parser.add_argument("--rule", default="1min")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    samples = build_samples(args.days, args.metrics, "30s")
+    print(f"{len(samples):,} samples, {args.metrics} metrics, rule {args.rule}")
+    print("=" * 64)
+    reference, expected = timed(lambda: pandas_grid(samples, args.rule), args.repeat)
+    print(f"{'pivot_table + resample + fill':<34} {reference * 1000:10.1f} ms")
+    elapsed, result = timed(lambda: epoch_grid(samples, args.rule), args.repeat)
+    print(f"{'epoch grid + fill_gaps':<34} {elapsed * 1000:10.1f} ms  ({reference / elapsed:.1f}x)")
+    pd.testing.assert_frame_equal(result, expected, check_exact=True)
+    print("Grids are identical.")
+
+
+if __name__ == "__main__":
+    main()
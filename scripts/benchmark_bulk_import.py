@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Benchmark bulk import decoding against the query_range JSON path.
+
+Builds the same synthetic history in three wire formats and measures how fast
+the collector turns each one into NumPy sample columns:
+
+* query_range JSON (`parse` + `decode_values`), paged by `--points-per-page`
+  as the collector must do to stay under the 11k points/series limit;
+* remote read (snappy + protobuf), one response for the whole window;
+* OpenMetrics dump lines as produced by `promtool tsdb dump-openmetrics`.
+
+Server-side cost is not included; query_range additionally pays PromQL
+evaluation and one round trip per page.
+
+Usage:
+    poetry run python scripts/benchmark_bulk_import.py --series 20 --points 40000
+"""
+import argparse
+import json
+import struct
+import time
+
+import httpx
+
+from k8s_ml_predictive_autoscaling.collector.bulk_import import iter_exposition_series
+from k8s_ml_predictive_autoscaling.collector.prometheus_client import (
+    decode_values,
+    parse_query_range_response,
+)
+from k8s_ml_predictive_autoscaling.collector.remote_read import (
+    decode_read_response,
+    snappy_compress,
+    snappy_decompress,
+)
+
+START_MS = 1_700_000_000_000
+STEP_MS = 15_000
+
+
+def value_at(series: int, index: int) -> float:
+    return round((index * 7 + series) % 100 / 10, 3)
+
+
+def build_query_range_pages(series: int, points: int, page: int) -> list[httpx.Response]:
+    pages = []
+    for offset in range(0, points, page):
+        result = [
+            {
+                "metric": {"__name__": "demo_requests", "pod": f"demo-{s}"},
+                "values": [
+                    [(START_MS + STEP_MS * i) / 1000, str(value_at(s, i))]
+                    for i in range(offset, min(offset + page, points))
+                ],
+            }
+            for s in range(series)
+        ]
+        body = json.dumps({"status": "success", "data": {"resultType": "matrix", "result": result}})
+        pages.append(httpx.Response(200, content=body.encode()))
+    return pages
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _message(field: int, payload: bytes) -> bytes:
+    return _varint(field << 3 | 2) + _varint(len(payload)) + payload
+
+
+def build_remote_read(series: int, points: int) -> bytes:
+    timeseries = b""
+    for s in range(series):
+        labels = {"__name__": "demo_requests", "pod": f"demo-{s}"}
+        body = b"".join(
+            _message(1, _message(1, name.encode()) + _message(2, value.encode()))
+            for name, value in labels.items()
+        )
+        body += b"".join(
+            _message(
+                2,
+                b"\x09"
+                + struct.pack("<d", value_at(s, i))
+                + b"\x10"
+                + _varint(START_MS + STEP_MS * i),
+            )
+            for i in range(points)
+        )
+        timeseries += _message(1, body)
+    return snappy_compress(_message(1, timeseries))
+
+
+def build_openmetrics(series: int, points: int) -> list[str]:
+    lines = ["# TYPE demo_requests gauge"]
+    for s in range(series):
+        lines.extend(
+            f'demo_requests{{pod="demo-{s}"}} {value_at(s, i)} '
+            f"{(START_MS + STEP_MS * i) / 1000:.3f}"
+            for i in range(points)
+        )
+    lines.append("# EOF")
+    return lines
+
+
+def decode_query_range(pages: list[httpx.Response]) -> int:
+    total = 0
+    for page in pages:
+        for series in parse_query_range_response(page):
+            timestamps, values = decode_values(series["values"])
+            total += len(values)
+    return total
+
+
+def decode_remote_read(payload: bytes) -> int:
+    return sum(len(series.values) for series in decode_read_response(snappy_decompress(payload))[0])
+
+
+def decode_openmetrics(lines: list[str]) -> int:
+    return sum(len(series.values) for series in iter_exposition_series(lines))
+
+
+def measure(label: str, func, samples: int, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        decoded = func()
+        best = min(best, time.perf_counter() - started)
+    assert decoded == samples, (label, decoded, samples)
+    print(f"{label:<24} {best * 1000:9.1f} ms  {samples / best / 1e6:6.2f} M samples/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--series", type=int, default=20)
+    parser.add_argument("--points", type=int, default=40_000)
+    parser.add_argument("--points-per-page", type=int, default=11_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    samples = args.series * args.points
+    pages = build_query_range_pages(args.series, args.points, args.points_per_page)
+    remote = build_remote_read(args.series, args.points)
+    dump = build_openmetrics(args.series, args.points)
+    print(f"{samples:,} samples ({args.series} series x {args.points} points)")
+    print(
+        f"wire size: query_range {sum(len(p.content) for p in pages) / 1e6:.1f} MB in "
+        f"{len(pages)} requests, remote read {len(remote) / 1e6:.1f} MB in 1 request, "
+        f"openmetrics {sum(len(line) + 1 for line in dump) / 1e6:.1f} MB"
+    )
+    print("=" * 64)
+    baseline = measure("query_range json", lambda: decode_query_range(pages), samples, args.repeats)
+    for label, func in (
+        ("remote read protobuf", lambda: decode_remote_read(remote)),
+        ("openmetrics dump", lambda: decode_openmetrics(dump)),
+    ):
+        elapsed = measure(label, func, samples, args.repeats)
+        print(f"{'vs query_range':<24} {baseline / elapsed:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
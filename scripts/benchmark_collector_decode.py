@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Benchmark decoding of Prometheus query_range matrix payloads.
+
+Compares the legacy per-sample path (json + datetime.fromtimestamp + one Python
+object per point) with the vectorized NumPy decoder used by the collector, and
+json with orjson when it is installed.
+
+Usage:
+    poetry run python scripts/benchmark_collector_decode.py --series 20 --points 10000
+"""
+import argparse
+import json
+import time
+from datetime import UTC, datetime
+
+from k8s_ml_predictive_autoscaling.collector.prometheus_client import decode_values
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def build_payload(series: int, points: int) -> bytes:
+    start = 1_700_000_000
+    result = [
+        {
+            "metric": {"pod": f"demo-{index}", "job": "demo-services"},
+            "values": [
+                [start + 30 * i, f"{(i * 7 + index) % 100 / 10:.3f}"] for i in range(points)
+            ],
+        }
+        for index in range(series)
+    ]
+    return json.dumps(
+        {"status": "success", "data": {"resultType": "matrix", "result": result}}
+    ).encode()
+
+
+def decode_legacy(result: list) -> int:
+    samples = []
+    for series in result:
+        labels = series.get("metric", {})
+        for timestamp, value in series.get("values", []):
+            ts = datetime.fromtimestamp(float(timestamp), tz=UTC)
+            samples.append((ts, float(value), labels))
+    return len(samples)
+
+
+def decode_vectorized(result: list) -> int:
+    total = 0
+    for series in result:
+        timestamps, values = decode_values(series["values"])
+        total += len(values)
+    return total
+
+
+def measure(label: str, func, samples: int, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        decoded = func()
+        best = min(best, time.perf_counter() - started)
+    assert decoded == samples
+    print(f"{label:<28} {best * 1000:9.1f} ms  {best / samples * 1e9:7.1f} ns/sample")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--series", type=int, default=20)
+    parser.add_argument("--points", type=int, default=10_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    body = build_payload(args.series, args.points)
+    samples = args.series * args.points
+    print(f"Payload: {len(body) / 1e6:.1f} MB, {samples:,} samples")
+    print("=" * 60)
+
+    result = json.loads(body)["data"]["result"]
+    print("Decode only (payload already parsed):")
+    legacy = measure(
+        "legacy per-sample objects", lambda: decode_legacy(result), samples, args.repeats
+    )
+    vectorized = measure(
+        "vectorized numpy", lambda: decode_vectorized(result), samples, args.repeats
+    )
+    print(f"{'speedup':<28} {legacy / vectorized:9.1f}x")
+
+    print("\nEnd to end (parse + decode):")
+    legacy = measure(
+        "json + legacy",
+        lambda: decode_legacy(json.loads(body)["data"]["result"]),
+        samples,
+        args.repeats,
+    )
+    loaders = [("json", json.loads)]
+    if orjson is not None:
+        loaders.append(("orjson", orjson.loads))
+    else:
+        print("orjson not installed; skipping orjson variant")
+    for name, loads in loaders:
+        elapsed = measure(
+            f"{name} + vectorized",
+            lambda loads=loads: decode_vectorized(loads(body)["data"]["result"]),
+            samples,
+            args.repeats,
+        )
+        print(f"{'speedup':<28} {legacy / elapsed:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
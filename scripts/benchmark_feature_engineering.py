@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Benchmark the planned feature engine against the incremental helpers.
+
+The legacy path chains `add_time_features`, `add_lag_features` and
+`add_rolling_features`, each copying the frame and inserting one column at a
+time. `FeaturePlan.compute` writes all lags and rolling means into one
+preallocated block whose columns the result holds as views. Peak memory is traced with tracemalloc
+in a separate run so that it does not distort the timings.
+
+Usage:
+    poetry run python scripts/benchmark_feature_engineering.py --rows 200000 --metrics 5
+"""
+import argparse
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from k8s_ml_predictive_autoscaling.preprocessor.feature_engineering import (
+    FeaturePlan,
+    add_lag_features,
+    add_rolling_features,
+    add_time_features,
+)
+
+
+def build_frame(rows: int, metrics: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2024-01-01", periods=rows, freq="30s", tz="UTC")
+    return pd.DataFrame(
+        {f"metric_{i}": rng.normal(100, 10, rows) for i in range(metrics)}, index=index
+    )
+
+
+def legacy(frame: pd.DataFrame, columns: list[str], lags: list[int], windows: list[int]):
+    enriched = add_time_features(frame.copy())
+    enriched = add_lag_features(enriched, columns, lags)
+    return add_rolling_features(enriched, columns, windows)
+
+
+def measure(label: str, func, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {best * 1000:9.1f} ms  peak {peak / 2**20:8.1f} MiB")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--metrics", type=int, default=5)
+    parser.add_argument("--lags", type=int, nargs="+", default=[1, 5, 15, 30, 60])
+    parser.add_argument("--windows", type=int, nargs="+", default=[5, 15, 30, 60])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    frame = build_frame(args.rows, args.metrics)
+    columns = list(frame.columns)
+    plan = FeaturePlan.build(columns, columns, lags=args.lags, rolling_windows=args.windows)
+    print(
+        f"{args.rows:,} rows x {args.metrics} metrics -> {len(plan.names)} feature columns "
+        f"({len(args.lags)} lags, {len(args.windows)} rolling windows)"
+    )
+    print("=" * 64)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", pd.errors.PerformanceWarning)
+        baseline = measure(
+            "legacy helpers", lambda: legacy(frame, columns, args.lags, args.windows), args.repeats
+        )
+    for label, dtype in (("FeaturePlan float64", np.float64), ("FeaturePlan float32", np.float32)):
+        elapsed = measure(label, lambda: plan.compute(frame, dtype=dtype), args.repeats)
+        print(f"{'vs legacy':<28} {baseline / elapsed:9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Benchmark sliding-window sequence generation and its storage layouts.
+
+The legacy path slices every window into a Python list, stacks them and
+writes them with `np.savez_compressed`. The `SequenceWriter` layouts stream
+strided views instead: `npz` keeps the compressed archive, `npy` writes the
+same windows uncompressed, and `indexed` stores only the feature matrix and
+the row index at which each window ends. Each layout is also timed with the
+faster codecs (zstd and lz4 need pyarrow).
+
+Usage:
+    poetry run python scripts/benchmark_sequences.py --rows 20000 --features 40
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from k8s_ml_predictive_autoscaling.preprocessor.sequences import (
+    SequenceWriter,
+    load_sequences,
+    sequence_path,
+)
+
+
+def build_frame(rows: int, features: int) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2024-01-01", periods=rows, freq="1min", tz="UTC")
+    frame = pd.DataFrame(
+        rng.normal(0, 1, (rows, features)),
+        index=index,
+        columns=[f"feature_{i}" for i in range(features)],
+    )
+    frame["target"] = rng.normal(0, 1, rows)
+    return frame
+
+
+def legacy(frame: pd.DataFrame, columns: list[str], length: int, stride: int, path: Path):
+    values = frame[columns].to_numpy(dtype=float)
+    targets = frame["target"].to_numpy(dtype=float)
+    timestamps = frame.index.to_list()
+    sequences, y, stamps = [], [], []
+    for start in range(0, len(frame) - length + 1, stride):
+        end = start + length
+        sequences.append(values[start:end])
+        y.append(targets[end - 1])
+        stamps.append(timestamps[end - 1])
+    np.savez_compressed(
+        path,
+        sequences=np.stack(sequences),
+        targets=np.array(y),
+        timestamps=np.array([ts.isoformat() for ts in stamps]),
+        feature_columns=np.array(columns),
+        target_column="target",
+    )
+    return path
+
+
+def write(frame, columns: list[str], length: int, stride: int, path: Path, storage, codec):
+    writer = SequenceWriter(
+        path,
+        storage=storage,
+        codec=codec,
+        rows=len(frame),
+        feature_columns=columns,
+        target_column="target",
+        sequence_length=length,
+        stride=stride,
+    )
+    writer.append(frame)
+    return writer.close()
+
+
+def size_of(path: Path) -> int:
+    if path.is_dir():
+        return sum(item.stat().st_size for item in path.iterdir())
+    return path.stat().st_size
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--features", type=int, default=40)
+    parser.add_argument("--sequence-length", type=int, default=60)
+    parser.add_argument("--stride", type=int, default=1)
+    args = parser.parse_args()
+
+    frame = build_frame(args.rows, args.features)
+    columns = [column for column in frame.columns if column != "target"]
+    shape = (len(range(0, args.rows - args.sequence_length + 1, args.stride)), args.sequence_length)
+    print(f"{args.rows:,} rows x {args.features} features -> {shape[0]:,} windows of {shape[1]}")
+    print("=" * 64)
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp)
+        cases = [("legacy stack + savez_compressed", None, None)]
+        cases += [
+            (f"SequenceWriter {storage} {codec}", storage, codec)
+            for storage, codecs in (
+                ("npz", ("deflate", "none")),
+                ("npy", ("none", "lz4", "zstd")),
+                ("indexed", ("none", "lz4", "zstd")),
+            )
+            for codec in codecs
+        ]
+        baseline = None
+        for label, storage, codec in cases:
+            started = time.perf_counter()
+            if storage is None:
+                path = legacy(frame, columns, args.sequence_length, args.stride, out / "legacy.npz")
+            else:
+                path = write(
+                    frame,
+                    columns,
+                    args.sequence_length,
+                    args.stride,
+                    sequence_path(out, f"{storage}_{codec}", storage),
+                    storage,
+                    codec,
+                )
+            elapsed = time.perf_counter() - started
+            size = size_of(path)
+            baseline = baseline or (elapsed, size)
+            print(
+                f"{label:<34} {elapsed * 1000:9.1f} ms {size / 2**20:9.1f} MiB  "
+                f"({baseline[0] / elapsed:5.1f}x faster, {baseline[1] / size:6.2f}x smaller)"
+            )
+        started = time.perf_counter()
+        dataset = load_sequences(sequence_path(out, "indexed_none", "indexed"))
+        rng = np.random.default_rng(1)
+        for _ in range(100):
+            dataset.sequences[rng.integers(0, shape[0], 64)]
+        elapsed = time.perf_counter() - started
+        print(f"{'indexed: 100 random batches of 64':<34} {elapsed * 1000:9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
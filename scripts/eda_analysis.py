@@ -11,15 +11,20 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 
+from k8s_ml_predictive_autoscaling.preprocessor import load_split
+
 # Set style
 sns.set_theme(style="darkgrid")
 plt.rcParams["figure.figsize"] = (15, 8)
 
+metrics = ["request_rate", "latency_p50", "latency_p95", "latency_p99", "active_jobs"]
+columns = [*metrics, "hour", "day_of_week", "is_weekend"]
+
 # Load data
 print("Loading data...")
-train_df = pd.read_csv("data/processed/train.csv", parse_dates=["timestamp"])
-val_df = pd.read_csv("data/processed/validation.csv", parse_dates=["timestamp"])
-test_df = pd.read_csv("data/processed/test.csv", parse_dates=["timestamp"])
+train_df = load_split("data/processed", "train", columns=columns)
+val_df = load_split("data/processed", "validation", columns=columns)
+test_df = load_split("data/processed", "test", columns=columns)
 
 print(f"Train shape: {train_df.shape}")
 print(f"Validation shape: {val_df.shape}")
@@ -38,7 +43,6 @@ print("\n" + "=" * 80)
 print("BASIC STATISTICS")
 print("=" * 80)
 
-metrics = ["request_rate", "latency_p50", "latency_p95", "latency_p99", "active_jobs"]
 stats_summary = full_df[metrics].describe()
 print(stats_summary)
 
@@ -1,24 +1,55 @@
 """Prometheus data collection utilities."""
 
-from .collect_historical import HistoricalCollector
+from .bulk_import import BulkImporter
+from .cache import AsyncCachedPrometheusClient, CachedPrometheusClient, QueryRangeCache
+from .collect_historical import AsyncHistoricalCollector, HistoricalCollector
 from .config import (
     DEFAULT_CONFIG_PATH,
+    CacheSettings,
     CollectionSettings,
     CollectorConfig,
+    InstrumentationSettings,
     MetricConfig,
     PrometheusSettings,
+    PrometheusSource,
     load_config,
 )
-from .prometheus_client import PrometheusClient, PrometheusQueryError
+from .federation import FederatedPrometheusClient, FederatedSource
+from .instrumentation import CollectorInstrumentation
+from .prometheus_client import AsyncPrometheusClient, PrometheusClient, PrometheusQueryError
+from .remote_read import RemoteReadClient
+from .resilience import (
+    AsyncRetryingPrometheusClient,
+    CircuitBreaker,
+    RetryingPrometheusClient,
+    RetryPolicy,
+)
 
 __all__ = [
+    "AsyncCachedPrometheusClient",
+    "AsyncHistoricalCollector",
+    "AsyncPrometheusClient",
+    "AsyncRetryingPrometheusClient",
+    "BulkImporter",
     "HistoricalCollector",
+    "CachedPrometheusClient",
+    "CacheSettings",
+    "CircuitBreaker",
+    "CollectorInstrumentation",
     "DEFAULT_CONFIG_PATH",
+    "FederatedPrometheusClient",
+    "FederatedSource",
     "CollectorConfig",
     "CollectionSettings",
+    "InstrumentationSettings",
     "MetricConfig",
     "PrometheusSettings",
+    "PrometheusSource",
     "PrometheusClient",
     "PrometheusQueryError",
+    "QueryRangeCache",
+    "RemoteReadClient",
+    "RetryingPrometheusClient",
+    "RetryPolicy",
     "load_config",
 ]
@@ -0,0 +1,336 @@
+"""Bulk backfill of Prometheus history without paging through query_range.
+
+Three sources are supported, all written into the collector's raw storage:
+
+* remote read (`/api/v1/read`), which streams raw samples as protobuf;
+* OpenMetrics / text exposition dumps with timestamps, e.g. the output of
+  `promtool tsdb dump-openmetrics` or `promtool tsdb dump`;
+* on-disk TSDB data directories, decoded through `promtool tsdb dump-openmetrics`.
+
+Only metrics whose `promql` is a plain series selector can be imported, since
+raw samples are returned as stored rather than evaluated at `step`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gzip
+import itertools
+import subprocess
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import IO, Iterable, Iterator, Protocol, Sequence
+
+import numpy as np
+
+from ..logging import get_logger
+from ..raw_storage import SampleSink, SeriesBatch
+from .collect_historical import _BaseCollector
+from .config import CollectorConfig, MetricConfig, load_config
+from .federation import inject_labels
+from .remote_read import LabelMatcher, RemoteReadClient, RemoteSeries, matches_all, parse_selector
+
+LOGGER = get_logger(__name__)
+
+# Epoch values below this are seconds (OpenMetrics); above it, milliseconds.
+_SECONDS_THRESHOLD = 1e11
+
+
+class RemoteReadProtocol(Protocol):
+    def read(
+        self, matchers: list[LabelMatcher], *, start: datetime, end: datetime
+    ) -> list[RemoteSeries]:
+        """Subset of RemoteReadClient used by the importer."""
+
+
+class BulkImporter(_BaseCollector):
+    """Writes raw samples from bulk sources into the same sinks as the collector."""
+
+    def import_remote_read(
+        self, sources: Sequence[tuple[RemoteReadProtocol, dict[str, str]]]
+    ) -> list[Path]:
+        """Read the configured lookback window through remote read.
+
+        `sources` pairs each client with the labels injected into its series.
+        The window is still split by `collection.chunk_hours`, so each response
+        stays bounded in memory.
+        """
+
+        end_time = datetime.now(tz=UTC)
+        outputs: list[Path] = []
+        try:
+            for metric, matchers in self._selectors():
+                sink = self._open_sink(metric)
+                samples = 0
+                try:
+                    for start, end in self._chunk_windows(metric, end_time):
+                        batches = [
+                            self._batch(metric, _with_labels(series.labels, labels), series)
+                            for client, labels in sources
+                            for series in self._read(client, metric, matchers, start, end)
+                        ]
+                        samples += self._write_batches(metric, batches, sink)
+                finally:
+                    outputs.extend(self._finish_metric(metric, sink, samples))
+        finally:
+            self._publish_run()
+        return outputs
+
+    def _read(
+        self,
+        client: RemoteReadProtocol,
+        metric: MetricConfig,
+        matchers: list[LabelMatcher],
+        start: datetime,
+        end: datetime,
+    ) -> list[RemoteSeries]:
+        with self.instrumentation.query(metric.name, metric.promql, start, end) as record:
+            result = client.read(matchers, start=start, end=end)
+            record.series = len(result)
+            record.samples = sum(len(series.values) for series in result)
+        return result
+
+    def import_openmetrics(self, lines: Iterable[str]) -> list[Path]:
+        """Import every sample from an exposition dump that matches a configured metric."""
+
+        targets = self._selectors()
+        sinks = {metric.name: self._open_sink(metric) for metric, _ in targets}
+        # Only the watermark of a previous incremental run limits what is written:
+        # dumps are ordered by series, not by time.
+        floors = {metric.name: self._high_water.get(metric.name) for metric, _ in targets}
+        samples = dict.fromkeys(sinks, 0)
+        unmatched = 0
+        try:
+            for series in iter_exposition_series(lines):
+                matched = False
+                for metric, matchers in targets:
+                    if matches_all(matchers, series.labels):
+                        matched = True
+                        batch = self._batch(metric, series.labels, series)
+                        samples[metric.name] += self._write_series(
+                            metric, batch, sinks[metric.name], floors[metric.name]
+                        )
+                unmatched += not matched
+        finally:
+            outputs: list[Path] = []
+            for metric, _ in targets:
+                outputs.extend(
+                    self._finish_metric(metric, sinks[metric.name], samples[metric.name])
+                )
+            self._publish_run()
+        if unmatched:
+            LOGGER.info("Skipped %s series not matching any configured metric", unmatched)
+        return outputs
+
+    def _write_series(
+        self, metric: MetricConfig, batch: SeriesBatch, sink: SampleSink, floor: int | None
+    ) -> int:
+        if floor is not None:
+            batch = batch.after(floor)
+        if not len(batch):
+            return 0
+        sink.write(batch)
+        last = int(batch.timestamps.max())
+        self._high_water[metric.name] = max(self._high_water.get(metric.name, last), last)
+        return len(batch)
+
+    def _batch(
+        self, metric: MetricConfig, labels: dict[str, str], series: RemoteSeries
+    ) -> SeriesBatch:
+        return SeriesBatch(
+            metric=metric.name,
+            promql=metric.promql,
+            labels=self._labels.encode(labels),
+            timestamps=series.timestamps,
+            values=series.values,
+        )
+
+    def _selectors(self) -> list[tuple[MetricConfig, list[LabelMatcher]]]:
+        selectors: list[tuple[MetricConfig, list[LabelMatcher]]] = []
+        for metric in self.config.metrics:
+            try:
+                selectors.append((metric, parse_selector(metric.promql)))
+            except ValueError:
+                LOGGER.warning(
+                    "Skipping %s: bulk import needs a plain selector, got %s",
+                    metric.name,
+                    metric.promql,
+                )
+        return selectors
+
+
+def iter_exposition_series(lines: Iterable[str]) -> Iterator[RemoteSeries]:
+    """Group consecutive samples of an exposition dump into per-series arrays.
+
+    Accepts OpenMetrics (`name{labels} value seconds`) as written by
+    `promtool tsdb dump-openmetrics`, and `{__name__="name", ...} value ms` as
+    written by `promtool tsdb dump`. The unit of the timestamps is detected
+    per series. Samples without a timestamp are rejected because a dump
+    without timestamps cannot be placed in time.
+    """
+
+    current: str | None = None
+    stamps: list[float] = []
+    values: list[float] = []
+    for number, raw in enumerate(lines, start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        key, value, stamp = _split_sample(line, number)
+        if key != current:
+            if current is not None:
+                yield _series(current, stamps, values)
+            current, stamps, values = key, [], []
+        values.append(float(value))
+        stamps.append(float(stamp))
+    if current is not None:
+        yield _series(current, stamps, values)
+
+
+def _split_sample(line: str, number: int) -> tuple[str, str, str]:
+    line = line.split(" # ", 1)[0]  # drop OpenMetrics exemplars
+    brace = line.rfind("}")
+    if brace >= 0:
+        key, rest = line[: brace + 1], line[brace + 1 :]
+    else:
+        key, _, rest = line.partition(" ")
+    fields = rest.split()
+    if len(fields) != 2:
+        raise ValueError(f"Line {number}: expected `<series> <value> <timestamp>`: {line!r}")
+    return key, fields[0], fields[1]
+
+
+def _series(key: str, stamps: list[float], values: list[float]) -> RemoteSeries:
+    timestamps = np.array(stamps, dtype=np.float64)
+    if len(timestamps) and np.abs(timestamps).max() < _SECONDS_THRESHOLD:
+        timestamps = timestamps * 1000
+    return RemoteSeries(
+        labels=parse_series_key(key),
+        timestamps=np.rint(timestamps).astype(np.int64),
+        values=np.array(values, dtype=np.float64),
+    )
+
+
+def parse_series_key(key: str) -> dict[str, str]:
+    """Parse `name{a="b",...}` into a label dict including `__name__`."""
+
+    name, _, body = key.partition("{")
+    labels: dict[str, str] = {}
+    body = body.rstrip("}")
+    for matcher in parse_selector("{" + body + "}") if body.strip() else []:
+        labels[matcher.name] = matcher.value
+    if name.strip():
+        labels["__name__"] = name.strip()
+    return labels
+
+
+def dump_tsdb(path: Path, *, promtool: str = "promtool") -> Iterator[str]:
+    """Stream a TSDB data directory as OpenMetrics lines via `promtool`."""
+
+    command = [promtool, "tsdb", "dump-openmetrics", str(path)]
+    try:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+        )
+    except FileNotFoundError as exc:
+        raise RuntimeError(f"promtool not found ({promtool}); install Prometheus tools") from exc
+    assert process.stdout is not None and process.stderr is not None
+    yield from process.stdout
+    if process.wait() != 0:
+        raise RuntimeError(f"{' '.join(command)} failed: {process.stderr.read().strip()}")
+
+
+def _with_labels(series_labels: dict[str, str], labels: dict[str, str]) -> dict[str, str]:
+    injected: dict[str, str] = inject_labels({"metric": series_labels}, labels)["metric"]
+    return injected
+
+
+def _open_dump(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return path.open(encoding="utf-8")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--config",
+        type=Path,
+        default=None,
+        help="Path to collector YAML config (defaults to package config).",
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--remote-read",
+        action="store_true",
+        help="Read the lookback window from each configured source via /api/v1/read.",
+    )
+    source.add_argument(
+        "--openmetrics",
+        type=Path,
+        nargs="+",
+        help="OpenMetrics / promtool dump files with timestamps (optionally .gz).",
+    )
+    source.add_argument(
+        "--tsdb",
+        type=Path,
+        help="Prometheus TSDB data directory, decoded with `promtool tsdb dump-openmetrics`.",
+    )
+    parser.add_argument("--promtool", default="promtool", help="Path to the promtool binary.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Skip samples at or before each metric's stored watermark.",
+    )
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    config: CollectorConfig = load_config(args.config)
+    if args.incremental:
+        config.collection = config.collection.model_copy(update={"incremental": True})
+    importer = BulkImporter(config)
+
+    if args.remote_read:
+        clients = [
+            (
+                RemoteReadClient(
+                    source.base_url,
+                    timeout_seconds=source.timeout_seconds,
+                    verify_ssl=source.verify_ssl,
+                ),
+                source.labels,
+            )
+            for source in config.resolved_sources()
+        ]
+        try:
+            outputs = importer.import_remote_read(clients)
+        finally:
+            for client, _ in clients:
+                client.close()
+    elif args.tsdb is not None:
+        outputs = importer.import_openmetrics(dump_tsdb(args.tsdb, promtool=args.promtool))
+    else:
+        # All dumps go through one import so that later files do not truncate earlier output.
+        with contextlib.ExitStack() as stack:
+            handles = [stack.enter_context(_open_dump(path)) for path in args.openmetrics]
+            outputs = importer.import_openmetrics(itertools.chain.from_iterable(handles))
+    LOGGER.info("Import complete: %s files", len(outputs))
+    return 0
+
+
+__all__ = [
+    "BulkImporter",
+    "dump_tsdb",
+    "iter_exposition_series",
+    "parse_series_key",
+]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
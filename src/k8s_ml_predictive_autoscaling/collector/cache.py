@@ -0,0 +1,264 @@
+"""Content-addressed on-disk cache for Prometheus query_range responses."""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Protocol
+
+from ..logging import get_logger
+
+LOGGER = get_logger(__name__)
+
+CACHE_SUFFIX = ".json.gz"
+
+Result = list[dict[str, Any]]
+
+
+class _QueryRange(Protocol):
+    def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> Result:
+        """Subset of PrometheusClient wrapped by the cache."""
+
+
+class _AsyncQueryRange(Protocol):
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> Result:
+        """Subset of AsyncPrometheusClient wrapped by the cache."""
+
+
+class QueryRangeCache:
+    """Stores gzip-compressed query_range results keyed by a hash of the request.
+
+    Entries are files named after the SHA-256 of `(query, start, end, step)`.
+    Reading an entry refreshes its modification time, and once the total size
+    exceeds `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, directory: Path, *, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._sizes: dict[Path, int] | None = None
+
+    @staticmethod
+    def key(query: str, start: datetime, end: datetime, step: timedelta) -> str:
+        request = json.dumps(
+            [
+                query,
+                round(start.timestamp() * 1000),
+                round(end.timestamp() * 1000),
+                step.total_seconds(),
+            ]
+        )
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Result | None:
+        path = self._path_for(key)
+        try:
+            payload = gzip.decompress(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError):
+            LOGGER.warning("Dropping unreadable cache entry %s", path)
+            self._remove(path)
+            return None
+        os.utime(path)
+        result: Result = json.loads(payload)
+        return result
+
+    def put(self, key: str, result: Result) -> None:
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = gzip.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"))
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        sizes = self._index()
+        sizes[path] = len(data)
+        self._evict()
+
+    def _evict(self) -> None:
+        sizes = self._index()
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+        by_age = sorted(sizes, key=lambda entry: entry.stat().st_mtime if entry.exists() else 0.0)
+        for path in by_age:
+            if total <= self.max_bytes:
+                break
+            total -= sizes.get(path, 0)
+            self._remove(path)
+
+    def _remove(self, path: Path) -> None:
+        path.unlink(missing_ok=True)
+        if self._sizes is not None:
+            self._sizes.pop(path, None)
+
+    def _index(self) -> dict[Path, int]:
+        if self._sizes is None:
+            self._sizes = {
+                path: path.stat().st_size for path in self.directory.glob(f"*/*{CACHE_SUFFIX}")
+            }
+        return self._sizes
+
+    def _path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}{CACHE_SUFFIX}"
+
+
+class _CachePlanner:
+    """Splits a request into a cacheable (immutable) head and a live tail."""
+
+    def __init__(
+        self,
+        cache: QueryRangeCache,
+        immutable_after: timedelta,
+        clock: Callable[[], datetime],
+    ) -> None:
+        self.cache = cache
+        self.immutable_after = immutable_after
+        self.clock = clock
+
+    def plan(
+        self, start: datetime, end: datetime, step: timedelta
+    ) -> tuple[tuple[datetime, datetime] | None, tuple[datetime, datetime] | None]:
+        start, end = align_to_step(start, step), align_to_step(end, step)
+        horizon = align_to_step(self.clock() - self.immutable_after, step)
+        if end <= horizon:
+            return (start, end), None
+        if start >= horizon:
+            return None, (start, end)
+        return (start, horizon), (horizon + step, end)
+
+
+class CachedPrometheusClient:
+    """Wraps a Prometheus client with a `QueryRangeCache`.
+
+    Request boundaries are aligned down to the step so that repeated runs
+    produce identical keys. Data older than `immutable_after` is considered
+    final and served from the cache; the newer tail of a request is always
+    fetched live and merged into the cached head.
+    """
+
+    def __init__(
+        self,
+        client: _QueryRange,
+        cache: QueryRangeCache,
+        *,
+        immutable_after: timedelta,
+        clock: Callable[[], datetime] | None = None,
+    ) -> None:
+        self.client = client
+        self._planner = _CachePlanner(cache, immutable_after, clock or _utcnow)
+
+    def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> Result:
+        cached, live = self._planner.plan(start, end, step)
+        parts: list[Result] = []
+        if cached is not None:
+            key = QueryRangeCache.key(query, *cached, step)
+            result = self._planner.cache.get(key)
+            if result is None:
+                result = self.client.query_range(query, start=cached[0], end=cached[1], step=step)
+                self._planner.cache.put(key, result)
+            parts.append(result)
+        if live is not None and live[0] <= live[1]:
+            parts.append(self.client.query_range(query, start=live[0], end=live[1], step=step))
+        return merge_results(parts)
+
+
+class AsyncCachedPrometheusClient:
+    """Asynchronous counterpart of `CachedPrometheusClient`."""
+
+    def __init__(
+        self,
+        client: _AsyncQueryRange,
+        cache: QueryRangeCache,
+        *,
+        immutable_after: timedelta,
+        clock: Callable[[], datetime] | None = None,
+    ) -> None:
+        self.client = client
+        self._planner = _CachePlanner(cache, immutable_after, clock or _utcnow)
+
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> Result:
+        cached, live = self._planner.plan(start, end, step)
+        parts: list[Result] = []
+        if cached is not None:
+            key = QueryRangeCache.key(query, *cached, step)
+            result = self._planner.cache.get(key)
+            if result is None:
+                result = await self.client.query_range(
+                    query, start=cached[0], end=cached[1], step=step
+                )
+                self._planner.cache.put(key, result)
+            parts.append(result)
+        if live is not None and live[0] <= live[1]:
+            parts.append(
+                await self.client.query_range(query, start=live[0], end=live[1], step=step)
+            )
+        return merge_results(parts)
+
+
+def align_to_step(moment: datetime, step: timedelta) -> datetime:
+    """Round `moment` down to a multiple of `step` since the epoch."""
+
+    step_seconds = step.total_seconds()
+    aligned = (moment.timestamp() // step_seconds) * step_seconds
+    return datetime.fromtimestamp(aligned, tz=UTC)
+
+
+def merge_results(parts: list[Result]) -> Result:
+    """Concatenate the `values` of matching series across consecutive results."""
+
+    if len(parts) == 1:
+        return parts[0]
+    merged: dict[str, dict[str, Any]] = {}
+    for part in parts:
+        for series in part:
+            labels = series.get("metric", {})
+            key = json.dumps(labels, sort_keys=True)
+            entry = merged.setdefault(key, {"metric": labels, "values": []})
+            entry["values"].extend(series.get("values", []))
+    return list(merged.values())
+
+
+def _utcnow() -> datetime:
+    return datetime.now(tz=UTC)
+
+
+__all__ = [
+    "AsyncCachedPrometheusClient",
+    "CachedPrometheusClient",
+    "QueryRangeCache",
+    "align_to_step",
+    "merge_results",
+]
@@ -0,0 +1,90 @@
+"""Adaptive query_range chunk sizing."""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+import httpx
+
+from .prometheus_client import PrometheusQueryError
+
+MAX_GROWTH_FACTOR = 2.0
+
+_SPLITTABLE_MESSAGES = (
+    "exceeded maximum resolution",
+    "too many samples",
+)
+
+
+class AdaptiveChunkPlanner:
+    """Chooses the time span of the next query_range chunk for one metric.
+
+    The span never exceeds what Prometheus accepts for the metric's step
+    (`max_points_per_series` evaluations per series). After each successful
+    chunk the span is rescaled so that the next response lands near
+    `target_samples` decoded samples and `target_seconds` of latency. Because
+    samples are series × points, high-cardinality queries shrink accordingly.
+    Growth is capped at `MAX_GROWTH_FACTOR` per chunk; failures halve the span.
+
+    Spans are whole multiples of the step (at least one step), so chunks cut
+    from the same start keep every sample of a series on one evaluation grid.
+    """
+
+    def __init__(
+        self,
+        *,
+        step: timedelta,
+        initial: timedelta,
+        min_span: timedelta,
+        max_points_per_series: int,
+        target_samples: int,
+        target_seconds: float,
+    ) -> None:
+        self.step = step
+        self.max_span = step * max(max_points_per_series - 1, 1)
+        # Rounded up, so that splitting never goes below the configured minimum.
+        self.min_span = min(step * max(-(-min_span // step), 1), self.max_span)
+        self.target_samples = target_samples
+        self.target_seconds = target_seconds
+        self.span = self._clamp(initial)
+
+    def record_success(self, span: timedelta, *, samples: int, seconds: float) -> None:
+        factors = [MAX_GROWTH_FACTOR]
+        if samples:
+            factors.append(self.target_samples / samples)
+        if seconds > 0:
+            factors.append(self.target_seconds / seconds)
+        self.span = self._clamp(span * min(factors))
+
+    def record_failure(self, span: timedelta) -> bool:
+        """Halve the span after a failed chunk; False when it cannot shrink further."""
+
+        if span <= self.min_span:
+            return False
+        self.span = self._clamp(span / 2)
+        return True
+
+    def split_point(self, start: datetime, end: datetime) -> datetime:
+        """Whole step nearest below the middle of `[start, end]`, at least one step in."""
+
+        return start + self.step * max((end - start) // self.step // 2, 1)
+
+    def _clamp(self, span: timedelta) -> timedelta:
+        span = max(self.min_span, min(span, self.max_span))
+        return self.step * max(span // self.step, 1)
+
+
+def is_splittable_error(exc: BaseException) -> bool:
+    """Whether a failed chunk is likely to succeed when queried in smaller pieces."""
+
+    if isinstance(exc, httpx.TimeoutException):
+        return True
+    if isinstance(exc, PrometheusQueryError):
+        if exc.error_type == "timeout":
+            return True
+        message = str(exc).lower()
+        return any(fragment in message for fragment in _SPLITTABLE_MESSAGES)
+    return False
+
+
+__all__ = ["AdaptiveChunkPlanner", "MAX_GROWTH_FACTOR", "is_splittable_error"]
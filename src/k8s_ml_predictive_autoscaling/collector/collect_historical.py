@@ -3,17 +3,35 @@
 from __future__ import annotations
 
 import argparse
-import csv
-import json
-from collections import defaultdict
+import asyncio
+import contextlib
+from collections import deque
 from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
-from typing import Any, Iterable, Protocol
+from typing import Any, Iterable, Iterator, Protocol
 
 from ..logging import get_logger
-from .config import CollectorConfig, MetricConfig, load_config
-from .prometheus_client import PrometheusClient
+from ..raw_storage import LabelEncoder, SampleSink, SeriesBatch, open_sink
+from .cache import (
+    AsyncCachedPrometheusClient,
+    CachedPrometheusClient,
+    QueryRangeCache,
+    align_to_step,
+)
+from .chunking import AdaptiveChunkPlanner, is_splittable_error
+from .config import CollectorConfig, MetricConfig, PrometheusSettings, load_config
+from .federation import FederatedPrometheusClient, FederatedSource
+from .instrumentation import CollectorInstrumentation
+from .prometheus_client import AsyncPrometheusClient, PrometheusClient, decode_values
+from .resilience import (
+    AsyncRetryingPrometheusClient,
+    CircuitBreaker,
+    RetryingPrometheusClient,
+    RetryPolicy,
+    circuit_breaker_for,
+)
+from .state import WatermarkStore
 
 LOGGER = get_logger(__name__)
 
@@ -30,112 +48,400 @@ class PrometheusClientProtocol(Protocol):
         """Subset of PrometheusClient used by the collector."""
 
 
-@dataclass(slots=True)
-class HistoricalSample:
-    timestamp: datetime
-    metric: str
-    promql: str
-    value: float
-    labels: dict[str, Any]
-
-    def serialize(self) -> dict[str, Any]:
-        return {
-            "timestamp": self.timestamp.isoformat(),
-            "metric": self.metric,
-            "promql": self.promql,
-            "value": self.value,
-            "labels": json.dumps(self.labels, sort_keys=True),
-        }
-
-
-class HistoricalCollector:
-    """Collects Prometheus metrics according to config and stores CSV exports."""
+class AsyncPrometheusClientProtocol(Protocol):
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        """Subset of AsyncPrometheusClient used by the async collector."""
 
-    def __init__(self, config: CollectorConfig, client: "PrometheusClientProtocol") -> None:
+
+class _BaseCollector:
+    """Chunk planning and streaming persistence shared by the sync and async collectors.
+
+    Each metric tracks a high-water mark: samples at or before it are dropped,
+    which removes the boundary sample shared by adjacent chunks and, in
+    incremental mode, anything already exported by a previous run. The mark is
+    persisted once the metric's sink has been flushed.
+    """
+
+    def __init__(self, config: CollectorConfig) -> None:
         self.config = config
-        self.client = client
+        self._labels = LabelEncoder()
+        self._state = WatermarkStore.load(config.collection.state_path)
+        self._high_water: dict[str, int] = {}
+        self._resuming = False
+        self.instrumentation = CollectorInstrumentation()
 
-    def collect(self) -> list[Path]:
-        outputs: list[Path] = []
-        for metric in self.config.metrics:
-            samples = self._collect_metric(metric)
-            outputs.extend(self._persist(metric, samples))
-        return outputs
+    def _begin_run(self) -> datetime:
+        """Fix the run's end time, reusing the one of an interrupted run when resuming."""
 
-    def _collect_metric(self, metric: MetricConfig) -> list[HistoricalSample]:
-        lookback = self.config.collection.lookback_delta
-        chunk_delta = self.config.collection.chunk_delta
+        pending = self._state.pending_run
+        if pending is not None and self.config.collection.resume_failed_runs:
+            self._resuming = True
+            end_time = datetime.fromtimestamp(pending.end, tz=UTC)
+            LOGGER.info(
+                "Resuming interrupted run up to %s (%s metrics checkpointed)",
+                end_time.isoformat(),
+                len(pending.checkpoints),
+            )
+            return end_time
         end_time = datetime.now(tz=UTC)
-        start_time = end_time - lookback
-        cursor = start_time
-        samples: list[HistoricalSample] = []
-        step = metric.resolve_step(self.config.collection.default_step)
+        self._state.begin_run(end_time.timestamp())
+        self._state.save()
+        return end_time
 
+    def _complete_run(self) -> None:
+        self._state.finish_run()
+        self._state.save()
+
+    def _resume_from(self, metric: MetricConfig) -> float | None:
+        pending = self._state.pending_run
+        if self._resuming and pending is not None and metric.name in pending.checkpoints:
+            return pending.checkpoints[metric.name]
+        if not self.config.collection.incremental:
+            return None
+        return self._state.get(metric.name)
+
+    def _chunk_start(self, metric: MetricConfig, end_time: datetime) -> datetime:
+        start = end_time - self.config.collection.lookback_delta
+        resume = self._resume_from(metric)
+        if resume is not None:
+            start = max(start, datetime.fromtimestamp(resume, tz=UTC))
+        return start
+
+    def _chunk_windows(
+        self,
+        metric: MetricConfig,
+        end_time: datetime,
+        planner: AdaptiveChunkPlanner | None = None,
+    ) -> Iterator[tuple[datetime, datetime]]:
+        """Yield chunk windows up to `end_time`, each spanning the planner's current span."""
+
+        chunk_delta = self.config.collection.chunk_delta
+        # Cutting chunks on a fixed epoch grid keeps cache keys stable across runs.
+        aligned = self.config.cache.enabled
+        cursor = self._chunk_start(metric, end_time)
         while cursor < end_time:
-            chunk_end = min(cursor + chunk_delta, end_time)
-            result = self.client.query_range(
-                metric.promql,
-                start=cursor,
-                end=chunk_end,
-                step=step,
-            )
-            samples.extend(self._transform_results(metric, result))
+            if planner is not None:
+                chunk_delta = planner.span
+            boundary = align_to_step(cursor, chunk_delta) if aligned else cursor
+            chunk_end = min(boundary + chunk_delta, end_time)
+            yield cursor, chunk_end
             cursor = chunk_end
 
-        LOGGER.info(
-            "Collected %s samples for %s",
-            len(samples),
-            metric.name,
+    def _planner(self, metric: MetricConfig) -> AdaptiveChunkPlanner:
+        collection = self.config.collection
+        return AdaptiveChunkPlanner(
+            step=metric.resolve_step(collection.default_step),
+            initial=collection.chunk_delta,
+            min_span=collection.min_chunk_delta,
+            max_points_per_series=collection.max_points_per_series,
+            target_samples=collection.target_samples_per_chunk,
+            target_seconds=collection.target_chunk_seconds,
         )
-        return samples
 
-    def _persist(self, metric: MetricConfig, samples: list[HistoricalSample]) -> list[Path]:
+    def _open_sink(self, metric: MetricConfig) -> SampleSink:
+        resume = self._resume_from(metric)
+        if resume is not None:
+            self._high_water[metric.name] = round(resume * 1000)
+        return open_sink(
+            self.config.collection.raw_format,
+            self.config.collection.output_dir,
+            metric=metric.name,
+            prefix=metric.resolved_prefix(),
+            append=resume is not None,
+        )
+
+    def _write_chunk(
+        self, metric: MetricConfig, result: Iterable[dict[str, Any]], sink: SampleSink
+    ) -> int:
+        """Write the next chunk in time order and checkpoint the run past it."""
+
+        written = self._write_batches(metric, self._transform_results(metric, result), sink)
+        high_water = self._high_water.get(metric.name)
+        if written and high_water is not None:
+            sink.flush()
+            self._state.checkpoint(metric.name, high_water / 1000)
+            self._state.save()
+        return written
+
+    def _write_batches(
+        self, metric: MetricConfig, batches: Iterable[SeriesBatch], sink: SampleSink
+    ) -> int:
+        """Write one chunk's batches, dropping samples at or before the high-water mark."""
+
+        high_water = self._high_water.get(metric.name)
+        latest = high_water
+        written = 0
+        for batch in batches:
+            if high_water is not None:
+                batch = batch.after(high_water)
+            if not len(batch):
+                continue
+            sink.write(batch)
+            written += len(batch)
+            last = int(batch.timestamps[-1])
+            latest = last if latest is None else max(latest, last)
+        if latest is not None:
+            self._high_water[metric.name] = latest
+        return written
+
+    def _finish_metric(self, metric: MetricConfig, sink: SampleSink, samples: int) -> list[Path]:
+        written = sink.close()
+        high_water = self._high_water.get(metric.name)
+        if high_water is not None:
+            self._state.advance(metric.name, high_water / 1000)
+            self._state.checkpoint(metric.name, high_water / 1000)
+            self._state.save()
         if not samples:
             LOGGER.warning("No samples for metric %s", metric.name)
-            return []
-
-        output_dir = self.config.collection.output_dir
-        output_dir.mkdir(parents=True, exist_ok=True)
-        grouped: dict[str, list[dict[str, Any]]] = defaultdict(list)
-        for sample in samples:
-            day = sample.timestamp.strftime("%Y%m%d")
-            grouped[day].append(sample.serialize())
-
-        written: list[Path] = []
-        for day, rows in grouped.items():
-            path = output_dir / f"{metric.resolved_prefix()}_{day}.csv"
-            with path.open("w", encoding="utf-8", newline="") as handle:
-                writer = csv.DictWriter(
-                    handle,
-                    fieldnames=["timestamp", "metric", "promql", "value", "labels"],
-                )
-                writer.writeheader()
-                writer.writerows(rows)
-            LOGGER.info("Wrote %s samples to %s", len(rows), path)
-            written.append(path)
+            return written
+        LOGGER.info(
+            "Collected %s samples for %s",
+            samples,
+            metric.name,
+        )
         return written
 
-    @staticmethod
+    def _publish_run(self) -> None:
+        settings = self.config.instrumentation
+        report_path = (
+            self.config.collection.output_dir / settings.report_file
+            if settings.report_file
+            else None
+        )
+        try:
+            self.instrumentation.publish(
+                report_path=report_path,
+                textfile_path=settings.textfile_path,
+                pushgateway_url=settings.pushgateway_url,
+                job=settings.job_name,
+            )
+        except OSError as exc:
+            LOGGER.warning("Could not publish collector metrics: %s", exc)
+
     def _transform_results(
-        metric: MetricConfig, result: Iterable[dict[str, Any]]
-    ) -> list[HistoricalSample]:
-        samples: list[HistoricalSample] = []
+        self, metric: MetricConfig, result: Iterable[dict[str, Any]]
+    ) -> list[SeriesBatch]:
+        batches: list[SeriesBatch] = []
         for series in result:
-            labels = series.get("metric", {})
-            for timestamp, value in series.get("values", []):
-                ts = datetime.fromtimestamp(float(timestamp), tz=UTC)
-                samples.append(
-                    HistoricalSample(
-                        timestamp=ts,
-                        metric=metric.name,
-                        promql=metric.promql,
-                        value=float(value),
-                        labels=labels,
-                    )
+            values = series.get("values", [])
+            if not values:
+                continue
+            timestamps, samples = decode_values(values)
+            batches.append(
+                SeriesBatch(
+                    metric=metric.name,
+                    promql=metric.promql,
+                    labels=self._labels.encode(series.get("metric", {})),
+                    timestamps=timestamps,
+                    values=samples,
+                )
+            )
+        return batches
+
+
+class HistoricalCollector(_BaseCollector):
+    """Collects Prometheus metrics according to config and streams them into raw storage."""
+
+    def __init__(self, config: CollectorConfig, client: "PrometheusClientProtocol") -> None:
+        super().__init__(config)
+        self.client = client
+
+    def collect(self) -> list[Path]:
+        outputs: list[Path] = []
+        end_time = self._begin_run()
+        try:
+            for metric in self.config.metrics:
+                sink = self._open_sink(metric)
+                samples = 0
+                try:
+                    samples = self._collect_metric(metric, sink, end_time)
+                finally:
+                    written = self._finish_metric(metric, sink, samples)
+                outputs.extend(written)
+            self._complete_run()
+        finally:
+            self._publish_run()
+        return outputs
+
+    def _collect_metric(self, metric: MetricConfig, sink: SampleSink, end_time: datetime) -> int:
+        if self.config.collection.adaptive_chunks:
+            return self._collect_metric_adaptive(metric, sink, end_time)
+        samples = 0
+        step = metric.resolve_step(self.config.collection.default_step)
+
+        for start, end in self._chunk_windows(metric, end_time):
+            with self.instrumentation.query(metric.name, metric.promql, start, end) as record:
+                result = self.client.query_range(
+                    metric.promql,
+                    start=start,
+                    end=end,
+                    step=step,
                 )
+                record.observe_result(result)
+            samples += self._write_chunk(metric, result, sink)
+        return samples
+
+    def _collect_metric_adaptive(
+        self, metric: MetricConfig, sink: SampleSink, end_time: datetime
+    ) -> int:
+        samples = 0
+        step = metric.resolve_step(self.config.collection.default_step)
+        planner = self._planner(metric)
+        cursor = self._chunk_start(metric, end_time)
+
+        while cursor < end_time:
+            span = min(planner.span, end_time - cursor)
+            try:
+                with self.instrumentation.query(
+                    metric.name, metric.promql, cursor, cursor + span
+                ) as record:
+                    result = self.client.query_range(
+                        metric.promql,
+                        start=cursor,
+                        end=cursor + span,
+                        step=step,
+                    )
+                    record.observe_result(result)
+            except Exception as exc:
+                if is_splittable_error(exc) and planner.record_failure(span):
+                    LOGGER.warning("Splitting %s chunk of %s: %s", metric.name, span, exc)
+                    self.instrumentation.record_retry(metric.name)
+                    continue
+                raise
+            planner.record_success(span, samples=record.samples, seconds=record.seconds)
+            samples += self._write_chunk(metric, result, sink)
+            cursor += span
         return samples
 
 
+@dataclass(slots=True)
+class _SourceChunk:
+    """What one source answered for one chunk, over one or more requests."""
+
+    results: list[list[dict[str, Any]]]
+    samples: int = 0
+    seconds: float = 0.0
+    split: bool = False
+
+
+class AsyncHistoricalCollector(_BaseCollector):
+    """Fans (metric, chunk, source) queries out over per-source pools of request slots.
+
+    Chunks are written in order, so the output matches the sequential
+    collector, and at most `collection.pending_chunks` are held per metric.
+    """
+
+    def __init__(self, config: CollectorConfig, client: "AsyncPrometheusClientProtocol") -> None:
+        super().__init__(config)
+        self.client = client
+        if isinstance(client, FederatedPrometheusClient):
+            self.federation = client
+        else:
+            source = FederatedSource("default", client, concurrency=config.collection.concurrency)
+            self.federation = FederatedPrometheusClient([source])
+
+    async def collect(self) -> list[Path]:
+        metrics = self.config.metrics
+        sources = self.federation.sources
+        end_time = self._begin_run()
+        look_ahead = self.config.collection.pending_chunks
+        sinks = [self._open_sink(metric) for metric in metrics]
+        samples = [0] * len(metrics)
+        adaptive = self.config.collection.adaptive_chunks
+        planners = [self._planner(metric) if adaptive else None for metric in metrics]
+
+        async def fetch_range(
+            index: int, source: FederatedSource, start: datetime, end: datetime
+        ) -> _SourceChunk:
+            metric, planner = metrics[index], planners[index]
+            step = metric.resolve_step(self.config.collection.default_step)
+            try:
+                with self.instrumentation.query(metric.name, metric.promql, start, end) as record:
+                    result = await self.federation.query_source(
+                        source, metric.promql, start=start, end=end, step=step
+                    )
+                    record.observe_result(result)
+            except Exception as exc:
+                splittable = is_splittable_error(exc)
+                if planner is None or not splittable or not planner.record_failure(end - start):
+                    if not (splittable and source.optional):
+                        raise
+                    LOGGER.warning(
+                        "Skipping optional source %s for %s: %s", source.name, metric.name, exc
+                    )
+                    return _SourceChunk([])
+                LOGGER.warning(
+                    "Splitting %s chunk of %s from %s: %s",
+                    metric.name,
+                    end - start,
+                    source.name,
+                    exc,
+                )
+                self.instrumentation.record_retry(metric.name)
+                middle = planner.split_point(start, end)
+            else:
+                return _SourceChunk([result], record.samples, record.seconds)
+            head = await fetch_range(index, source, start, middle)
+            if middle + step > end:
+                return _SourceChunk(head.results, split=True)
+            # The tail starts a step later: all parts of a chunk are written at once.
+            tail = await fetch_range(index, source, middle + step, end)
+            return _SourceChunk(head.results + tail.results, split=True)
+
+        async def collect_metric(group: asyncio.TaskGroup, index: int) -> None:
+            metric, planner = metrics[index], planners[index]
+            in_flight: deque[tuple[timedelta, list[asyncio.Task[_SourceChunk]]]] = deque()
+
+            async def write_oldest() -> None:
+                span, tasks = in_flight.popleft()
+                chunks = [await task for task in tasks]
+                if planner is not None and not any(chunk.split for chunk in chunks):
+                    planner.record_success(
+                        span,
+                        samples=sum(chunk.samples for chunk in chunks),
+                        seconds=max(chunk.seconds for chunk in chunks),
+                    )
+                merged = [
+                    series for chunk in chunks for result in chunk.results for series in result
+                ]
+                samples[index] += self._write_chunk(metric, merged, sinks[index])
+
+            windows = self._chunk_windows(metric, end_time, planner)
+            while True:
+                # The next window is cut only now, with the span its predecessors left.
+                if len(in_flight) >= look_ahead:
+                    await write_oldest()
+                window = next(windows, None)
+                if window is None:
+                    break
+                start, end = window
+                tasks = [
+                    group.create_task(fetch_range(index, source, start, end)) for source in sources
+                ]
+                in_flight.append((end - start, tasks))
+            while in_flight:
+                await write_oldest()
+
+        outputs: list[Path] = []
+        try:
+            async with asyncio.TaskGroup() as group:
+                for index in range(len(metrics)):
+                    group.create_task(collect_metric(group, index))
+            self._complete_run()
+        finally:
+            for index, metric in enumerate(metrics):
+                outputs.extend(self._finish_metric(metric, sinks[index], samples[index]))
+            self._publish_run()
+        return outputs
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument(
@@ -148,7 +454,29 @@ def build_parser() -> argparse.ArgumentParser:
         "--base-url",
         type=str,
         default=None,
-        help="Override Prometheus base URL from config.",
+        help="Override Prometheus base URL from config (replaces any federated sources).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Override collection.concurrency; values above 1 fetch chunks concurrently.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only fetch samples newer than each metric's stored watermark.",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="Discard the checkpoints of an interrupted run instead of resuming it.",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        type=Path,
+        default=None,
+        help="Write collector self-metrics to this Prometheus text file (textfile collector).",
     )
     return parser
 
@@ -159,6 +487,24 @@ def main(argv: list[str] | None = None) -> int:
     config = load_config(args.config)
     if args.base_url:
         config.prometheus = config.prometheus.model_copy(update={"base_url": args.base_url})
+        config.sources = []
+    if args.incremental:
+        config.collection = config.collection.model_copy(update={"incremental": True})
+    if args.restart:
+        config.collection = config.collection.model_copy(update={"resume_failed_runs": False})
+    if args.metrics_textfile is not None:
+        config.instrumentation = config.instrumentation.model_copy(
+            update={"textfile_path": args.metrics_textfile}
+        )
+    if args.concurrency is not None:
+        config.collection = config.collection.model_copy(
+            update={"concurrency": max(1, args.concurrency)}
+        )
+
+    if config.collection.concurrency > 1 or config.sources:
+        outputs = asyncio.run(_collect_async(config))
+        LOGGER.info("Export complete: %s files", len(outputs))
+        return 0
 
     client = PrometheusClient(
         config.prometheus.base_url,
@@ -166,7 +512,7 @@ def main(argv: list[str] | None = None) -> int:
         verify_ssl=config.prometheus.verify_ssl,
     )
     try:
-        collector = HistoricalCollector(config, client)
+        collector = HistoricalCollector(config, _wrap_client(config, client))
         outputs = collector.collect()
         LOGGER.info("Export complete: %s files", len(outputs))
     finally:
@@ -174,5 +520,95 @@ def main(argv: list[str] | None = None) -> int:
     return 0
 
 
+async def _collect_async(config: CollectorConfig) -> list[Path]:
+    sources = config.resolved_sources()
+    async with contextlib.AsyncExitStack() as stack:
+        members: list[FederatedSource] = []
+        for source in sources:
+            client = await stack.enter_async_context(
+                AsyncPrometheusClient(
+                    source.base_url,
+                    timeout_seconds=source.timeout_seconds,
+                    verify_ssl=source.verify_ssl,
+                    max_connections=config.collection.concurrency,
+                    max_requests_per_second=source.max_requests_per_second,
+                    http2=source.http2,
+                )
+            )
+            members.append(
+                FederatedSource(
+                    name=source.name,
+                    client=_wrap_async_client(
+                        config, source, client, source.name if config.sources else None
+                    ),
+                    labels=source.labels,
+                    optional=source.optional,
+                    concurrency=config.collection.concurrency,
+                )
+            )
+        if not config.sources:
+            return await AsyncHistoricalCollector(config, members[0].client).collect()
+        federated = FederatedPrometheusClient(members)
+        try:
+            return await AsyncHistoricalCollector(config, federated).collect()
+        finally:
+            federated.log_stats()
+
+
+def _open_cache(config: CollectorConfig, namespace: str | None) -> QueryRangeCache:
+    # Cache keys do not include the endpoint, so each federated source gets its own directory.
+    directory = config.cache.directory if namespace is None else config.cache.directory / namespace
+    return QueryRangeCache(directory, max_bytes=config.cache.max_bytes)
+
+
+def _resilience(settings: PrometheusSettings) -> tuple[RetryPolicy, CircuitBreaker]:
+    retry = RetryPolicy(
+        max_attempts=settings.max_attempts,
+        base_delay=settings.retry_base_seconds,
+        max_delay=settings.retry_max_seconds,
+    )
+    breaker = circuit_breaker_for(
+        settings.base_url,
+        failure_threshold=settings.breaker_failure_threshold,
+        reset_seconds=settings.breaker_reset_seconds,
+    )
+    return retry, breaker
+
+
+def _wrap_async_client(
+    config: CollectorConfig,
+    settings: PrometheusSettings,
+    client: AsyncPrometheusClient,
+    namespace: str | None,
+) -> AsyncPrometheusClientProtocol:
+    """Add retries and circuit breaking, then the cache so that cache hits skip both."""
+
+    retry, breaker = _resilience(settings)
+    wrapped: AsyncPrometheusClientProtocol = AsyncRetryingPrometheusClient(
+        client, retry=retry, breaker=breaker
+    )
+    if not config.cache.enabled:
+        return wrapped
+    return AsyncCachedPrometheusClient(
+        wrapped,
+        _open_cache(config, namespace),
+        immutable_after=config.cache.immutable_after,
+    )
+
+
+def _wrap_client(config: CollectorConfig, client: PrometheusClient) -> PrometheusClientProtocol:
+    retry, breaker = _resilience(config.prometheus)
+    wrapped: PrometheusClientProtocol = RetryingPrometheusClient(
+        client, retry=retry, breaker=breaker
+    )
+    if not config.cache.enabled:
+        return wrapped
+    return CachedPrometheusClient(
+        wrapped,
+        _open_cache(config, None),
+        immutable_after=config.cache.immutable_after,
+    )
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -8,7 +8,9 @@ from pathlib import Path
 from typing import Any
 
 import yaml
-from pydantic import BaseModel, Field, PositiveInt, field_validator
+from pydantic import BaseModel, Field, PositiveFloat, PositiveInt, field_validator
+
+from ..raw_storage import RawStorageFormat
 
 DEFAULT_CONFIG_PATH = Path(__file__).with_name("config.yaml")
 
@@ -32,6 +34,39 @@ class PrometheusSettings(BaseModel):
     base_url: str = Field(default="http://localhost:9090")
     timeout_seconds: PositiveInt = Field(default=10)
     verify_ssl: bool = Field(default=True)
+    max_requests_per_second: PositiveFloat | None = Field(
+        default=None,
+        description="Per-host request rate limit applied in concurrent collection mode.",
+    )
+    http2: bool = Field(
+        default=False,
+        description="Use HTTP/2 for async requests (requires the http2 extra).",
+    )
+    max_attempts: PositiveInt = Field(
+        default=5,
+        description="Attempts per query on transient failures (5xx, connection loss); 1 disables.",
+    )
+    retry_base_seconds: PositiveFloat = Field(default=0.5)
+    retry_max_seconds: PositiveFloat = Field(default=30.0)
+    breaker_failure_threshold: PositiveInt = Field(
+        default=5,
+        description="Consecutive transient failures after which requests to the host fail fast.",
+    )
+    breaker_reset_seconds: PositiveFloat = Field(default=30.0)
+
+
+class PrometheusSource(PrometheusSettings):
+    """One Prometheus shard in a federated collection."""
+
+    name: str
+    labels: dict[str, str] = Field(
+        default_factory=dict,
+        description="Labels injected into every series from this source, e.g. cluster.",
+    )
+    optional: bool = Field(
+        default=False,
+        description="Continue without this source when its requests fail.",
+    )
 
 
 class CollectionSettings(BaseModel):
@@ -39,6 +74,46 @@ class CollectionSettings(BaseModel):
     lookback_hours: PositiveInt = Field(default=24)
     chunk_hours: PositiveInt = Field(default=6)
     default_step: str = Field(default="30s")
+    raw_format: RawStorageFormat = Field(
+        default="csv",
+        description="Raw storage layout: legacy per-day CSV or metric/day partitioned Parquet.",
+    )
+    incremental: bool = Field(
+        default=False,
+        description="Resume each metric from its persisted watermark and append new samples.",
+    )
+    state_file: str = Field(
+        default=".collector_state.json",
+        description="Watermark state file name, stored inside output_dir.",
+    )
+    adaptive_chunks: bool = Field(
+        default=False,
+        description="Size chunks per metric from the step, response size and latency.",
+    )
+    max_points_per_series: PositiveInt = Field(
+        default=11_000,
+        description="Prometheus query_range resolution limit per series.",
+    )
+    target_samples_per_chunk: PositiveInt = Field(default=250_000)
+    target_chunk_seconds: PositiveFloat = Field(default=5.0)
+    min_chunk_minutes: PositiveInt = Field(
+        default=5,
+        description="Smallest span an adaptive chunk may be split down to.",
+    )
+    concurrency: PositiveInt = Field(
+        default=1,
+        description="Maximum in-flight query_range requests per Prometheus source; "
+        "values above 1 enable async mode.",
+    )
+    max_pending_chunks: PositiveInt | None = Field(
+        default=None,
+        description="Chunks per metric fetched ahead of the oldest one not yet written, "
+        "bounding the responses held in memory; defaults to concurrency.",
+    )
+    resume_failed_runs: bool = Field(
+        default=True,
+        description="Resume an interrupted run from its per-metric checkpoints.",
+    )
 
     @field_validator("output_dir", mode="before")
     @classmethod
@@ -53,10 +128,73 @@ class CollectionSettings(BaseModel):
     def chunk_delta(self) -> timedelta:
         return timedelta(hours=self.chunk_hours)
 
+    @property
+    def min_chunk_delta(self) -> timedelta:
+        return timedelta(minutes=self.min_chunk_minutes)
+
+    @property
+    def pending_chunks(self) -> int:
+        return self.max_pending_chunks or self.concurrency
+
+    @property
+    def state_path(self) -> Path:
+        return self.output_dir / self.state_file
+
+
+class CacheSettings(BaseModel):
+    """On-disk query_range response cache (see `collector.cache`)."""
+
+    enabled: bool = Field(default=False)
+    directory: Path = Field(default=Path("data/cache/prometheus"))
+    max_size_mb: PositiveInt = Field(default=1024)
+    immutable_after_minutes: PositiveInt = Field(
+        default=60,
+        description="Data older than this is treated as final and served from the cache.",
+    )
+
+    @field_validator("directory", mode="before")
+    @classmethod
+    def _expand_directory(cls, value: Any) -> Path:
+        return Path(value).expanduser()
+
+    @property
+    def max_bytes(self) -> int:
+        return self.max_size_mb * 1024 * 1024
+
+    @property
+    def immutable_after(self) -> timedelta:
+        return timedelta(minutes=self.immutable_after_minutes)
+
+
+class InstrumentationSettings(BaseModel):
+    """Where a collection run publishes its own metrics and report."""
+
+    report_file: str | None = Field(
+        default="collector_report.json",
+        description="JSON run report file name inside output_dir; null disables it.",
+    )
+    textfile_path: Path | None = Field(
+        default=None,
+        description="Prometheus text file for node_exporter's textfile collector.",
+    )
+    pushgateway_url: str | None = Field(default=None)
+    job_name: str = Field(default="k8s_ml_collector", description="Pushgateway job label.")
+
+    @field_validator("textfile_path", mode="before")
+    @classmethod
+    def _expand_textfile_path(cls, value: Any) -> Path | None:
+        return None if value is None else Path(value).expanduser()
+
 
 class CollectorConfig(BaseModel):
     prometheus: PrometheusSettings = Field(default_factory=PrometheusSettings)
     collection: CollectionSettings = Field(default_factory=CollectionSettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
+    instrumentation: InstrumentationSettings = Field(default_factory=InstrumentationSettings)
+    sources: list[PrometheusSource] = Field(
+        default_factory=list,
+        description="Prometheus shards queried in parallel; overrides `prometheus` when set.",
+    )
     metrics: list[MetricConfig]
 
     @field_validator("metrics")
@@ -67,6 +205,22 @@ class CollectorConfig(BaseModel):
             raise ValueError(msg)
         return value
 
+    @field_validator("sources")
+    @classmethod
+    def _ensure_unique_sources(cls, value: list[PrometheusSource]) -> list[PrometheusSource]:
+        names = [source.name for source in value]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate Prometheus source names: {', '.join(duplicates)}")
+        return value
+
+    def resolved_sources(self) -> list[PrometheusSource]:
+        """Configured sources, or the single `prometheus` endpoint as source "default"."""
+
+        if self.sources:
+            return self.sources
+        return [PrometheusSource(name="default", **self.prometheus.model_dump())]
+
 
 @dataclass(slots=True)
 class CollectorConfigBundle:
@@ -108,11 +262,14 @@ def load_config(path: Path | None = None) -> CollectorConfig:
 
 
 __all__ = [
+    "CacheSettings",
     "CollectorConfig",
     "CollectorConfigBundle",
     "CollectionSettings",
+    "InstrumentationSettings",
     "MetricConfig",
     "PrometheusSettings",
+    "PrometheusSource",
     "DEFAULT_CONFIG_PATH",
     "load_config",
     "parse_duration",
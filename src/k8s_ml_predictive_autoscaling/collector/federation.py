@@ -0,0 +1,170 @@
+"""Fan query_range requests out to several Prometheus shards and merge the results."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Protocol
+
+from ..logging import get_logger
+from .chunking import is_splittable_error
+
+LOGGER = get_logger(__name__)
+
+EXPORTED_LABEL_PREFIX = "exported_"
+
+
+class _AsyncQueryRange(Protocol):
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        """Subset of AsyncPrometheusClient queried for each source."""
+
+
+@dataclass(slots=True)
+class SourceStats:
+    """Request counters and latency accumulated for one Prometheus source."""
+
+    requests: int = 0
+    failures: int = 0
+    series: int = 0
+    samples: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def record(self, seconds: float, result: list[dict[str, Any]] | None) -> None:
+        self.requests += 1
+        self.seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        if result is None:
+            self.failures += 1
+            return
+        self.series += len(result)
+        self.samples += sum(len(series.get("values", [])) for series in result)
+
+
+@dataclass(slots=True)
+class FederatedSource:
+    """A Prometheus shard together with the labels identifying its series.
+
+    At most `concurrency` requests to the shard are in flight at once; its
+    requests only ever wait for its own slots.
+    """
+
+    name: str
+    client: _AsyncQueryRange
+    labels: dict[str, str] = field(default_factory=dict)
+    optional: bool = False
+    concurrency: int = 1
+    slots: asyncio.Semaphore = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.slots = asyncio.Semaphore(self.concurrency)
+
+
+class FederatedPrometheusClient:
+    """Queries every source concurrently and concatenates their series.
+
+    Each source has its own connection pool, rate limit and request slots, so
+    requests to a slow shard never wait for, or hold, anything another shard
+    needs. `AsyncHistoricalCollector` goes further and schedules every
+    (source, chunk) request on its own through `query_source`, so fast shards
+    keep fetching later chunks while a slow one catches up. Source labels are
+    injected into every series. As with Prometheus federation, a label
+    already present on a series is kept as `exported_<name>`. Failures of
+    sources marked `optional` are logged and counted, and the chunk continues
+    without them, unless a smaller chunk may succeed (`is_splittable_error`).
+    Those and failures of other sources propagate and cancel the requests
+    still running for the other sources.
+    """
+
+    def __init__(self, sources: list[FederatedSource]) -> None:
+        if not sources:
+            raise ValueError("At least one Prometheus source is required")
+        self.sources = sources
+        self.stats: dict[str, SourceStats] = {source.name: SourceStats() for source in sources}
+
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        try:
+            async with asyncio.TaskGroup() as group:
+                tasks = [
+                    group.create_task(
+                        self.query_source(source, query, start=start, end=end, step=step)
+                    )
+                    for source in self.sources
+                ]
+        except ExceptionGroup as failure:
+            # Surface the source's own error, as a single request would.
+            raise failure.exceptions[0] from None
+        merged: list[dict[str, Any]] = []
+        for task in tasks:
+            merged.extend(task.result())
+        return merged
+
+    async def query_source(
+        self,
+        source: FederatedSource,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        """Query one source within its request slots, with its labels injected."""
+
+        stats = self.stats[source.name]
+        async with source.slots:
+            started = time.monotonic()
+            try:
+                result = await source.client.query_range(query, start=start, end=end, step=step)
+            except Exception as exc:
+                stats.record(time.monotonic() - started, None)
+                if not source.optional or is_splittable_error(exc):
+                    raise
+                LOGGER.warning("Skipping optional source %s for %s: %s", source.name, query, exc)
+                return []
+            stats.record(time.monotonic() - started, result)
+        return [inject_labels(series, source.labels) for series in result]
+
+    def log_stats(self) -> None:
+        for name, stats in self.stats.items():
+            mean = stats.seconds / stats.requests if stats.requests else 0.0
+            LOGGER.info(
+                "Source %s: %s requests, %s failures, %s samples, mean %.3fs, max %.3fs",
+                name,
+                stats.requests,
+                stats.failures,
+                stats.samples,
+                mean,
+                stats.max_seconds,
+            )
+
+
+def inject_labels(series: dict[str, Any], labels: dict[str, str]) -> dict[str, Any]:
+    """Return `series` with `labels` added to its label set."""
+
+    if not labels:
+        return series
+    merged = dict(series.get("metric", {}))
+    for name, value in labels.items():
+        if name in merged and merged[name] != value:
+            merged[f"{EXPORTED_LABEL_PREFIX}{name}"] = merged[name]
+        merged[name] = value
+    return {**series, "metric": merged}
+
+
+__all__ = ["FederatedPrometheusClient", "FederatedSource", "SourceStats", "inject_labels"]
@@ -0,0 +1,266 @@
+"""Self-instrumentation of collection runs: Prometheus metrics and a JSON run report."""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    push_to_gateway,
+    write_to_textfile,
+)
+
+from ..logging import get_logger
+
+LOGGER = get_logger(__name__)
+
+REPORT_VERSION = 1
+SLOWEST_QUERIES = 10
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7, 1e8)
+
+_ACTIVE_QUERY: ContextVar["QueryRecord | None"] = ContextVar("collector_query", default=None)
+
+
+@dataclass(slots=True)
+class QueryRecord:
+    """Measurements for one query_range request (or remote-read call)."""
+
+    metric: str
+    start: str
+    end: str
+    seconds: float = 0.0
+    bytes: int = 0
+    samples: int = 0
+    series: int = 0
+    retries: int = 0
+    error: str | None = None
+
+    def observe_result(self, result: Iterable[dict[str, Any]]) -> None:
+        for series in result:
+            self.series += 1
+            self.samples += len(series.get("values", []))
+
+
+@dataclass(slots=True)
+class _MetricTotals:
+    promql: str
+    records: list[QueryRecord] = field(default_factory=list)
+    retries: int = 0
+    series_max: int = 0
+
+
+def record_query_retry() -> None:
+    """Count a client-side retry against the query measured in the current context."""
+
+    record = _ACTIVE_QUERY.get()
+    if record is not None:
+        record.retries += 1
+
+
+def record_response_bytes(size: int) -> None:
+    """Attribute `size` bytes to the query being measured in the current context.
+
+    Called by the HTTP clients. Concurrent queries run in separate asyncio
+    tasks, so each task only ever sees its own record.
+    """
+
+    record = _ACTIVE_QUERY.get()
+    if record is not None:
+        record.bytes += size
+
+
+class CollectorInstrumentation:
+    """Records per-query latency, bytes, samples, cardinality and retries.
+
+    Metrics are kept in a private registry so that they can be written as a
+    node_exporter/pushgateway text file at the end of a cron run without
+    picking up the process-wide default collectors.
+    """
+
+    def __init__(self, registry: CollectorRegistry | None = None) -> None:
+        self.registry = registry or CollectorRegistry()
+        self.started_at = datetime.now(tz=UTC)
+        self._started = time.monotonic()
+        self._metrics: dict[str, _MetricTotals] = {}
+        self.query_duration = Histogram(
+            "collector_query_duration_seconds",
+            "Latency of Prometheus queries issued by the collector.",
+            labelnames=("metric",),
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        self.response_bytes = Histogram(
+            "collector_query_response_bytes",
+            "Size of Prometheus query responses received by the collector.",
+            labelnames=("metric",),
+            buckets=BYTES_BUCKETS,
+            registry=self.registry,
+        )
+        self.queries = Counter(
+            "collector_queries_total",
+            "Prometheus queries issued by the collector.",
+            labelnames=("metric", "status"),
+            registry=self.registry,
+        )
+        self.samples = Counter(
+            "collector_samples_total",
+            "Samples decoded from Prometheus responses.",
+            labelnames=("metric",),
+            registry=self.registry,
+        )
+        self.retries = Counter(
+            "collector_query_retries_total",
+            "Queries retried after a failure, including adaptive chunk splits.",
+            labelnames=("metric",),
+            registry=self.registry,
+        )
+        self.series = Gauge(
+            "collector_series",
+            "Largest number of series returned by a single query in the last run.",
+            labelnames=("metric",),
+            registry=self.registry,
+        )
+        self.last_run = Gauge(
+            "collector_last_run_timestamp_seconds",
+            "Unix time at which the last collection run finished.",
+            registry=self.registry,
+        )
+        self.run_duration = Gauge(
+            "collector_run_duration_seconds",
+            "Wall-clock duration of the last collection run.",
+            registry=self.registry,
+        )
+
+    @contextmanager
+    def query(
+        self, metric: str, promql: str, start: datetime, end: datetime
+    ) -> Iterator[QueryRecord]:
+        """Measure one query; the body should call `record.observe_result`."""
+
+        record = QueryRecord(metric=metric, start=start.isoformat(), end=end.isoformat())
+        totals = self._metrics.setdefault(metric, _MetricTotals(promql=promql))
+        token = _ACTIVE_QUERY.set(record)
+        started = time.monotonic()
+        try:
+            yield record
+        except BaseException as exc:
+            record.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            _ACTIVE_QUERY.reset(token)
+            record.seconds = time.monotonic() - started
+            totals.records.append(record)
+            self._observe(record, totals)
+
+    def record_retry(self, metric: str) -> None:
+        self.retries.labels(metric=metric).inc()
+        if metric in self._metrics:
+            self._metrics[metric].retries += 1
+
+    def _observe(self, record: QueryRecord, totals: _MetricTotals) -> None:
+        if record.retries:
+            self.retries.labels(metric=record.metric).inc(record.retries)
+            totals.retries += record.retries
+        self.query_duration.labels(metric=record.metric).observe(record.seconds)
+        self.queries.labels(metric=record.metric, status="error" if record.error else "ok").inc()
+        if record.error:
+            return
+        self.response_bytes.labels(metric=record.metric).observe(record.bytes)
+        self.samples.labels(metric=record.metric).inc(record.samples)
+        totals.series_max = max(totals.series_max, record.series)
+        self.series.labels(metric=record.metric).set(totals.series_max)
+
+    def report(self) -> dict[str, Any]:
+        """Summarize the run per metric, plus the slowest individual queries."""
+
+        duration = time.monotonic() - self._started
+        metrics: dict[str, Any] = {}
+        records: list[QueryRecord] = []
+        for name, totals in self._metrics.items():
+            records.extend(totals.records)
+            latencies = np.array([record.seconds for record in totals.records], dtype=np.float64)
+            succeeded = [record for record in totals.records if record.error is None]
+            samples = sum(record.samples for record in succeeded)
+            seconds = float(latencies.sum())
+            metrics[name] = {
+                "promql": totals.promql,
+                "queries": len(totals.records),
+                "errors": len(totals.records) - len(succeeded),
+                "retries": totals.retries,
+                "samples": samples,
+                "bytes": sum(record.bytes for record in succeeded),
+                "series_max": totals.series_max,
+                "latency_seconds": _latency_summary(latencies),
+                "samples_per_second": samples / seconds if seconds else None,
+            }
+        slowest = sorted(records, key=lambda record: record.seconds, reverse=True)
+        return {
+            "version": REPORT_VERSION,
+            "started_at": self.started_at.isoformat(),
+            "duration_seconds": duration,
+            "totals": {
+                key: sum(entry[key] for entry in metrics.values())
+                for key in ("queries", "errors", "retries", "samples", "bytes")
+            },
+            "metrics": metrics,
+            "slowest_queries": [asdict(record) for record in slowest[:SLOWEST_QUERIES]],
+        }
+
+    def publish(
+        self,
+        *,
+        report_path: Path | None = None,
+        textfile_path: Path | None = None,
+        pushgateway_url: str | None = None,
+        job: str = "collector",
+    ) -> dict[str, Any]:
+        """Finish the run: update run gauges and write the report and metrics outputs."""
+
+        report = self.report()
+        self.run_duration.set(report["duration_seconds"])
+        self.last_run.set(time.time())
+        if report_path is not None:
+            report_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = report_path.with_name(f"{report_path.name}.tmp")
+            tmp_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+            os.replace(tmp_path, report_path)
+            LOGGER.info("Wrote collection report to %s", report_path)
+        if textfile_path is not None:
+            textfile_path.parent.mkdir(parents=True, exist_ok=True)
+            write_to_textfile(str(textfile_path), self.registry)
+        if pushgateway_url:
+            push_to_gateway(pushgateway_url, job=job, registry=self.registry)
+        return report
+
+
+def _latency_summary(latencies: np.ndarray) -> dict[str, float | None]:
+    if not len(latencies):
+        return {"mean": None, "p50": None, "p95": None, "max": None}
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return {
+        "mean": float(latencies.mean()),
+        "p50": float(p50),
+        "p95": float(p95),
+        "max": float(latencies.max()),
+    }
+
+
+__all__ = [
+    "CollectorInstrumentation",
+    "QueryRecord",
+    "record_query_retry",
+    "record_response_bytes",
+]
@@ -2,19 +2,40 @@
 
 from __future__ import annotations
 
+import asyncio
+import json
+import time
 from datetime import UTC, datetime, timedelta
-from typing import Any, cast
+from typing import Any, Callable, Sequence, cast
 
 import httpx
+import numpy as np
 
 from ..logging import get_logger
+from .instrumentation import record_response_bytes
+
+try:  # pragma: no cover - depends on optional dependency (the fast-json extra)
+    import orjson
+
+    _json_loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:  # pragma: no cover - depends on optional dependency
+    _json_loads = json.loads
 
 LOGGER = get_logger(__name__)
 
+QUERY_RANGE_PATH = "/api/v1/query_range"
+
 
 class PrometheusQueryError(RuntimeError):
     """Raised when Prometheus responds with an error payload."""
 
+    def __init__(
+        self, message: str, error_type: str | None = None, status_code: int | None = None
+    ) -> None:
+        super().__init__(message)
+        self.error_type = error_type
+        self.status_code = status_code
+
 
 class PrometheusClient:
     """Thin wrapper around Prometheus HTTP API."""
@@ -44,21 +65,11 @@ class PrometheusClient:
     ) -> list[dict[str, Any]]:
         """Execute a query_range request and return the raw data entries."""
 
-        params = {
-            "query": query,
-            "start": f"{start.timestamp():.3f}",
-            "end": f"{end.timestamp():.3f}",
-            "step": f"{int(step.total_seconds())}",
-        }
+        params = build_query_range_params(query, start=start, end=end, step=step)
         LOGGER.debug("Prometheus query", extra={"query": query, "params": params})
-        response = self._client.get("/api/v1/query_range", params=params)
-        response.raise_for_status()
-        payload = cast(dict[str, Any], response.json())
-        if payload.get("status") != "success":  # pragma: no cover - defensive
-            raise PrometheusQueryError(payload.get("error", "unknown error"))
-        data = cast(dict[str, Any], payload.get("data", {}))
-        result = cast(list[dict[str, Any]], data.get("result", []))
-        return result
+        response = self._client.get(QUERY_RANGE_PATH, params=params)
+        record_response_bytes(len(response.content))
+        return parse_query_range_response(response)
 
     def close(self) -> None:
         if self._owns_client:
@@ -71,10 +82,159 @@ class PrometheusClient:
         self.close()
 
 
+class AsyncRateLimiter:
+    """Spaces out request starts so that at most `rate` requests begin per second."""
+
+    def __init__(self, rate: float) -> None:
+        if rate <= 0:
+            raise ValueError("Rate limit must be positive")
+        self._interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AsyncPrometheusClient:
+    """Asynchronous counterpart of `PrometheusClient` for concurrent collection.
+
+    A single instance talks to one Prometheus host, so the optional
+    `max_requests_per_second` limit acts as a per-host rate limit shared by all
+    coroutines using the client.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        timeout_seconds: float = 10.0,
+        verify_ssl: bool = True,
+        max_connections: int | None = None,
+        max_requests_per_second: float | None = None,
+        http2: bool = False,
+        client: httpx.AsyncClient | None = None,
+    ) -> None:
+        self._owns_client = client is None
+        if client is None:
+            try:
+                client = httpx.AsyncClient(
+                    base_url=base_url,
+                    timeout=timeout_seconds,
+                    verify=verify_ssl,
+                    limits=httpx.Limits(max_connections=max_connections),
+                    http2=http2,
+                )
+            except ImportError as exc:
+                msg = "HTTP/2 requests require h2 (poetry install --extras http2)"
+                raise ImportError(msg) from exc
+        self._client = client
+        self._rate_limiter = (
+            AsyncRateLimiter(max_requests_per_second) if max_requests_per_second else None
+        )
+
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        """Execute a query_range request and return the raw data entries."""
+
+        params = build_query_range_params(query, start=start, end=end, step=step)
+        if self._rate_limiter is not None:
+            await self._rate_limiter.acquire()
+        LOGGER.debug("Prometheus query", extra={"query": query, "params": params})
+        response = await self._client.get(QUERY_RANGE_PATH, params=params)
+        record_response_bytes(len(response.content))
+        return parse_query_range_response(response)
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self._client.aclose()
+
+    async def __aenter__(self) -> "AsyncPrometheusClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+
+def build_query_range_params(
+    query: str, *, start: datetime, end: datetime, step: timedelta
+) -> dict[str, str]:
+    """Render query_range parameters in the format expected by Prometheus."""
+
+    return {
+        "query": query,
+        "start": f"{start.timestamp():.3f}",
+        "end": f"{end.timestamp():.3f}",
+        "step": f"{int(step.total_seconds())}",
+    }
+
+
+def parse_query_range_response(response: httpx.Response) -> list[dict[str, Any]]:
+    """Validate a query_range response and extract the result entries.
+
+    Prometheus reports query failures (bad data, timeouts, resolution limits) as
+    JSON error payloads, often with a 4xx/5xx status; those are surfaced as
+    `PrometheusQueryError` carrying the `errorType`.
+    """
+
+    if response.is_error:
+        try:
+            payload = cast(dict[str, Any], _json_loads(response.content))
+        except ValueError:
+            payload = {}
+        if payload.get("status") == "error":
+            raise PrometheusQueryError(
+                payload.get("error", "unknown error"),
+                payload.get("errorType"),
+                response.status_code,
+            )
+        response.raise_for_status()
+    payload = cast(dict[str, Any], _json_loads(response.content))
+    if payload.get("status") != "success":  # pragma: no cover - defensive
+        raise PrometheusQueryError(payload.get("error", "unknown error"), payload.get("errorType"))
+    data = cast(dict[str, Any], payload.get("data", {}))
+    result = cast(list[dict[str, Any]], data.get("result", []))
+    return result
+
+
+def decode_values(values: Sequence[Sequence[Any]]) -> tuple[np.ndarray, np.ndarray]:
+    """Decode a matrix series' `[[ts, "value"], ...]` pairs into NumPy columns.
+
+    Returns int64 epoch milliseconds and float64 values. Prometheus encodes
+    sample values as strings (including "NaN"/"+Inf"); `np.fromiter` fills each
+    preallocated column straight from the pairs, without intermediate lists.
+    """
+
+    count = len(values)
+    seconds = np.fromiter((pair[0] for pair in values), dtype=np.float64, count=count)
+    samples = np.fromiter((pair[1] for pair in values), dtype=np.float64, count=count)
+    return np.rint(seconds * 1000).astype(np.int64), samples
+
+
 def to_utc(dt: datetime) -> datetime:
     """Ensure datetime carries timezone info for logging clarity."""
 
     return dt.astimezone(UTC)
 
 
-__all__ = ["PrometheusClient", "PrometheusQueryError", "to_utc"]
+__all__ = [
+    "AsyncPrometheusClient",
+    "AsyncRateLimiter",
+    "PrometheusClient",
+    "PrometheusQueryError",
+    "build_query_range_params",
+    "decode_values",
+    "parse_query_range_response",
+    "to_utc",
+]
@@ -0,0 +1,313 @@
+"""Retry with jittered exponential backoff and per-endpoint circuit breaking."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Protocol
+
+import httpx
+
+from ..logging import get_logger
+from .instrumentation import record_query_retry
+from .prometheus_client import PrometheusQueryError
+
+LOGGER = get_logger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+RETRYABLE_ERROR_TYPES = frozenset({"unavailable"})
+_RETRYABLE_TRANSPORT_ERRORS = (
+    httpx.ConnectTimeout,
+    httpx.PoolTimeout,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError,
+)
+
+
+class _QueryRange(Protocol):
+    def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        """Subset of PrometheusClient wrapped with retries."""
+
+
+class _AsyncQueryRange(Protocol):
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        """Subset of AsyncPrometheusClient wrapped with retries."""
+
+
+class CircuitOpenError(PrometheusQueryError):
+    """Raised without contacting Prometheus while its circuit breaker is open."""
+
+    def __init__(self, base_url: str, remaining: float) -> None:
+        super().__init__(f"Circuit open for {base_url}; retry in {remaining:.1f}s", "unavailable")
+        self.remaining = remaining
+
+
+@dataclass(slots=True)
+class RetryPolicy:
+    """Full-jitter exponential backoff: attempt n waits U(0, min(max_delay, base * 2**n))."""
+
+    max_attempts: int = 5
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    rng: random.Random = field(default_factory=random.Random)
+
+    def delay(self, attempt: int) -> float:
+        return self.rng.uniform(0.0, min(self.max_delay, self.base_delay * 2**attempt))
+
+
+class CircuitBreaker:
+    """Fails fast after `failure_threshold` consecutive transient failures.
+
+    While open, calls are rejected until `reset_seconds` have passed; then a
+    single trial call is let through (half-open) while concurrent callers keep
+    being rejected. Its success closes the circuit, its failure reopens it for
+    another `reset_seconds`; a trial abandoned without an outcome (cancelled)
+    lets the next caller through instead.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.base_url = base_url
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        return "half-open" if self.remaining() == 0 else "open"
+
+    def remaining(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.reset_seconds - self._clock())
+
+    def before_call(self) -> None:
+        if self._opened_at is None:
+            return
+        remaining = self.remaining()
+        if remaining > 0 or self._trial_in_flight:
+            raise CircuitOpenError(self.base_url, remaining)
+        self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._opened_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                LOGGER.warning(
+                    "Opening circuit for %s after %s failures", self.base_url, self._failures
+                )
+            self._opened_at = self._clock()
+
+
+class _RetryState:
+    """Shared bookkeeping of the sync and async retrying clients."""
+
+    def __init__(self, retry: RetryPolicy, breaker: CircuitBreaker | None) -> None:
+        self.retry = retry
+        self.breaker = breaker
+
+    def before_call(self) -> None:
+        if self.breaker is not None:
+            self.breaker.before_call()
+
+    def on_success(self) -> None:
+        if self.breaker is not None:
+            self.breaker.record_success()
+
+    def on_abort(self) -> None:
+        # Cancellation says nothing about the server; just free the half-open trial.
+        if self.breaker is not None:
+            self.breaker.release_trial()
+
+    def on_failure(self, exc: Exception, attempt: int, query: str) -> float | None:
+        """Return the delay before the next attempt, or None to give up."""
+
+        retryable = is_retryable_error(exc)
+        if self.breaker is not None and not isinstance(exc, CircuitOpenError):
+            # Non-transient errors (bad PromQL, resolution limits) prove the server is up.
+            if retryable:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+        if not retryable or attempt + 1 >= self.retry.max_attempts:
+            return None
+        delay = self.retry.delay(attempt)
+        if self.breaker is not None:
+            delay = max(delay, self.breaker.remaining())
+        LOGGER.warning(
+            "Retrying %s in %.2fs (attempt %s/%s): %s",
+            query,
+            delay,
+            attempt + 2,
+            self.retry.max_attempts,
+            exc,
+        )
+        record_query_retry()
+        return delay
+
+
+class RetryingPrometheusClient:
+    """Wraps a Prometheus client with jittered retries and an optional circuit breaker."""
+
+    def __init__(
+        self,
+        client: _QueryRange,
+        *,
+        retry: RetryPolicy,
+        breaker: CircuitBreaker | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.client = client
+        self._state = _RetryState(retry, breaker)
+        self._sleep = sleep
+
+    def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        attempt = 0
+        while True:
+            try:
+                self._state.before_call()
+                result = self.client.query_range(query, start=start, end=end, step=step)
+            except Exception as exc:
+                delay = self._state.on_failure(exc, attempt, query)
+                if delay is None:
+                    raise
+                attempt += 1
+                self._sleep(delay)
+                continue
+            except BaseException:
+                self._state.on_abort()
+                raise
+            self._state.on_success()
+            return result
+
+
+class AsyncRetryingPrometheusClient:
+    """Asynchronous counterpart of `RetryingPrometheusClient`."""
+
+    def __init__(
+        self,
+        client: _AsyncQueryRange,
+        *,
+        retry: RetryPolicy,
+        breaker: CircuitBreaker | None = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.client = client
+        self._state = _RetryState(retry, breaker)
+        self._sleep = sleep
+
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        attempt = 0
+        while True:
+            try:
+                self._state.before_call()
+                result = await self.client.query_range(query, start=start, end=end, step=step)
+            except Exception as exc:
+                delay = self._state.on_failure(exc, attempt, query)
+                if delay is None:
+                    raise
+                attempt += 1
+                await self._sleep(delay)
+                continue
+            except BaseException:
+                self._state.on_abort()
+                raise
+            self._state.on_success()
+            return result
+
+
+_BREAKERS: dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker_for(
+    base_url: str, *, failure_threshold: int = 5, reset_seconds: float = 30.0
+) -> CircuitBreaker:
+    """Return the process-wide breaker of `base_url`, shared by all its clients.
+
+    The breaker keeps its state across clients, but takes the threshold and
+    reset settings of the latest one.
+    """
+
+    breaker = _BREAKERS.get(base_url)
+    if breaker is None:
+        breaker = _BREAKERS[base_url] = CircuitBreaker(base_url)
+    breaker.failure_threshold = failure_threshold
+    breaker.reset_seconds = reset_seconds
+    return breaker
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """Whether a failure is transient (connection loss, overload, restart)."""
+
+    if isinstance(exc, CircuitOpenError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    if isinstance(exc, PrometheusQueryError):
+        return exc.status_code in RETRYABLE_STATUS_CODES or exc.error_type in RETRYABLE_ERROR_TYPES
+    # Read timeouts are left to adaptive chunk splitting; retrying an oversized
+    # query as-is only repeats the timeout.
+    return isinstance(exc, _RETRYABLE_TRANSPORT_ERRORS)
+
+
+__all__ = [
+    "AsyncRetryingPrometheusClient",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "RETRYABLE_STATUS_CODES",
+    "RetryPolicy",
+    "RetryingPrometheusClient",
+    "circuit_breaker_for",
+    "is_retryable_error",
+]
@@ -0,0 +1,101 @@
+"""Persisted per-metric high-water marks used for incremental collection."""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+STATE_VERSION = 1
+
+
+@dataclass(slots=True)
+class PendingRun:
+    """A collection run that has started but not completed."""
+
+    end: float
+    checkpoints: dict[str, float] = field(default_factory=dict)
+
+
+class WatermarkStore:
+    """Keeps the last exported sample timestamp per metric in a small JSON file.
+
+    The file lives next to the raw exports so that it travels with them; it is
+    rewritten atomically to survive interrupted runs. It also tracks the run
+    in progress: its fixed end time and a checkpoint per metric, so that a run
+    that failed part-way can be resumed from the last persisted chunk.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        watermarks: dict[str, float] | None = None,
+        pending_run: PendingRun | None = None,
+    ) -> None:
+        self.path = path
+        self._watermarks: dict[str, float] = dict(watermarks or {})
+        self.pending_run = pending_run
+
+    @classmethod
+    def load(cls, path: Path) -> "WatermarkStore":
+        if not path.exists():
+            return cls(path)
+        payload = json.loads(path.read_text(encoding="utf-8"))
+        watermarks = _parse_timestamps(payload.get("watermarks", {}))
+        pending_run = None
+        if run := payload.get("pending_run"):
+            pending_run = PendingRun(
+                end=datetime.fromisoformat(run["end"]).timestamp(),
+                checkpoints=_parse_timestamps(run.get("checkpoints", {})),
+            )
+        return cls(path, watermarks, pending_run)
+
+    def get(self, metric: str) -> float | None:
+        return self._watermarks.get(metric)
+
+    def advance(self, metric: str, timestamp: float) -> None:
+        current = self._watermarks.get(metric)
+        if current is None or timestamp > current:
+            self._watermarks[metric] = timestamp
+
+    def begin_run(self, end: float) -> None:
+        self.pending_run = PendingRun(end=end)
+
+    def checkpoint(self, metric: str, timestamp: float) -> None:
+        if self.pending_run is not None:
+            self.pending_run.checkpoints[metric] = timestamp
+
+    def finish_run(self) -> None:
+        self.pending_run = None
+
+    def save(self) -> None:
+        payload: dict[str, Any] = {
+            "version": STATE_VERSION,
+            "watermarks": _format_timestamps(self._watermarks),
+        }
+        if self.pending_run is not None:
+            payload["pending_run"] = {
+                "end": datetime.fromtimestamp(self.pending_run.end, tz=UTC).isoformat(),
+                "checkpoints": _format_timestamps(self.pending_run.checkpoints),
+            }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+        tmp_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def _parse_timestamps(values: dict[str, str]) -> dict[str, float]:
+    return {metric: datetime.fromisoformat(value).timestamp() for metric, value in values.items()}
+
+
+def _format_timestamps(values: dict[str, float]) -> dict[str, str]:
+    return {
+        metric: datetime.fromtimestamp(value, tz=UTC).isoformat()
+        for metric, value in sorted(values.items())
+    }
+
+
+__all__ = ["PendingRun", "WatermarkStore"]
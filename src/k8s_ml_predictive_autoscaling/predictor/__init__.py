@@ -1 +1,16 @@
-"""Package placeholder for upcoming implementation."""
+"""Online inference helpers shared with the offline preprocessing pipeline."""
+
+from typing import Any
+
+from .transform import TransformArtifact, load_transform
+
+__all__ = ["OnlineFeatureState", "TransformArtifact", "load_transform"]
+
+
+def __getattr__(name: str) -> Any:
+    # Imported lazily so that applying a transform artifact needs neither pandas nor sklearn.
+    if name == "OnlineFeatureState":
+        from .features import OnlineFeatureState
+
+        return OnlineFeatureState
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
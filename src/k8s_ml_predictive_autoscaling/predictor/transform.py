@@ -0,0 +1,193 @@
+"""Runtime of the fitted preprocessing transform, usable without pandas or sklearn.
+
+`PreprocessingPipeline` writes a `transform.json` artifact next to its
+datasets. It records the feature column order, the lag and rolling-window
+layout, the target columns and the fitted scaler statistics as plain lists,
+together with a hash of the configuration that produced them. This module
+only needs numpy to load it and apply the scaling to feature batches.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+ARTIFACT_VERSION = 1
+ARTIFACT_FILENAME = "transform.json"
+
+
+@dataclass(slots=True)
+class AnomalyTreatment:
+    """Causal anomaly detector applied to the metric columns before feature engineering.
+
+    Attributes:
+        columns: Metric columns the detector judges, in detector order.
+        method: `rolling_mad`, `ewma` or `zscore`.
+        mode: `clip`, `impute` or `flag`.
+        threshold: Score above which a value is anomalous.
+        window: History length of `rolling_mad`, span of `ewma`.
+    """
+
+    columns: list[str]
+    method: str
+    mode: str
+    threshold: float
+    window: int
+
+
+@dataclass(slots=True)
+class TransformArtifact:
+    """Feature layout and scaler state of a preprocessing run.
+
+    Attributes:
+        config_hash: SHA-256 of the preprocessing settings the artifact depends on.
+        resample_rule: Bucket width samples must be resampled to.
+        metric_columns: Raw metric columns, in feature order.
+        feature_columns: Order of the model input features.
+        target_columns: Target columns, one per forecast step.
+        time_features: Whether calendar features follow the metric columns.
+        lags: `(column, lag)` pairs, in feature order.
+        rolling_windows: `(column, window)` pairs, in feature order.
+        scaled_columns: Feature columns standardized by the scaler.
+        mean: Scaler means of `scaled_columns`.
+        scale: Scaler standard deviations of `scaled_columns`.
+        flag_columns: `<metric>_anomaly` indicator columns following the
+            metric columns in `flag` anomaly mode.
+        anomaly: Anomaly treatment the metric columns went through, unless
+            anomalies were dropped or not treated.
+        precision: Dtype the feature rows were stored in.
+    """
+
+    config_hash: str
+    resample_rule: str
+    metric_columns: list[str]
+    feature_columns: list[str]
+    target_columns: list[str]
+    time_features: bool
+    lags: list[tuple[str, int]]
+    rolling_windows: list[tuple[str, int]]
+    scaled_columns: list[str]
+    mean: np.ndarray
+    scale: np.ndarray
+    flag_columns: list[str] = field(default_factory=list)
+    anomaly: AnomalyTreatment | None = None
+    precision: str = "float64"
+    version: int = ARTIFACT_VERSION
+    _positions: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if self.version != ARTIFACT_VERSION:
+            raise ValueError(
+                f"Unsupported transform artifact version {self.version}; "
+                f"expected {ARTIFACT_VERSION}"
+            )
+        position = {column: index for index, column in enumerate(self.feature_columns)}
+        missing = [column for column in self.scaled_columns if column not in position]
+        if missing:
+            raise ValueError(f"Scaled columns missing from feature columns: {', '.join(missing)}")
+        self._positions = np.array(
+            [position[column] for column in self.scaled_columns], dtype=np.intp
+        )
+        self.mean = np.asarray(self.mean, dtype=np.float64)
+        self.scale = np.asarray(self.scale, dtype=np.float64)
+
+    @classmethod
+    def load(cls, path: Path) -> "TransformArtifact":
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    @classmethod
+    def from_dict(cls, payload: dict[str, Any]) -> "TransformArtifact":
+        features = payload["features"]
+        scaler = payload["scaler"]
+        anomaly = payload.get("anomaly")
+        return cls(
+            version=int(payload["version"]),
+            config_hash=payload["config_hash"],
+            resample_rule=payload["resample_rule"],
+            metric_columns=list(payload["metric_columns"]),
+            feature_columns=list(payload["schema"]["features"]),
+            target_columns=list(payload["schema"]["targets"]),
+            time_features=bool(features["time_features"]),
+            lags=[(str(column), int(lag)) for column, lag in features["lags"]],
+            rolling_windows=[
+                (str(column), int(window)) for column, window in features["rolling_windows"]
+            ],
+            scaled_columns=list(scaler["columns"]),
+            mean=np.array(scaler["mean"], dtype=np.float64),
+            scale=np.array(scaler["scale"], dtype=np.float64),
+            flag_columns=list(payload.get("flag_columns", [])),
+            anomaly=None if anomaly is None else AnomalyTreatment(**anomaly),
+            precision=payload.get("precision", "float64"),
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        # Floats are written with their shortest round-tripping repr, so the
+        # statistics load back bit for bit.
+        return {
+            "version": self.version,
+            "config_hash": self.config_hash,
+            "resample_rule": self.resample_rule,
+            "metric_columns": self.metric_columns,
+            "flag_columns": self.flag_columns,
+            "anomaly": None if self.anomaly is None else asdict(self.anomaly),
+            "precision": self.precision,
+            "schema": {"features": self.feature_columns, "targets": self.target_columns},
+            "features": {
+                "time_features": self.time_features,
+                "lags": [list(pair) for pair in self.lags],
+                "rolling_windows": [list(pair) for pair in self.rolling_windows],
+            },
+            "scaler": {
+                "columns": self.scaled_columns,
+                "mean": self.mean.tolist(),
+                "scale": self.scale.tolist(),
+            },
+        }
+
+    def save(self, path: Path) -> Path:
+        path.write_text(json.dumps(self.to_dict(), indent=2), encoding="utf-8")
+        return path
+
+    def transform(self, batch: np.ndarray) -> np.ndarray:
+        """Standardize a feature batch the way the fitted scaler does.
+
+        Args:
+            batch: Array of shape `(n, features)` or `(features,)` in
+                `feature_columns` order, unscaled.
+
+        Returns:
+            New float64 array with the scaled columns standardized.
+        """
+
+        values = np.array(batch, dtype=np.float64)
+        if values.shape[-1] != len(self.feature_columns):
+            raise ValueError(
+                f"Expected {len(self.feature_columns)} features, got {values.shape[-1]}"
+            )
+        scaled = values[..., self._positions]
+        scaled -= self.mean
+        scaled /= self.scale
+        values[..., self._positions] = scaled
+        return values
+
+
+def load_transform(path: Path) -> TransformArtifact:
+    """Load `transform.json`, or the artifact inside a preprocessing output directory."""
+
+    path = Path(path)
+    if path.is_dir():
+        path = path / ARTIFACT_FILENAME
+    return TransformArtifact.load(path)
+
+
+__all__ = [
+    "ARTIFACT_FILENAME",
+    "ARTIFACT_VERSION",
+    "AnomalyTreatment",
+    "TransformArtifact",
+    "load_transform",
+]
@@ -2,5 +2,13 @@
 
 from .config import PreprocessorConfig, load_config
 from .pipeline import PreprocessingPipeline
+from .sequences import load_sequences
+from .splits import load_split
 
-__all__ = ["PreprocessorConfig", "PreprocessingPipeline", "load_config"]
+__all__ = [
+    "PreprocessorConfig",
+    "PreprocessingPipeline",
+    "load_config",
+    "load_sequences",
+    "load_split",
+]
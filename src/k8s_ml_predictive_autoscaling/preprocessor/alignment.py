@@ -0,0 +1,188 @@
+"""Single-pass alignment of long-format samples onto a fixed time grid.
+
+`align_samples` returns what `pivot_table(aggfunc="mean")` followed by
+`resample(rule).mean()` returns for fixed-duration rules, without building
+either intermediate frame. Samples are sorted once by metric and timestamp,
+then averaged per timestamp and per bucket over contiguous runs, with the
+compensated summation of pandas' group means, so the values match bit for
+bit. `fill_gaps` replaces `interpolate` + `ffill` + `bfill` with one
+`np.interp` per column and can leave gaps longer than a limit empty.
+"""
+
+from __future__ import annotations
+
+from typing import Literal, cast
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import Tick
+
+NS_PER_DAY = 86_400 * 10**9
+
+
+def align_samples(
+    frame: pd.DataFrame,
+    *,
+    rule: str,
+    timestamp_column: str,
+    metric_column: str,
+    value_column: str,
+) -> pd.DataFrame | None:
+    """Mean of every metric per `rule` bucket, as a frame indexed by bucket start.
+
+    Args:
+        frame: Long-format samples with UTC timestamps, in file order.
+        rule: Resample rule; buckets start at midnight of the first sample's
+            day, like `resample`'s default origin.
+
+    Returns:
+        The metric grid, or None when `rule` is not a fixed duration in whole
+        units of the timestamps, or no sample has a value; callers then fall
+        back to pandas.
+    """
+
+    offset = to_offset(rule)
+    stamps = pd.DatetimeIndex(frame[timestamp_column])
+    if not isinstance(offset, Tick) or str(stamps.tz) != "UTC":
+        return None
+    unit_ns = pd.Timedelta(1, unit=stamps.unit).value
+    if offset.nanos % unit_ns:
+        return None
+    step = offset.nanos // unit_ns
+    values = frame[value_column].to_numpy(dtype=np.float64)
+    codes, names = pd.factorize(frame[metric_column], sort=True)
+    # Group means skip missing values, and pivot_table drops keys left without any.
+    observed = ~np.isnan(values) & (codes >= 0)
+    if not observed.any():
+        return None
+    ticks, codes, values = stamps.values.view(np.int64)[observed], codes[observed], values[observed]
+    present = np.bincount(codes, minlength=len(names)) > 0
+    if not present.all():
+        codes = (np.cumsum(present) - 1)[codes]
+        names = names[present]
+    ticks, codes, values = _sort_by_metric_and_time(ticks, codes, values, len(names))
+
+    starts = _run_starts(codes, ticks)
+    means = group_means(values, starts)
+    ticks, codes = ticks[starts], codes[starts]
+    day = NS_PER_DAY // unit_ns
+    origin = int(ticks.min()) // day * day
+    buckets = (ticks - origin) // step
+    first = int(buckets.min())
+    starts = _run_starts(codes, buckets)
+    grid = np.full((int(buckets.max()) - first + 1, len(names)), np.nan)
+    grid[buckets[starts] - first, codes[starts]] = group_means(means, starts)
+    index = pd.date_range(
+        pd.Timestamp(origin + first * step, unit=stamps.unit, tz="UTC"),
+        periods=len(grid),
+        freq=rule,
+        unit=stamps.unit,
+        name=timestamp_column,
+    )
+    return pd.DataFrame(grid, index=index, columns=pd.Index(names, name=metric_column))
+
+
+def group_means(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Mean of each run `values[starts[i]:starts[i + 1]]`, summed in run order.
+
+    Mirrors the Kahan summation of pandas' `group_mean`, one run position at
+    a time across all runs, so results are identical to `groupby().mean()`.
+    """
+
+    sizes = np.diff(np.append(starts, len(values)))
+    # Adding the first value to a zero sum leaves no compensation, whatever it is.
+    total = 0.0 + values[starts]
+    compensation = np.zeros(len(starts))
+    active = np.arange(len(starts))
+    for position in range(1, int(sizes.max(initial=0))):
+        active = active[sizes[active] > position]
+        corrected = values[starts[active] + position] - compensation[active]
+        updated = total[active] + corrected
+        with np.errstate(invalid="ignore"):
+            error = updated - total[active] - corrected
+        # Infinite values make the compensation NaN; pandas resets it to 0.
+        error[np.isnan(error)] = 0.0
+        compensation[active] = error
+        total[active] = updated
+    means: np.ndarray = total / sizes
+    return means
+
+
+def fill_gaps(
+    frame: pd.DataFrame,
+    *,
+    method: Literal["time", "linear"],
+    max_gap: int | None = None,
+) -> pd.DataFrame:
+    """Interpolate missing values linearly and extend the edge values outwards.
+
+    Equals `interpolate(method)` + `ffill()` + `bfill()`. With `max_gap`, runs
+    of more than `max_gap` missing values, including leading and trailing
+    ones, are left missing.
+    """
+
+    values = frame.to_numpy(dtype=np.float64, copy=True)
+    if method == "time":
+        positions = cast(pd.DatetimeIndex, frame.index).values.view(np.int64)
+    else:
+        positions = np.arange(len(frame))
+    missing = np.isnan(values)
+    for column in range(values.shape[1]):
+        gaps = missing[:, column]
+        if not gaps.any() or gaps.all():
+            continue
+        known = ~gaps
+        values[gaps, column] = np.interp(positions[gaps], positions[known], values[known, column])
+    if max_gap is not None:
+        values[long_gaps(missing, max_gap)] = np.nan
+    return pd.DataFrame(values, index=frame.index, columns=frame.columns)
+
+
+def long_gaps(missing: np.ndarray, max_gap: int) -> np.ndarray:
+    """Mask of the runs of `missing` (per column) longer than `max_gap`."""
+
+    padded = np.zeros((missing.shape[0] + 2, missing.shape[1]), dtype=np.int8)
+    padded[1:-1] = missing
+    edges = np.diff(padded, axis=0)
+    marks = np.zeros(edges.shape, dtype=np.int64)
+    for column in range(missing.shape[1]):
+        starts = np.flatnonzero(edges[:, column] == 1)
+        stops = np.flatnonzero(edges[:, column] == -1)
+        long = stops - starts > max_gap
+        marks[starts[long], column] += 1
+        marks[stops[long], column] -= 1
+    mask: np.ndarray = np.cumsum(marks, axis=0)[:-1] > 0
+    return mask
+
+
+def _sort_by_metric_and_time(
+    ticks: np.ndarray, codes: np.ndarray, values: np.ndarray, metrics: int
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Order samples by metric, then time, keeping file order among equal keys."""
+
+    lowest = int(ticks.min())
+    span = int(ticks.max()) - lowest + 1
+    if metrics * span < 2**63:
+        key = codes.astype(np.int64) * span + (ticks - lowest)
+        # Raw files usually hold each metric's samples in time order already.
+        if np.all(key[1:] >= key[:-1]):
+            return ticks, codes, values
+        order = np.argsort(key, kind="stable")
+    else:
+        order = np.argsort(ticks, kind="stable")
+        order = order[np.argsort(codes[order], kind="stable")]
+    return ticks[order], codes[order], values[order]
+
+
+def _run_starts(*keys: np.ndarray) -> np.ndarray:
+    """Positions where any of the sorted `keys` changes, starting with 0."""
+
+    changed = np.zeros(len(keys[0]), dtype=bool)
+    changed[0] = True
+    for key in keys:
+        changed[1:] |= key[1:] != key[:-1]
+    return np.flatnonzero(changed)
+
+
+__all__ = ["align_samples", "fill_gaps", "group_means", "long_gaps"]
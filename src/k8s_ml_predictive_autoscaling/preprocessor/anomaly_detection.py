@@ -1,8 +1,40 @@
-"""Simple heuristics for removing anomalous rows from time-series data."""
+"""Anomaly detection and treatment for resampled time-series data.
+
+Besides the original global z-score row filter, two causal detectors judge
+each sample against the samples before it only, so they can run over a whole
+series in one vectorized pass or online, one sample at a time, with the same
+results:
+
+* ``rolling_mad`` - distance from the median of the previous `window`
+  samples, in units of their scaled median absolute deviation.
+* ``ewma`` - one-step-ahead error of an exponentially weighted mean with span
+  `window`, in units of the exponentially weighted RMS of past errors.
+
+Flagged values are then dropped with their row (the legacy behaviour),
+clipped to the threshold, imputed with the detector baseline, or kept and
+reported in `<column>_anomaly` indicator columns, so that the time grid
+lag and rolling features rely on stays intact.
+"""
 
 from __future__ import annotations
 
+from dataclasses import dataclass
+from typing import Literal
+
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+AnomalyMethod = Literal["zscore", "rolling_mad", "ewma"]
+AnomalyMode = Literal["drop", "clip", "impute", "flag"]
+
+# Makes the median absolute deviation a consistent estimator of the standard
+# deviation for normally distributed data.
+MAD_SCALE = 1.4826
+FLAG_SUFFIX = "_anomaly"
+
+# Upper bound on the window elements the rolling median copies at once.
+_MEDIAN_CHUNK_ELEMENTS = 1 << 22
 
 
 def filter_zscore(frame: pd.DataFrame, columns: list[str], threshold: float) -> pd.DataFrame:
@@ -17,17 +49,264 @@ def filter_zscore(frame: pd.DataFrame, columns: list[str], threshold: float) ->
         Filtered dataframe without extreme rows.
     """
 
-    if not columns:
-        return frame
-    present = [column for column in columns if column in frame.columns]
-    if not present:
-        return frame
-    subset = frame[present]
-    std = subset.std(ddof=0).replace(0, 1.0)
-    standardized = (subset - subset.mean()) / std
-    standardized = standardized.fillna(0.0)
-    mask = (standardized.abs() <= threshold).all(axis=1)
-    return frame.loc[mask]
+    return treat_anomalies(frame, columns, threshold=threshold)
+
+
+@dataclass(slots=True)
+class AnomalyScores:
+    """Per-sample reference level and spread of a detector, shaped like its input.
+
+    Samples without a defined, positive `scale` (warm-up, constant history,
+    missing values) are never flagged.
+    """
+
+    baseline: np.ndarray
+    scale: np.ndarray
+
+    def flags(self, values: np.ndarray, threshold: float) -> np.ndarray:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            score = np.abs(values - self.baseline) / self.scale
+        flagged: np.ndarray = (self.scale > 0) & (score > threshold)
+        return flagged
+
+    def treat(
+        self, values: np.ndarray, threshold: float, mode: AnomalyMode
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Return the treated values and the anomaly flags for `clip`, `impute` or `flag`."""
+
+        flags = self.flags(values, threshold)
+        if mode == "clip":
+            bound = threshold * self.scale
+            upper, lower = self.baseline + bound, self.baseline - bound
+            return np.where(flags, np.clip(values, lower, upper), values), flags
+        if mode == "impute":
+            return np.where(flags, self.baseline, values), flags
+        return values.copy(), flags
+
+
+def zscore_scores(values: np.ndarray) -> AnomalyScores:
+    """Global mean and population standard deviation of each column.
+
+    Columns constant up to rounding get a zero scale, with scikit-learn's
+    test for them, so none of their samples is flagged.
+    """
+
+    rows = values.shape[0]
+    with np.errstate(invalid="ignore"):
+        mean = np.nanmean(values, axis=0) if rows else np.full(values.shape[1:], np.nan)
+        std = np.nanstd(values, axis=0) if rows else np.full(values.shape[1:], np.nan)
+    count = np.count_nonzero(~np.isnan(values), axis=0)
+    variance = std * std
+    eps = np.finfo(np.float64).eps
+    std[variance <= count * eps * variance + (count * mean * eps) ** 2] = 0.0
+    return AnomalyScores(
+        baseline=np.broadcast_to(mean, values.shape), scale=np.broadcast_to(std, values.shape)
+    )
+
+
+def rolling_mad_scores(values: np.ndarray, window: int) -> AnomalyScores:
+    """Median and scaled MAD of the `window` samples preceding each row.
+
+    Args:
+        values: Array of shape `(rows, columns)`.
+        window: Number of preceding samples; the first `window` rows get NaN.
+    """
+
+    baseline = np.full(values.shape, np.nan)
+    scale = np.full(values.shape, np.nan)
+    rows = values.shape[0]
+    if rows <= window:
+        return AnomalyScores(baseline, scale)
+    # views[s] holds rows s .. s + window - 1, the history of row s + window.
+    views = sliding_window_view(values, window, axis=0)
+    step = max(1, _MEDIAN_CHUNK_ELEMENTS // (window * max(values.shape[1], 1)))
+    for start in range(0, rows - window, step):
+        stop = min(start + step, rows - window)
+        median, deviation = _median_and_mad(views[start:stop])
+        baseline[start + window : stop + window] = median
+        scale[start + window : stop + window] = MAD_SCALE * deviation
+    return AnomalyScores(baseline, scale)
+
+
+def ewma_scores(values: np.ndarray, window: int) -> AnomalyScores:
+    """Exponentially weighted mean and RMS error up to the previous row.
+
+    The mean uses `alpha = 2 / (window + 1)`; the variance is the same
+    exponential average of squared one-step-ahead errors. Rows before
+    `window` samples were seen get NaN.
+    """
+
+    alpha = 2.0 / (window + 1)
+    frame = pd.DataFrame(values)
+    mean = frame.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    errors = values[1:] - mean[:-1]
+    squared = pd.DataFrame(np.concatenate([np.full((1, values.shape[1]), np.nan), errors**2]))
+    variance = squared.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    baseline = np.full(values.shape, np.nan)
+    scale = np.full(values.shape, np.nan)
+    if values.shape[0] > window:
+        baseline[window:] = mean[window - 1 : -1]
+        scale[window:] = np.sqrt(variance[window - 1 : -1])
+    return AnomalyScores(baseline, scale)
+
+
+def detector_scores(values: np.ndarray, method: AnomalyMethod, window: int) -> AnomalyScores:
+    if method == "rolling_mad":
+        return rolling_mad_scores(values, window)
+    if method == "ewma":
+        return ewma_scores(values, window)
+    return zscore_scores(values)
+
+
+def treat_anomalies(
+    frame: pd.DataFrame,
+    columns: list[str],
+    *,
+    threshold: float,
+    method: AnomalyMethod = "zscore",
+    mode: AnomalyMode = "drop",
+    window: int = 60,
+) -> pd.DataFrame:
+    """Detect anomalies in `columns` and drop, clip, impute or flag them.
+
+    Args:
+        frame: Input dataframe on a regular time grid.
+        columns: Columns to evaluate; absent ones are ignored.
+        threshold: Score above which a value is anomalous.
+        method: Detector computing the per-sample baseline and scale.
+        mode: `drop` removes rows with any anomaly, `clip` moves anomalous
+            values to the threshold, `impute` replaces them with the
+            baseline and `flag` keeps them and adds indicator columns.
+        window: History length of `rolling_mad`, span of `ewma`.
+
+    Returns:
+        Treated dataframe; a new object unless nothing had to be evaluated.
+    """
+
+    present = [column for column in dict.fromkeys(columns) if column in frame.columns]
+    if not present:
+        return frame
+    values = frame[present].to_numpy(dtype=np.float64)
+    scores = detector_scores(values, method, window)
+    if mode == "drop":
+        keep = ~scores.flags(values, threshold).any(axis=1)
+        return frame.iloc[np.flatnonzero(keep)]
+    treated, flags = scores.treat(values, threshold, mode)
+    result = frame.copy()
+    result[present] = treated
+    if mode == "flag":
+        for position, column in enumerate(present):
+            result[f"{column}{FLAG_SUFFIX}"] = flags[:, position].astype(np.int8)
+    return result
+
+
+def _median_and_mad(windows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # Sorting many short rows is several times faster than `np.median`'s
+    # per-row partition; the middle elements are combined as `np.median` does.
+    ordered = np.sort(windows, axis=-1)
+    median = _sorted_median(ordered)
+    deviation = np.abs(ordered - median[..., None])
+    deviation.sort(axis=-1)
+    return median, _sorted_median(deviation)
+
+
+def _sorted_median(ordered: np.ndarray) -> np.ndarray:
+    middle = ordered.shape[-1] // 2
+    if ordered.shape[-1] % 2:
+        median = ordered[..., middle].copy()
+    else:
+        median = (ordered[..., middle - 1] + ordered[..., middle]) / 2
+    # NaNs sort last; like `np.median`, any missing value makes the median NaN.
+    median[np.isnan(ordered[..., -1])] = np.nan
+    return median
+
+
+class StreamingAnomalyDetector:
+    """Incremental `rolling_mad` or `ewma` detector over a fixed set of columns.
+
+    `update` judges one sample against the samples seen before it and returns
+    exactly what `treat_anomalies` returns for that row in `clip`, `impute`
+    and `flag` modes, so an online consumer cleans data like the batch
+    pipeline did.
+    """
+
+    def __init__(
+        self,
+        columns: int,
+        *,
+        method: Literal["rolling_mad", "ewma"],
+        threshold: float,
+        mode: AnomalyMode = "clip",
+        window: int = 60,
+    ) -> None:
+        if mode == "drop":
+            raise ValueError(
+                "Streaming anomaly detection cannot drop samples; use clip/impute/flag"
+            )
+        self.method = method
+        self.threshold = threshold
+        self.mode = mode
+        self.window = window
+        self._alpha = 2.0 / (window + 1)
+        self._seen = 0
+        self._history = np.full((window, columns), np.nan)
+        self._mean = np.full(columns, np.nan)
+        self._variance = np.full(columns, np.nan)
+        # Decayed weights of the last observation, mirroring pandas' `ewm(adjust=False)`.
+        self._mean_weight = np.ones(columns)
+        self._variance_weight = np.ones(columns)
+
+    def update(self, sample: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Return the treated sample and its anomaly flags, then absorb the raw sample."""
+
+        sample = np.asarray(sample, dtype=np.float64)
+        scores = self._scores()
+        treated, flags = scores.treat(sample, self.threshold, self.mode)
+        if self.method == "ewma":
+            if self._seen:
+                self._variance = self._ewm_step(
+                    self._variance, self._variance_weight, (sample - self._mean) ** 2
+                )
+            self._mean = self._ewm_step(self._mean, self._mean_weight, sample)
+        else:
+            self._history[self._seen % self.window] = sample
+        self._seen += 1
+        return treated, flags
+
+    def _scores(self) -> AnomalyScores:
+        columns = self._history.shape[1]
+        if self._seen < self.window:
+            empty = np.full(columns, np.nan)
+            return AnomalyScores(empty, empty)
+        if self.method == "ewma":
+            return AnomalyScores(self._mean.copy(), np.sqrt(self._variance))
+        median, deviation = _median_and_mad(self._history.T)
+        return AnomalyScores(median, MAD_SCALE * deviation)
+
+    def _ewm_step(self, average: np.ndarray, weight: np.ndarray, value: np.ndarray) -> np.ndarray:
+        # Same operations as pandas' adjust=False recursion, so both paths agree exactly.
+        beta = 1.0 - self._alpha
+        observed = ~np.isnan(value)
+        started = ~np.isnan(average)
+        weight[started] *= beta
+        with np.errstate(invalid="ignore"):
+            blended = (weight * average + self._alpha * value) / (weight + self._alpha)
+        blended = np.where(average == value, average, blended)
+        updated = np.where(started, blended, value)
+        weight[observed & started] = 1.0
+        return np.where(observed, updated, average)
 
 
-__all__ = ["filter_zscore"]
+__all__ = [
+    "AnomalyMethod",
+    "AnomalyMode",
+    "AnomalyScores",
+    "FLAG_SUFFIX",
+    "StreamingAnomalyDetector",
+    "detector_scores",
+    "ewma_scores",
+    "filter_zscore",
+    "rolling_mad_scores",
+    "treat_anomalies",
+    "zscore_scores",
+]
@@ -0,0 +1,253 @@
+"""On-disk cache of intermediate preprocessing stages.
+
+With `execution.cache_dir` set, `PreprocessingPipeline` keeps three stages
+between runs:
+
+* ``raw`` - the parsed samples of every raw file, stored by the SHA-256 of the
+  file content. Size and mtime spare rehashing files that were not touched.
+* ``grid`` - the resampled metric grid, with the raw files it was built from.
+  Only buckets covered by added, changed or removed files are recomputed.
+* ``features`` - the treated grid and its engineered features. Rows before the
+  first changed grid row, less the lag and rolling-window overlap, are reused.
+
+Every stage records a hash of the settings it depends on and is rebuilt from
+scratch when they change. Reused and recomputed parts are combined so that
+the result is identical to an uncached run.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import asdict, dataclass, replace
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from ..logging import get_logger
+
+LOGGER = get_logger(__name__)
+
+CACHE_VERSION = 1
+INDEX_FILENAME = "index.json"
+
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+@dataclass(slots=True)
+class RawFile:
+    """Fingerprint of a raw file and the time span of its samples (epoch ns)."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: str
+    start: int | None = None
+    stop: int | None = None
+
+
+def content_hash(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def settings_hash(*parts: Any) -> str:
+    """Hash of stage settings; library versions are included as they affect results."""
+
+    payload = [CACHE_VERSION, pd.__version__, np.__version__, *parts]
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def changed_spans(previous: list[RawFile], current: list[RawFile]) -> list[tuple[int, int]]:
+    """Sample spans of files added, removed or changed between two file lists.
+
+    A changed file contributes both its old and its new span, as buckets it
+    no longer covers have to be recomputed as well.
+    """
+
+    before = {file.path: file for file in previous}
+    after = {file.path: file for file in current}
+    spans = []
+    for path in dict.fromkeys([*before, *after]):
+        old, new = before.get(path), after.get(path)
+        if old is not None and new is not None and old.sha256 == new.sha256:
+            continue
+        for file in (old, new):
+            if file is not None and file.start is not None and file.stop is not None:
+                spans.append((file.start, file.stop))
+    return spans
+
+
+def merge_spans(spans: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Merge half-open `[start, stop)` spans that overlap or touch."""
+
+    merged: list[tuple[int, int]] = []
+    for start, stop in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+    return merged
+
+
+def first_difference(frame: pd.DataFrame, previous: pd.DataFrame) -> int:
+    """Position of the first row where `frame` and `previous` differ, bit for bit.
+
+    Returns the length of the shorter frame when one is a prefix of the other,
+    and 0 when their columns or dtypes differ.
+    """
+
+    if list(frame.columns) != list(previous.columns) or not frame.dtypes.equals(previous.dtypes):
+        return 0
+    rows = min(len(frame), len(previous))
+    differs = np.asarray(frame.index[:rows] != previous.index[:rows])
+    for position in range(frame.shape[1]):
+        current = frame.iloc[:rows, position].to_numpy()
+        cached = previous.iloc[:rows, position].to_numpy()
+        if current.dtype.kind == "f":
+            # Compare the bits, so that NaNs match and -0.0 differs from 0.0.
+            unsigned = np.dtype(f"u{current.dtype.itemsize}")
+            differs |= current.view(unsigned) != cached.view(unsigned)
+        else:
+            differs |= current != cached
+    changed = np.flatnonzero(differs)
+    return int(changed[0]) if len(changed) else rows
+
+
+class PreprocessingCache:
+    """Stage store under `root`; changes are persisted by `save`."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        index_path = root / INDEX_FILENAME
+        index: dict[str, Any] = {}
+        if index_path.exists():
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+            if index.get("version") != CACHE_VERSION:
+                LOGGER.info("Discarding preprocessing cache of version %s", index.get("version"))
+                index = {}
+        self._index = index
+
+    def raw_files(
+        self,
+        paths: list[str],
+        key: str,
+        read: Callable[[str], pd.DataFrame],
+        *,
+        timestamp_column: str,
+    ) -> list[RawFile]:
+        """Fingerprint `paths`, parsing with `read` only files not cached under `key`."""
+
+        stage = self._index.get("raw", {})
+        known = [RawFile(**entry) for entry in stage.get("files", [])]
+        if stage.get("key") != key:
+            known = []
+        by_path = {file.path: file for file in known}
+        by_hash = {file.sha256: file for file in known}
+        files: list[RawFile] = []
+        parsed = 0
+        for path in paths:
+            stat = os.stat(path)
+            previous = by_path.get(path)
+            unchanged = previous is not None and (previous.size, previous.mtime_ns) == (
+                stat.st_size,
+                stat.st_mtime_ns,
+            )
+            if previous is not None and unchanged and self._raw_path(previous.sha256).exists():
+                files.append(previous)
+                continue
+            digest = content_hash(path)
+            same = by_hash.get(digest)
+            if same is not None and self._raw_path(digest).exists():
+                files.append(replace(same, path=path, size=stat.st_size, mtime_ns=stat.st_mtime_ns))
+                continue
+            frame = read(path)
+            stamps = frame[timestamp_column]
+            self._write_frame(self._raw_path(digest), frame)
+            files.append(
+                RawFile(
+                    path=path,
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    sha256=digest,
+                    start=pd.Timestamp(stamps.min()).value if len(stamps) else None,
+                    stop=pd.Timestamp(stamps.max()).value + 1 if len(stamps) else None,
+                )
+            )
+            parsed += 1
+        LOGGER.info("Parsed %s of %s raw files, reused the rest from cache", parsed, len(paths))
+        self._index["raw"] = {"key": key, "files": [asdict(file) for file in files]}
+        return files
+
+    def raw_frame(self, file: RawFile) -> pd.DataFrame:
+        return self._read_frame(self._raw_path(file.sha256))
+
+    def load(self, stage: str, key: str) -> tuple[dict[str, pd.DataFrame], dict[str, Any]] | None:
+        """Frames and metadata stored for `stage`, unless they were built under another key."""
+
+        entry = self._index.get(stage)
+        if entry is None or entry["key"] != key:
+            return None
+        paths = {name: self.root / stage / f"{name}.pkl" for name in entry["frames"]}
+        if not all(path.exists() for path in paths.values()):
+            return None
+        return {name: self._read_frame(path) for name, path in paths.items()}, entry["meta"]
+
+    def store(
+        self, stage: str, key: str, frames: dict[str, pd.DataFrame], meta: dict[str, Any]
+    ) -> None:
+        for name, frame in frames.items():
+            self._write_frame(self.root / stage / f"{name}.pkl", frame)
+        self._index[stage] = {"key": key, "frames": list(frames), "meta": meta}
+
+    def save(self) -> None:
+        """Write the index and drop raw entries no current file refers to."""
+
+        self._index["version"] = CACHE_VERSION
+        referenced = {
+            f"{entry['sha256']}.pkl" for entry in self._index.get("raw", {}).get("files", [])
+        }
+        raw_dir = self.root / "raw"
+        if raw_dir.exists():
+            for path in raw_dir.iterdir():
+                if path.name not in referenced:
+                    path.unlink()
+        self.root.mkdir(parents=True, exist_ok=True)
+        index_path = self.root / INDEX_FILENAME
+        staging = index_path.with_suffix(".tmp")
+        staging.write_text(json.dumps(self._index, indent=2), encoding="utf-8")
+        os.replace(staging, index_path)
+
+    def _raw_path(self, digest: str) -> Path:
+        return self.root / "raw" / f"{digest}.pkl"
+
+    def _read_frame(self, path: Path) -> pd.DataFrame:
+        frame: pd.DataFrame = pd.read_pickle(path)
+        return frame
+
+    def _write_frame(self, path: Path, frame: pd.DataFrame) -> None:
+        # Replace atomically, so an interrupted run never leaves a truncated entry.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = path.with_suffix(".tmp")
+        frame.to_pickle(staging)
+        os.replace(staging, path)
+
+
+__all__ = [
+    "CACHE_VERSION",
+    "INDEX_FILENAME",
+    "PreprocessingCache",
+    "RawFile",
+    "changed_spans",
+    "content_hash",
+    "first_difference",
+    "merge_spans",
+    "settings_hash",
+]
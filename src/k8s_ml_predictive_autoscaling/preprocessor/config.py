@@ -6,7 +6,12 @@ from pathlib import Path
 from typing import Any, Literal
 
 import yaml
-from pydantic import BaseModel, Field, PositiveInt, field_validator
+from pydantic import BaseModel, Field, NonNegativeInt, PositiveInt, field_validator, model_validator
+
+from ..raw_storage import RawStorageFormat
+from .anomaly_detection import AnomalyMethod, AnomalyMode
+from .sequences import SequenceCodec, SequenceStorage, resolve_codec
+from .splits import SplitFormat
 
 DEFAULT_CONFIG_PATH = Path(__file__).with_name("config.yaml")
 
@@ -20,6 +25,9 @@ class FeatureConfig(BaseModel):
 class AnomalyConfig(BaseModel):
     enabled: bool = True
     zscore_threshold: float = 3.0
+    method: AnomalyMethod = "zscore"
+    mode: AnomalyMode = "drop"
+    window: PositiveInt = 60
 
 
 class SlidingWindowConfig(BaseModel):
@@ -27,6 +35,14 @@ class SlidingWindowConfig(BaseModel):
     forecast_steps: list[int] = Field(default_factory=lambda: [5, 15, 30])
     stride: PositiveInt = 1
     target_metric: str = "cpu_metrics"
+    storage: SequenceStorage = "npz"
+    codec: SequenceCodec | None = None
+    all_horizons: bool = True
+
+    @model_validator(mode="after")
+    def _codec_fits_storage(self) -> "SlidingWindowConfig":
+        resolve_codec(self.storage, self.codec)
+        return self
 
 
 class DatasetSplitConfig(BaseModel):
@@ -46,14 +62,83 @@ class DatasetSplitConfig(BaseModel):
         return self.train + self.validation + self.test
 
 
+def _csv_only() -> list[SplitFormat]:
+    return ["csv"]
+
+
+class SplitOutputConfig(BaseModel):
+    """File formats of the train/validation/test splits.
+
+    Every format in `formats` is written; `load_split` prefers the binary ones.
+    `float32` stores float columns as float32 in the binary formats.
+    """
+
+    formats: list[SplitFormat] = Field(default_factory=_csv_only)
+    float32: bool = False
+
+    @field_validator("formats")
+    @classmethod
+    def _distinct(cls, value: list[SplitFormat]) -> list[SplitFormat]:
+        if not value or len(set(value)) != len(value):
+            raise ValueError("split_output.formats must list at least one format, each once")
+        return value
+
+
+class WalkForwardConfig(BaseModel):
+    """Rolling-origin folds produced by `PreprocessingPipeline.walk_forward`.
+
+    Without `test_rows`, the dataset is cut into `folds + 1` blocks and every
+    block after the first is a test block. `max_train_rows` makes the training
+    window roll instead of expand; `gap` defaults to the largest forecast step,
+    so training targets never reach into the test block.
+    """
+
+    folds: PositiveInt = 5
+    test_rows: PositiveInt | None = None
+    min_train_rows: PositiveInt = 1
+    max_train_rows: PositiveInt | None = None
+    gap: NonNegativeInt | None = None
+
+
+class ExecutionConfig(BaseModel):
+    mode: Literal["memory", "chunked"] = "memory"
+    max_memory_mb: PositiveInt = 1024
+    block_rows: PositiveInt | None = None
+    raw_chunk_rows: PositiveInt | None = None
+    spill_dir: Path | None = None
+    workers: PositiveInt | None = None
+    cache_dir: Path | None = None
+
+    @field_validator("spill_dir", "cache_dir", mode="before")
+    @classmethod
+    def _expand_dir(cls, value: Any) -> Path | None:
+        return None if value is None else Path(value).expanduser()
+
+
+class SeriesConfig(BaseModel):
+    """Split the raw samples into independent series by label values.
+
+    With `group_by` empty all label sets are averaged into one series, as
+    before; otherwise every distinct combination of the `group_by` label values
+    is processed on its own and written to a `<label>=<value>/...` partition.
+    """
+
+    group_by: list[str] = Field(default_factory=list)
+
+
 class PreprocessorConfig(BaseModel):
     input_glob: str = Field(default="data/raw/*.csv")
+    raw_format: RawStorageFormat = Field(default="csv")
     timestamp_column: str = Field(default="timestamp")
     metric_column: str = Field(default="metric")
     value_column: str = Field(default="value")
+    labels_column: str = Field(default="labels")
     output_dir: Path = Field(default=Path("data/processed"))
     resample_rule: str = Field(default="1min")
+    resample_engine: Literal["grid", "pandas"] = Field(default="grid")
     interpolation_method: InterpolationMethod = Field(default="time")
+    interpolation_max_gap: PositiveInt | None = Field(default=None)
+    precision: Literal["float64", "float32"] = Field(default="float64")
     scaler_features: list[str] = Field(default_factory=list)
     metrics: list[str] = Field(
         default_factory=lambda: [
@@ -66,12 +151,32 @@ class PreprocessorConfig(BaseModel):
     anomaly: AnomalyConfig = Field(default_factory=AnomalyConfig)
     sliding_window: SlidingWindowConfig = Field(default_factory=SlidingWindowConfig)
     splits: DatasetSplitConfig = Field(default_factory=DatasetSplitConfig)
+    split_output: SplitOutputConfig = Field(default_factory=SplitOutputConfig)
+    walk_forward: WalkForwardConfig = Field(default_factory=WalkForwardConfig)
+    execution: ExecutionConfig = Field(default_factory=ExecutionConfig)
+    series: SeriesConfig = Field(default_factory=SeriesConfig)
 
     @field_validator("output_dir", mode="before")
     @classmethod
     def _expand_output_dir(cls, value: Any) -> Path:
         return Path(value).expanduser()
 
+    @model_validator(mode="after")
+    def _series_fit_in_memory(self) -> "PreprocessorConfig":
+        if self.series.group_by and self.execution.mode == "chunked":
+            raise ValueError("series.group_by requires execution.mode 'memory'")
+        return self
+
+    @model_validator(mode="after")
+    def _cache_fits_execution(self) -> "PreprocessorConfig":
+        if self.execution.cache_dir is None:
+            return self
+        if self.execution.mode == "chunked" or self.series.group_by:
+            raise ValueError(
+                "execution.cache_dir requires execution.mode 'memory' without series.group_by"
+            )
+        return self
+
 
 def load_config(path: Path | None = None) -> PreprocessorConfig:
     config_path = path or DEFAULT_CONFIG_PATH
@@ -87,6 +192,10 @@ __all__ = [
     "AnomalyConfig",
     "SlidingWindowConfig",
     "DatasetSplitConfig",
+    "SplitOutputConfig",
+    "WalkForwardConfig",
+    "ExecutionConfig",
+    "SeriesConfig",
     "DEFAULT_CONFIG_PATH",
     "InterpolationMethod",
     "load_config",
@@ -2,9 +2,21 @@
 
 from __future__ import annotations
 
-from typing import cast
+from dataclasses import dataclass
+from typing import Any, Hashable, Iterable, cast
 
+import numpy as np
 import pandas as pd
+from numpy.typing import DTypeLike
+
+TIME_FEATURES = ("hour", "day_of_week", "is_weekend", "minute_of_day")
+# Smallest integer types holding every calendar feature value (minute_of_day < 1440).
+COMPACT_TIME_DTYPES: dict[str, type[np.integer]] = {
+    "hour": np.int8,
+    "day_of_week": np.int8,
+    "is_weekend": np.int8,
+    "minute_of_day": np.int16,
+}
 
 
 def add_time_features(frame: pd.DataFrame) -> pd.DataFrame:
@@ -66,8 +78,220 @@ def add_rolling_features(
         if column not in enriched.columns:
             continue
         for window in windows:
-            enriched[f"{column}_rolling_mean_{window}"] = enriched[column].rolling(window).mean()
+            enriched[f"{column}_rolling_mean_{window}"] = rolling_mean(
+                enriched[column].to_numpy(dtype=float), window
+            )
     return enriched
 
 
-__all__ = ["add_time_features", "add_lag_features", "add_rolling_features"]
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over `window` samples, NaN until the window is full.
+
+    Unlike pandas' online rolling mean, every output is summed from its own
+    window only, so a row gets bit-identical values whether the series is
+    processed whole or in overlapping blocks.
+
+    Args:
+        values: One-dimensional float array.
+        window: Window size in samples.
+
+    Returns:
+        Array of the same length as `values`.
+    """
+
+    result = np.full(len(values), np.nan)
+    _rolling_mean_into(result, WindowSums(values), window, np.empty(len(values)))
+    return result
+
+
+class WindowSums:
+    """Trailing window sums of one series built from power-of-two partial sums.
+
+    The sum over a window of `w` samples adds the power-of-two block sums of
+    the binary expansion of `w`, so it costs O(log w) vector additions and
+    still only reads the samples inside the window. Block sums are cached, so
+    several windows over the same series share them.
+    """
+
+    def __init__(self, values: np.ndarray) -> None:
+        self.values = values
+        self._blocks: dict[int, np.ndarray] = {1: values}
+
+    def total_into(self, out: np.ndarray, window: int) -> None:
+        """Write the sums of the `len(values) - window + 1` complete windows into `out`."""
+
+        count = len(self.values) - window + 1
+        offset = 0
+        for bit in reversed(range(window.bit_length())):
+            size = 1 << bit
+            if not window & size:
+                continue
+            part = self._block(size)[offset : offset + count]
+            if offset:
+                np.add(out, part, out=out)
+            else:
+                np.copyto(out, part)
+            offset += size
+
+    def _block(self, size: int) -> np.ndarray:
+        # `_block(size)[i]` is the sum of values[i : i + size].
+        block = self._blocks.get(size)
+        if block is None:
+            half = self._block(size // 2)
+            block = self._blocks[size] = half[: len(half) - size // 2] + half[size // 2 :]
+        return block
+
+
+@dataclass(frozen=True, slots=True)
+class FeaturePlan:
+    """Column layout of engineered features, planned before any data is touched.
+
+    `compute` produces the same columns, in the same order and with the same
+    values, as `add_time_features`, `add_lag_features` and
+    `add_rolling_features` applied in sequence, but writes every lag and
+    rolling mean into one preallocated 2-D block whose columns the result
+    holds as views, instead of copying the frame for every inserted column.
+    """
+
+    time_features: bool
+    lags: tuple[tuple[str, int], ...]
+    rolling_windows: tuple[tuple[str, int], ...]
+
+    @classmethod
+    def build(
+        cls,
+        available: Iterable[str],
+        columns: list[str],
+        *,
+        lags: list[int],
+        rolling_windows: list[int],
+        time_features: bool = True,
+    ) -> "FeaturePlan":
+        """Plan features for the `columns` present among `available`."""
+
+        present = set(available)
+        sources = [column for column in dict.fromkeys(columns) if column in present]
+        return cls(
+            time_features=time_features,
+            lags=tuple((column, lag) for column in sources for lag in dict.fromkeys(lags)),
+            rolling_windows=tuple(
+                (column, window) for column in sources for window in dict.fromkeys(rolling_windows)
+            ),
+        )
+
+    @property
+    def names(self) -> list[str]:
+        names = list(TIME_FEATURES) if self.time_features else []
+        names.extend(f"{column}_lag_{lag}" for column, lag in self.lags)
+        names.extend(f"{column}_rolling_mean_{window}" for column, window in self.rolling_windows)
+        return names
+
+    @property
+    def history(self) -> int:
+        """Number of preceding rows a feature row depends on."""
+
+        return max(
+            [
+                *(lag for _, lag in self.lags),
+                *(window - 1 for _, window in self.rolling_windows),
+                0,
+            ]
+        )
+
+    def compute(
+        self, frame: pd.DataFrame, *, dtype: DTypeLike = np.float64, compact_time: bool = False
+    ) -> pd.DataFrame:
+        """Return `frame` followed by the planned feature columns.
+
+        Args:
+            frame: Input dataframe indexed by datetime.
+            dtype: Float dtype of the lag and rolling block; sums are always
+                accumulated in float64.
+            compact_time: Store calendar features in `COMPACT_TIME_DTYPES`.
+
+        Returns:
+            New dataframe sharing `frame`'s columns and the feature block.
+        """
+
+        rows = len(frame)
+        numeric = [f"{column}_lag_{lag}" for column, lag in self.lags]
+        numeric.extend(f"{column}_rolling_mean_{window}" for column, window in self.rolling_windows)
+        # Fortran order keeps every feature column contiguous, both for the column-wise
+        # kernels and for the result, which holds each of them as a view.
+        block = np.empty((rows, len(numeric)), dtype=dtype, order="F")
+        sources = {
+            column: frame[column].to_numpy(dtype=np.float64)
+            for column in dict.fromkeys(column for column, _ in (*self.lags, *self.rolling_windows))
+        }
+        for position, (column, lag) in enumerate(self.lags):
+            _shift_into(block[:, position], sources[column], lag)
+        scratch = np.empty(rows)
+        sums: dict[str, WindowSums] = {}
+        for position, (column, window) in enumerate(self.rolling_windows, start=len(self.lags)):
+            if column not in sums:
+                sums = {column: WindowSums(sources[column])}
+            _rolling_mean_into(block[:, position], sums[column], window, scratch)
+        columns: dict[Hashable, Any] = {name: frame[name] for name in frame.columns}
+        if self.time_features:
+            index = cast(pd.DatetimeIndex, frame.index)
+            columns.update(time_feature_frame(index, compact=compact_time).items())
+        columns.update(zip(numeric, block.T))
+        # Unlike `pd.concat`, which consolidates and so copies, this keeps every column a view.
+        return pd.DataFrame(columns, index=frame.index, copy=False)
+
+
+def time_feature_frame(index: pd.DatetimeIndex, *, compact: bool = False) -> pd.DataFrame:
+    """Calendar features of `index` with the dtypes `add_time_features` produces.
+
+    With `compact`, the columns use `COMPACT_TIME_DTYPES` instead.
+    """
+
+    hour = index.hour.to_numpy()
+    day_of_week = index.dayofweek.to_numpy()
+    features = pd.DataFrame(
+        {
+            "hour": hour,
+            "day_of_week": day_of_week,
+            "is_weekend": (day_of_week >= 5).astype(int),
+            "minute_of_day": hour * 60 + index.minute.to_numpy(),
+        },
+        index=index,
+    )
+    return features.astype(COMPACT_TIME_DTYPES) if compact else features
+
+
+def _shift_into(out: np.ndarray, values: np.ndarray, lag: int) -> None:
+    rows = len(values)
+    if abs(lag) >= rows:
+        out[:] = np.nan
+    elif lag >= 0:
+        out[:lag] = np.nan
+        out[lag:] = values[: rows - lag]
+    else:
+        out[rows + lag :] = np.nan
+        out[: rows + lag] = values[-lag:]
+
+
+def _rolling_mean_into(out: np.ndarray, sums: WindowSums, window: int, scratch: np.ndarray) -> None:
+    # Sums are accumulated in a reusable float64 buffer whatever the dtype of `out`.
+    count = len(sums.values) - window + 1
+    if count <= 0:
+        out[:] = np.nan
+        return
+    total = scratch[:count]
+    sums.total_into(total, window)
+    out[: window - 1] = np.nan
+    np.divide(total, window, out=out[window - 1 :], casting="same_kind")
+
+
+__all__ = [
+    "COMPACT_TIME_DTYPES",
+    "FeaturePlan",
+    "TIME_FEATURES",
+    "WindowSums",
+    "add_time_features",
+    "add_lag_features",
+    "add_rolling_features",
+    "rolling_mean",
+    "time_feature_frame",
+]
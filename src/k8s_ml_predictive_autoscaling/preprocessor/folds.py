@@ -0,0 +1,183 @@
+"""Walk-forward (rolling-origin) folds over one engineered dataset.
+
+`PreprocessingPipeline.walk_forward` computes features and targets once and
+hands the unscaled dataset to `WalkForwardFolds`. Folds are plain row ranges
+over that shared frame: fold `k` tests on the `k`-th of the last `folds`
+blocks of `test_rows` rows and trains on the rows before it, less a `gap`.
+The scaler statistics of every training range come from prefix sums of the
+scaled columns, so they cost O(columns) per fold, and the scaled frames are
+only built when a fold is accessed.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterator, Literal
+
+import numpy as np
+import pandas as pd
+
+from .sequences import window_ends, window_view
+
+
+@dataclass(frozen=True, slots=True)
+class Fold:
+    """Row ranges of one fold; `train` always ends `gap` rows before `test` starts."""
+
+    number: int
+    train: range
+    test: range
+
+
+def fold_bounds(
+    rows: int,
+    *,
+    folds: int,
+    test_rows: int | None = None,
+    min_train_rows: int = 1,
+    max_train_rows: int | None = None,
+    gap: int = 0,
+) -> list[Fold]:
+    """Rolling-origin folds over `rows` rows, like scikit-learn's `TimeSeriesSplit`.
+
+    Args:
+        rows: Length of the dataset.
+        folds: Number of folds.
+        test_rows: Rows per test block; `rows // (folds + 1)` when None.
+        min_train_rows: Smallest acceptable training range.
+        max_train_rows: Cap on the training range, making the window roll
+            instead of expand.
+        gap: Rows left out between the training and the test range, so that
+            targets of training rows do not look into the test block.
+
+    Raises:
+        ValueError: When the dataset is too short for the requested folds.
+    """
+
+    size = test_rows or rows // (folds + 1)
+    first_test = rows - folds * size
+    if size < 1 or first_test - gap < min_train_rows:
+        raise ValueError(
+            f"{rows} rows cannot hold {folds} test blocks of {size} rows after "
+            f"{min_train_rows} training rows and a gap of {gap}"
+        )
+    bounds = []
+    for number in range(folds):
+        test_start = first_test + number * size
+        train_stop = test_start - gap
+        train_start = 0 if max_train_rows is None else max(0, train_stop - max_train_rows)
+        bounds.append(
+            Fold(number, range(train_start, train_stop), range(test_start, test_start + size))
+        )
+    return bounds
+
+
+class WalkForwardFolds:
+    """Lazily scaled folds over a shared, unscaled dataset; each fold is built once.
+
+    Args:
+        dataset: Features and targets indexed by timestamp, without missing values.
+        scaled_columns: Columns standardized with statistics of each fold's
+            training range, like the pipeline's `StandardScaler`.
+        folds: Fold row ranges, from `fold_bounds`.
+    """
+
+    def __init__(self, dataset: pd.DataFrame, scaled_columns: list[str], folds: list[Fold]) -> None:
+        self.dataset = dataset
+        self.scaled_columns = scaled_columns
+        self.folds = folds
+        self._data: dict[int, FoldData] = {}
+        values = dataset[scaled_columns].to_numpy(dtype=np.float64)
+        # Sums of squares are taken around the overall mean to limit cancellation.
+        self._shift = values.mean(axis=0) if len(values) else np.zeros(len(scaled_columns))
+        centered = values - self._shift
+        self._sums = _prefix_sums(centered)
+        self._squares = _prefix_sums(centered * centered)
+
+    def __len__(self) -> int:
+        return len(self.folds)
+
+    def __getitem__(self, number: int) -> "FoldData":
+        fold = self.folds[number]
+        if fold.number not in self._data:
+            self._data[fold.number] = FoldData(self, fold)
+        return self._data[fold.number]
+
+    def __iter__(self) -> Iterator["FoldData"]:
+        return (self[index] for index in range(len(self.folds)))
+
+    def statistics(self, rows: range) -> tuple[np.ndarray, np.ndarray]:
+        """Mean and scale of the scaled columns over `rows`, as `StandardScaler` fits them."""
+
+        count = len(rows)
+        mean = (self._sums[rows.stop] - self._sums[rows.start]) / count
+        squares = (self._squares[rows.stop] - self._squares[rows.start]) / count
+        variance = np.maximum(squares - mean * mean, 0.0)
+        mean = mean + self._shift
+        scale = np.sqrt(variance)
+        # Constant columns are left unscaled, with scikit-learn's test for them.
+        eps = np.finfo(np.float64).eps
+        scale[variance <= count * eps * variance + (count * mean * eps) ** 2] = 1.0
+        return mean, scale
+
+
+class FoldData:
+    """One fold; frames are scaled on first access and kept for later calls."""
+
+    def __init__(self, folds: WalkForwardFolds, fold: Fold) -> None:
+        self._folds = folds
+        self.fold = fold
+
+    @cached_property
+    def scaler(self) -> tuple[np.ndarray, np.ndarray]:
+        """Mean and scale of `scaled_columns` over the training range."""
+
+        return self._folds.statistics(self.fold.train)
+
+    @cached_property
+    def train(self) -> pd.DataFrame:
+        return self._scaled(self.fold.train)
+
+    @cached_property
+    def test(self) -> pd.DataFrame:
+        return self._scaled(self.fold.test)
+
+    def sequences(
+        self,
+        split: Literal["train", "test"],
+        *,
+        feature_columns: list[str],
+        target_column: str,
+        sequence_length: int,
+        stride: int = 1,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Windows and targets of the `train` or `test` frame, as `build_sequences` makes them.
+
+        The windows are a read-only view over the fold's feature matrix.
+        """
+
+        frame = self.train if split == "train" else self.test
+        values = frame[feature_columns].to_numpy()
+        ends = window_ends(len(frame), sequence_length, stride)
+        targets = frame[target_column].to_numpy()[ends]
+        return window_view(values, sequence_length, stride), targets
+
+    def _scaled(self, rows: range) -> pd.DataFrame:
+        columns = self._folds.scaled_columns
+        frame = self._folds.dataset.iloc[rows.start : rows.stop].copy()
+        mean, scale = self.scaler
+        values = frame[columns].to_numpy()
+        # Float columns keep their precision, as with `StandardScaler.transform`.
+        dtype = values.dtype if values.dtype.kind == "f" else np.dtype(np.float64)
+        frame[columns] = ((values.astype(np.float64) - mean) / scale).astype(dtype)
+        return frame
+
+
+def _prefix_sums(values: np.ndarray) -> np.ndarray:
+    sums = np.zeros((len(values) + 1, values.shape[1]))
+    np.cumsum(values, axis=0, out=sums[1:])
+    return sums
+
+
+__all__ = ["Fold", "FoldData", "WalkForwardFolds", "fold_bounds"]
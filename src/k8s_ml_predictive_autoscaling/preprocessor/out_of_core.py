@@ -0,0 +1,166 @@
+"""Building blocks of the out-of-core (chunked) preprocessing mode.
+
+The time axis is processed in blocks. Raw samples are first partitioned into
+time shards on disk, each spanning a whole number of resample buckets, so that
+every bucket is aggregated from exactly the rows the in-memory path would see,
+in the same order. Engineered features are then computed over row blocks
+extended by the history (lags, rolling windows) and horizon (targets) they
+depend on, and the outputs are appended block by block.
+"""
+
+from __future__ import annotations
+
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from ..logging import get_logger
+
+LOGGER = get_logger(__name__)
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_DAY = 86_400 * NS_PER_SECOND
+SHARD_SECONDS = 3_600
+MIN_BLOCK_ROWS = 256
+
+# Rough working-set estimates used to turn the memory ceiling into block sizes:
+# a parsed raw row (timestamp, object metric name, value) plus its sorted and
+# pivoted copies, and the number of copies of a feature block alive while it
+# is engineered, filtered, scaled and written.
+_RAW_ROW_BYTES = 256
+_FEATURE_BLOCK_COPIES = 6
+
+
+def fixed_frequency_ns(rule: str) -> int:
+    """Return the bucket width of `rule`, which must be whole seconds dividing a day.
+
+    Such buckets line up with the same epoch-anchored grid whatever day the
+    data starts on, which lets shards be cut without knowing the first sample.
+    """
+
+    offset = to_offset(rule)
+    if not isinstance(offset, pd.offsets.Tick):
+        raise ValueError(f"Chunked preprocessing needs a fixed resample_rule, got {rule!r}")
+    nanos = int(offset.nanos)
+    if nanos % NS_PER_SECOND or NS_PER_DAY % nanos:
+        raise ValueError(
+            f"Chunked preprocessing needs a resample_rule of whole seconds that divides a day, "
+            f"got {rule!r}"
+        )
+    return nanos
+
+
+@dataclass(slots=True)
+class MemoryBudget:
+    """Turns the configured memory ceiling into raw chunk and feature block sizes."""
+
+    max_bytes: int
+
+    def raw_chunk_rows(self) -> int:
+        # The chunk being read and the shard block being pivoted are alive together.
+        return max(MIN_BLOCK_ROWS, self.max_bytes // (2 * _RAW_ROW_BYTES))
+
+    def block_rows(
+        self, *, resident_bytes: int, columns: int, sequence_bytes_per_row: float
+    ) -> int:
+        per_row = columns * 8 * _FEATURE_BLOCK_COPIES + sequence_bytes_per_row
+        rows = int((self.max_bytes - resident_bytes) // per_row)
+        if rows < MIN_BLOCK_ROWS:
+            LOGGER.warning(
+                "Memory ceiling of %.0f MiB leaves room for %s rows per block; using %s",
+                self.max_bytes / 2**20,
+                max(rows, 0),
+                MIN_BLOCK_ROWS,
+            )
+            return MIN_BLOCK_ROWS
+        return rows
+
+
+class RawSpill:
+    """Partitions raw rows into time shards on disk, preserving their arrival order.
+
+    Each shard file is a stream of pickled frames appended as chunks arrive, so
+    reading a shard back yields its rows in the order `read_raw` returns them.
+    """
+
+    def __init__(self, directory: Path, *, timestamp_column: str, shard_ns: int) -> None:
+        self.directory = directory
+        self.timestamp_column = timestamp_column
+        self.shard_ns = shard_ns
+        self.rows: dict[int, int] = {}
+
+    @classmethod
+    def for_frequency(cls, directory: Path, *, timestamp_column: str, bucket_ns: int) -> "RawSpill":
+        buckets = max(1, SHARD_SECONDS * NS_PER_SECOND // bucket_ns)
+        return cls(directory, timestamp_column=timestamp_column, shard_ns=buckets * bucket_ns)
+
+    def add(self, frame: pd.DataFrame) -> None:
+        stamps = pd.DatetimeIndex(frame[self.timestamp_column]).as_unit("ns").values.view(np.int64)
+        shards = stamps // self.shard_ns
+        order = np.argsort(shards, kind="stable")
+        bounds = np.flatnonzero(np.diff(shards[order])) + 1
+        for positions in np.split(order, bounds):
+            if not len(positions):
+                continue
+            shard = int(shards[positions[0]])
+            with self._path(shard).open("ab") as handle:
+                pickle.dump(frame.iloc[positions], handle, protocol=pickle.HIGHEST_PROTOCOL)
+            self.rows[shard] = self.rows.get(shard, 0) + len(positions)
+
+    def blocks(self, max_rows: int) -> Iterator[pd.DataFrame]:
+        """Yield consecutive shards grouped into frames of roughly `max_rows` rows."""
+
+        pending: list[pd.DataFrame] = []
+        count = 0
+        for shard in sorted(self.rows):
+            pending.extend(self._load(shard))
+            count += self.rows[shard]
+            if count >= max_rows:
+                yield pd.concat(pending, ignore_index=True)
+                pending, count = [], 0
+        if pending:
+            yield pd.concat(pending, ignore_index=True)
+
+    def _load(self, shard: int) -> Iterator[pd.DataFrame]:
+        with self._path(shard).open("rb") as handle:
+            while True:
+                try:
+                    yield pickle.load(handle)
+                except EOFError:
+                    return
+
+    def _path(self, shard: int) -> Path:
+        return self.directory / f"shard-{shard}.pkl"
+
+
+def row_blocks(total: int, block_rows: int) -> list[tuple[int, int]]:
+    if total == 0:
+        return [(0, 0)]
+    return [(start, min(start + block_rows, total)) for start in range(0, total, block_rows)]
+
+
+class SplitCsvWriter:
+    """Appends blocks of one split to a CSV identical to a single `to_csv` call."""
+
+    def __init__(self, path: Path, columns: pd.DataFrame, *, index_label: str) -> None:
+        self.path = path
+        self.index_label = index_label
+        columns.iloc[:0].to_csv(path, index_label=index_label)
+
+    def append(self, frame: pd.DataFrame) -> None:
+        if len(frame):
+            frame.to_csv(self.path, mode="a", header=False, index_label=self.index_label)
+
+
+__all__ = [
+    "MemoryBudget",
+    "RawSpill",
+    "SplitCsvWriter",
+    "fixed_frequency_ns",
+    "row_blocks",
+]
@@ -3,129 +3,777 @@
 from __future__ import annotations
 
 import argparse
+import cProfile
+import functools
 import glob
+import hashlib
+import json
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
 from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Literal, TypeVar, cast
 
 import joblib
 import numpy as np
 import pandas as pd
+from numpy.typing import DTypeLike
 from sklearn.preprocessing import StandardScaler
 
 from ..logging import get_logger
-from .anomaly_detection import filter_zscore
-from .config import InterpolationMethod, PreprocessorConfig, load_config
-from .feature_engineering import add_lag_features, add_rolling_features, add_time_features
+from ..predictor.transform import ARTIFACT_FILENAME, AnomalyTreatment, TransformArtifact
+from ..raw_storage import iter_raw, read_raw
+from .alignment import align_samples, fill_gaps, long_gaps
+from .anomaly_detection import FLAG_SUFFIX, treat_anomalies
+from .cache import (
+    PreprocessingCache,
+    RawFile,
+    changed_spans,
+    first_difference,
+    merge_spans,
+    settings_hash,
+)
+from .config import InterpolationMethod, PreprocessorConfig, SeriesConfig, load_config
+from .feature_engineering import FeaturePlan
+from .folds import WalkForwardFolds, fold_bounds
+from .out_of_core import MemoryBudget, RawSpill, fixed_frequency_ns, row_blocks
+from .profiling import PROFILE_FILENAME, StageProfiler, compare_profiles, load_profile
+from .sequences import (
+    SequenceJob,
+    SequenceWriter,
+    sequence_path,
+    window_ends,
+    window_view,
+    write_sequences,
+)
+from .splits import SplitWriter, split_key, split_path
 
 LOGGER = get_logger(__name__)
 
+# Partition value of series whose labels lack a `series.group_by` key.
+MISSING_LABEL = "__missing__"
+
+_Stage = TypeVar("_Stage", bound=Callable[..., pd.DataFrame])
+
+
+def _profiled(name: str) -> Callable[[_Stage], _Stage]:
+    """Measure a pipeline method returning a frame as stage `name` of its profiler."""
+
+    def decorate(method: _Stage) -> _Stage:
+        @functools.wraps(method)
+        def wrapper(self: PreprocessingPipeline, *args: Any, **kwargs: Any) -> pd.DataFrame:
+            with self.profiler.stage(name) as stage:
+                result: pd.DataFrame = method(self, *args, **kwargs)
+                stage.record(result)
+            return result
+
+        return cast(_Stage, wrapper)
+
+    return decorate
+
 
 class PreprocessingPipeline:
-    """Transforms raw Prometheus extracts into ML-ready datasets."""
+    """Transforms raw Prometheus extracts into ML-ready datasets.
+
+    Args:
+        config: Preprocessing settings.
+        profiler: Collects the per-stage profile `run` writes to `profile.json`;
+            a default one, without memory tracing, when None.
+    """
 
-    def __init__(self, config: PreprocessorConfig) -> None:
+    def __init__(self, config: PreprocessorConfig, profiler: StageProfiler | None = None) -> None:
         self.config = config
+        self.profiler = profiler or StageProfiler()
         self.scaler = StandardScaler()
+        self._artifacts: dict[str, dict[str, Any]] = {}
+        self._columns: list[str] = []
+
+    def run(self, raw: pd.DataFrame | None = None) -> dict[str, Path]:
+        """Build every dataset artifact and return their paths by key, `profile` last.
+
+        Args:
+            raw: Long-format samples to process instead of the files matching
+                `input_glob`; supported in memory mode without series grouping.
+        """
 
-    def run(self) -> dict[str, Path]:
+        self.profiler.start()
+        try:
+            with self.profiler.stage("run"):
+                outputs = self._run(raw)
+        finally:
+            self.profiler.stop()
+        outputs["profile"] = self.profiler.write(
+            self.config.output_dir / PROFILE_FILENAME,
+            execution_mode=self.config.execution.mode,
+            resample_rule=self.config.resample_rule,
+        )
+        return outputs
+
+    def _run(self, raw: pd.DataFrame | None = None) -> dict[str, Path]:
+        if self.config.series.group_by:
+            if raw is not None:
+                raise ValueError("Raw samples cannot be passed when series.group_by is set")
+            return self._run_series()
         LOGGER.info("Starting preprocessing pipeline")
-        frame = self._load_raw()
-        frame = self._resample(frame)
-        if self.config.anomaly.enabled:
-            frame = filter_zscore(
-                frame,
-                self.config.metrics,
-                self.config.anomaly.zscore_threshold,
+        self._artifacts = {}
+        if self.config.execution.mode == "chunked":
+            if raw is not None:
+                raise ValueError("Chunked execution reads the raw files itself")
+            outputs = self._run_chunked()
+        else:
+            outputs = self._run_in_memory(raw)
+        with self.profiler.stage("write_artifacts"):
+            scaler_path = self.config.output_dir / "scaler.pkl"
+            joblib.dump(self.scaler, scaler_path)
+            outputs["scaler"] = scaler_path
+            self._artifacts["scaler"] = {
+                "kind": "scaler",
+                "features": [str(name) for name in self.scaler.feature_names_in_],
+            }
+            artifact = self.transform_artifact(self._columns)
+            outputs["transform"] = artifact.save(self.config.output_dir / ARTIFACT_FILENAME)
+            self._artifacts["transform"] = {
+                "kind": "transform",
+                "version": artifact.version,
+                "config_hash": artifact.config_hash,
+            }
+            outputs["manifest"] = self._write_manifest(outputs)
+        LOGGER.info(
+            "Preprocessing finished",
+            extra={"outputs": {k: str(v) for k, v in outputs.items()}},
+        )
+        return outputs
+
+    def walk_forward(self, raw: pd.DataFrame | None = None) -> WalkForwardFolds:
+        """In-memory rolling-origin folds over one feature set, each with its own scaler.
+
+        Args:
+            raw: Long-format samples to use instead of the files matching
+                `input_glob`.
+        """
+
+        if self.config.series.group_by:
+            raise ValueError("Walk-forward folds are built for a single series")
+        if self.config.execution.mode == "chunked":
+            raise ValueError(
+                "Walk-forward folds need the whole feature dataset in memory; "
+                "use execution.mode=memory"
             )
-        frame = self._engineer_features(frame)
-        dataset = self._build_targets(frame)
-        dataset = dataset.dropna()
+        dataset = self._dataset(raw)
+        settings = self.config.walk_forward
+        gap = settings.gap
+        if gap is None:
+            gap = max(self.config.sliding_window.forecast_steps)
+        folds = fold_bounds(
+            len(dataset),
+            folds=settings.folds,
+            test_rows=settings.test_rows,
+            min_train_rows=settings.min_train_rows,
+            max_train_rows=settings.max_train_rows,
+            gap=gap,
+        )
+        LOGGER.info("Built %s walk-forward folds over %s rows", len(folds), len(dataset))
+        return WalkForwardFolds(dataset, self._determine_scaler_features(dataset), folds)
+
+    def _dataset(self, raw: pd.DataFrame | None = None) -> pd.DataFrame:
+        """Unscaled features and targets of the in-memory path, complete rows only."""
+
+        cache_dir = self.config.execution.cache_dir
+        if raw is None and cache_dir is not None:
+            frame = self._load_features_cached(PreprocessingCache(cache_dir))
+        else:
+            frame = self._filter_anomalies(self._fill_gaps(self._load_grid(raw)))
+            frame = self._engineer_features(frame)
+        dataset = self._build_targets(frame).dropna()
+        self._ensure_complete_rows(len(dataset))
+        return dataset
+
+    def _run_in_memory(self, raw: pd.DataFrame | None = None) -> dict[str, Path]:
+        dataset = self._dataset(raw)
+        self._columns = list(dataset.columns)
         features = self._determine_scaler_features(dataset)
-        dataset[features] = self.scaler.fit_transform(dataset[features])
+        with self.profiler.stage("scale") as stage:
+            dataset[features] = self.scaler.fit_transform(dataset[features])
+            stage.record(dataset)
         splits = self._split(dataset)
         outputs = self._persist_splits(splits)
         outputs.update(self._persist_sequences(dataset, splits))
-        scaler_path = self.config.output_dir / "scaler.pkl"
-        joblib.dump(self.scaler, scaler_path)
-        outputs["scaler"] = scaler_path
+        return outputs
+
+    def _run_chunked(self) -> dict[str, Path]:
+        """Out-of-core variant of `_run_in_memory` producing identical outputs.
+
+        Only the metric grid stays in memory; the rest runs over row blocks in two passes.
+        """
+
+        execution = self.config.execution
+        budget = MemoryBudget(execution.max_memory_mb * 2**20)
+        frame = self._filter_anomalies(self._fill_gaps(self._load_resampled_chunked(budget)))
+        header = self._feature_block(frame, 0, 0)
+        self._columns = list(header.columns)
+        feature_cols, main_target = self._sequence_columns(list(header.columns))
+        if main_target not in header.columns:
+            raise KeyError(f"Target column {main_target} not found in frame")
+        features = self._determine_scaler_features(header)
+        sliding = self.config.sliding_window
+        window_rows = (
+            1 if sliding.storage == "indexed" else sliding.sequence_length / sliding.stride
+        )
+        itemsize = np.dtype(self.config.precision).itemsize
+        block_rows = execution.block_rows or budget.block_rows(
+            resident_bytes=int(frame.memory_usage(deep=True).sum())
+            + 2 * len(frame) * len(features) * itemsize,
+            columns=len(header.columns),
+            sequence_bytes_per_row=2 * window_rows * len(feature_cols) * itemsize,
+        )
+        blocks = row_blocks(len(frame), block_rows)
+        LOGGER.info("Processing %s rows in %s blocks of %s", len(frame), len(blocks), block_rows)
+
+        # Features and targets are computed again in the second pass, so the
+        # `features` and `targets` stages count every block twice.
+        with self.profiler.stage("fit_scaler") as stage:
+            fit_columns: dict[str, list[np.ndarray]] = {column: [] for column in features}
+            total = 0
+            for start, stop in blocks:
+                block = self._feature_block(frame, start, stop)
+                total += len(block)
+                for column in features:
+                    fit_columns[column].append(block[column].to_numpy())
+            self._ensure_complete_rows(total)
+            fitted = pd.DataFrame(
+                {column: np.concatenate(parts) for column, parts in fit_columns.items()}
+            )
+            self.scaler.fit(fitted)
+            stage.record(fitted)
+            del fit_columns, fitted
+
+        self.config.output_dir.mkdir(parents=True, exist_ok=True)
+        train_end, val_end = self._split_bounds(total)
+        bounds = {
+            "train": (0, train_end),
+            "validation": (train_end, val_end),
+            "test": (val_end, total),
+        }
+        split_writers = {
+            name: self._split_writers(name, header, end - start)
+            for name, (start, end) in bounds.items()
+        }
+        sequence_writers = {
+            name: {
+                key: self._sequence_writer(key, end - start, feature_cols, target)
+                for key, (_, target) in self._sequence_targets(name).items()
+            }
+            for name, (start, end) in bounds.items()
+        }
+        offset = 0
+        for start, stop in blocks:
+            block = self._feature_block(frame, start, stop)
+            if block.empty:
+                continue
+            with self.profiler.stage("scale") as stage:
+                block[features] = self.scaler.transform(block[features])
+                stage.record(block)
+            parts = {
+                name: block.iloc[max(split_start - offset, 0) : max(split_end - offset, 0)]
+                for name, (split_start, split_end) in bounds.items()
+            }
+            with self.profiler.stage("write_splits"):
+                for name, part in parts.items():
+                    for split_writer in split_writers[name].values():
+                        split_writer.append(part)
+            with self.profiler.stage("write_sequences"):
+                for name, part in parts.items():
+                    for sequence_writer in sequence_writers[name].values():
+                        sequence_writer.append(part)
+            offset += len(block)
+
+        outputs: dict[str, Path] = {}
+        with self.profiler.stage("write_splits"):
+            for name, split_group in split_writers.items():
+                for key, split_writer in split_group.items():
+                    outputs[key] = split_writer.path
+                    self._artifacts[key] = {"kind": "split", "split": name, **split_writer.close()}
+        with self.profiler.stage("write_sequences"):
+            for name, writers in sequence_writers.items():
+                for key, sequence_writer in writers.items():
+                    outputs[key] = sequence_writer.close()
+                    entry = self._sequence_entry(name, key, sequence_writer.describe())
+                    self._artifacts[key] = entry
+        return outputs
+
+    def _run_series(self) -> dict[str, Path]:
+        """Run every label series on its own into its `<label>=<value>/...` partition."""
+
+        group_by = self.config.series.group_by
+        LOGGER.info("Starting preprocessing pipeline per %s series", ", ".join(group_by))
+        jobs: list[SeriesJob] = []
+        series: list[dict[str, Any]] = []
+        partitions: dict[Path, dict[str, str]] = {}
+        for labels, samples in self._iter_series(self._read_raw(with_labels=True)):
+            partition = Path(*(f"{key}={_partition_value(labels[key])}" for key in group_by))
+            if partition in partitions:
+                raise ValueError(
+                    f"Series {partitions[partition]} and {labels} share partition {partition}"
+                )
+            partitions[partition] = labels
+            entry: dict[str, Any] = {
+                "labels": labels,
+                "path": partition.as_posix(),
+                "samples": len(samples),
+            }
+            series.append(entry)
+            present = set(samples[self.config.metric_column].unique())
+            missing = [metric for metric in self.config.metrics if metric not in present]
+            if missing:
+                LOGGER.warning("Skipping series %s without %s", labels, ", ".join(missing))
+                entry["status"] = "skipped"
+                entry["missing_metrics"] = missing
+                continue
+            entry["status"] = "processed"
+            config = self.config.model_copy(
+                update={"output_dir": self.config.output_dir / partition, "series": SeriesConfig()}
+            )
+            jobs.append(
+                SeriesJob(
+                    partition=partition,
+                    config=config,
+                    raw=samples,
+                    trace_memory=self.profiler.trace_memory,
+                )
+            )
+
+        workers = min(self.config.execution.workers or os.cpu_count() or 1, len(jobs))
+        # Every series also writes its own profile into its partition.
+        with self.profiler.stage("series"):
+            if workers > 1:
+                LOGGER.info("Processing %s series with %s processes", len(jobs), workers)
+                # Each series writes its sequences serially; the pool is the parallelism.
+                for job in jobs:
+                    execution = job.config.execution.model_copy(update={"workers": 1})
+                    job.config = job.config.model_copy(update={"execution": execution})
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    results = list(pool.map(process_series, jobs))
+            else:
+                results = [process_series(job) for job in jobs]
+
+        outputs: dict[str, Path] = {}
+        for job, result in zip(jobs, results):
+            for key, path in result.items():
+                outputs[f"{job.partition.as_posix()}/{key}"] = path
+        self.config.output_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {
+            "execution_mode": self.config.execution.mode,
+            "resample_rule": self.config.resample_rule,
+            "target_metric": self.config.sliding_window.target_metric,
+            "group_by": group_by,
+            "series": series,
+        }
+        path = self.config.output_dir / "manifest.json"
+        path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        outputs["manifest"] = path
         LOGGER.info(
             "Preprocessing finished",
-            extra={"outputs": {k: str(v) for k, v in outputs.items()}},
+            extra={"series": len(series), "processed": len(jobs)},
         )
         return outputs
 
-    def _load_raw(self) -> pd.DataFrame:
+    def _iter_series(self, raw: pd.DataFrame) -> Iterator[tuple[dict[str, str], pd.DataFrame]]:
+        """Yield the `series.group_by` labels and samples of every series, sorted by labels."""
+
+        group_by = self.config.series.group_by
+        # Label sets repeat on every sample; parse each distinct one once.
+        codes, uniques = pd.factorize(raw[self.config.labels_column].fillna("{}"))
+        keys = [_series_key(str(text), group_by) for text in uniques]
+        distinct = sorted(set(keys))
+        position = {key: index for index, key in enumerate(distinct)}
+        series_ids = np.array([position[key] for key in keys], dtype=np.intp)[codes]
+        columns = [
+            self.config.timestamp_column,
+            self.config.metric_column,
+            self.config.value_column,
+        ]
+        for series_id, samples in raw[columns].groupby(series_ids, sort=True):
+            yield dict(zip(group_by, distinct[cast(int, series_id)])), samples
+
+    def _raw_files(self) -> list[str]:
         files = sorted(glob.glob(self.config.input_glob))
         if not files:
             raise FileNotFoundError(f"No files matched glob: {self.config.input_glob}")
-        frames = []
-        for path in files:
-            df = pd.read_csv(path, parse_dates=[self.config.timestamp_column])
-            df = df[
-                [
-                    self.config.timestamp_column,
-                    self.config.metric_column,
-                    self.config.value_column,
-                ]
-            ]
-            df = df[df[self.config.metric_column].isin(self.config.metrics)]
-            frames.append(df)
-        combined = pd.concat(frames, ignore_index=True)
-        combined[self.config.timestamp_column] = pd.to_datetime(
-            combined[self.config.timestamp_column],
-            utc=True,
+        return files
+
+    @_profiled("read_raw")
+    def _read_raw(
+        self, files: list[str] | None = None, *, with_labels: bool = False
+    ) -> pd.DataFrame:
+        return read_raw(
+            self._raw_files() if files is None else files,
+            storage_format=self.config.raw_format,
+            metrics=self.config.metrics,
+            timestamp_column=self.config.timestamp_column,
+            metric_column=self.config.metric_column,
+            value_column=self.config.value_column,
+            label_column=self.config.labels_column if with_labels else None,
+        )
+
+    @_profiled("load_grid")
+    def _load_grid(self, raw: pd.DataFrame | None = None) -> pd.DataFrame:
+        grid = self._bucket(self._read_raw() if raw is None else raw)
+        self._ensure_required_metrics(grid)
+        return grid
+
+    @_profiled("load_cached_features")
+    def _load_features_cached(self, cache: PreprocessingCache) -> pd.DataFrame:
+        """Engineered features of the in-memory path, recomputing only what changed."""
+
+        raw_key = settings_hash(
+            self.config.model_dump(
+                mode="json",
+                include={
+                    "raw_format",
+                    "timestamp_column",
+                    "metric_column",
+                    "value_column",
+                    "metrics",
+                },
+            )
+        )
+        files = cache.raw_files(
+            self._raw_files(),
+            raw_key,
+            lambda path: self._read_raw([path]),
+            timestamp_column=self.config.timestamp_column,
+        )
+        grid = self._cached_grid(cache, files, settings_hash(raw_key, self.config.resample_rule))
+        self._ensure_required_metrics(grid)
+        treated = self._filter_anomalies(self._fill_gaps(grid))
+        # Upstream changes reach this stage through the treated grid, which is diffed.
+        features_key = settings_hash(
+            self.config.model_dump(mode="json", include={"metrics", "features", "precision"})
+        )
+        features = self._cached_features(cache, treated, features_key)
+        cache.save()
+        return features
+
+    def _cached_grid(
+        self, cache: PreprocessingCache, files: list[RawFile], key: str
+    ) -> pd.DataFrame:
+        sources = [asdict(file) for file in files]
+        cached = cache.load("grid", key)
+        try:
+            bucket_ns: int | None = fixed_frequency_ns(self.config.resample_rule)
+        except ValueError:
+            # Buckets are only epoch-aligned for rules dividing a day; rebuild the grid.
+            bucket_ns = None
+        if cached is None or bucket_ns is None:
+            combined = pd.concat([cache.raw_frame(file) for file in files], ignore_index=True)
+            grid = self._bucket(combined)
+            cache.store("grid", key, {"grid": grid}, {"sources": sources})
+            return grid
+        frames, meta = cached
+        grid = frames["grid"]
+        spans = changed_spans([RawFile(**source) for source in meta["sources"]], files)
+        buckets = merge_spans(
+            [
+                (start // bucket_ns * bucket_ns, -(-stop // bucket_ns) * bucket_ns)
+                for start, stop in spans
+            ]
+        )
+        for start, stop in buckets:
+            grid = self._splice_grid(grid, cache, files, start, stop)
+        if buckets or meta["sources"] != sources:
+            LOGGER.info("Recomputed %s grid spans from changed raw files", len(buckets))
+            cache.store("grid", key, {"grid": grid}, {"sources": sources})
+        return grid
+
+    def _splice_grid(
+        self,
+        grid: pd.DataFrame,
+        cache: PreprocessingCache,
+        files: list[RawFile],
+        start: int,
+        stop: int,
+    ) -> pd.DataFrame:
+        """Replace the buckets in `[start, stop)` (epoch ns) with ones built from every file."""
+
+        timestamp_column = self.config.timestamp_column
+        lower = pd.Timestamp(start, unit="ns", tz="UTC")
+        upper = pd.Timestamp(stop, unit="ns", tz="UTC")
+        parts = []
+        for file in files:
+            if file.start is None or file.stop is None or file.stop <= start or file.start >= stop:
+                continue
+            frame = cache.raw_frame(file)
+            stamps = frame[timestamp_column]
+            parts.append(frame[(stamps >= lower) & (stamps < upper)])
+        outside = grid[(grid.index < lower) | (grid.index >= upper)]
+        pieces = [outside]
+        if parts:
+            pieces.append(self._bucket(pd.concat(parts)))
+        spliced = pd.concat(pieces).sort_index()
+        # Match a full rebuild: no all-NaN columns and no all-NaN rows at the ends.
+        spliced = spliced.loc[:, spliced.notna().any(axis=0)]
+        observed = np.flatnonzero(spliced.notna().any(axis=1).to_numpy())
+        columns = pd.Index(sorted(spliced.columns), name=self.config.metric_column)
+        if not len(observed):
+            return pd.DataFrame(columns=columns, index=grid.index[:0])
+        spliced = spliced.iloc[observed[0] : observed[-1] + 1]
+        index = pd.date_range(
+            spliced.index[0],
+            spliced.index[-1],
+            freq=self.config.resample_rule,
+            unit=cast(pd.DatetimeIndex, grid.index).unit,
+            name=timestamp_column,
+        )
+        return spliced.reindex(index=index, columns=columns)
+
+    def _cached_features(
+        self, cache: PreprocessingCache, treated: pd.DataFrame, key: str
+    ) -> pd.DataFrame:
+        plan = self._feature_plan(treated.columns)
+        cached = cache.load("features", key)
+        start = 0
+        if cached is not None:
+            frames, _ = cached
+            # Rows before the first changed one keep their features, except those
+            # looking ahead into it through negative lags.
+            lookahead = max([-lag for _, lag in plan.lags if lag < 0], default=0)
+            start = max(first_difference(treated, frames["treated"]) - lookahead, 0)
+        if start == 0:
+            features = self._engineer_features(treated)
+        elif start == len(treated) == len(frames["treated"]):
+            return frames["features"]
+        else:
+            context_start = max(start - plan.history, 0)
+            fresh = self._engineer_features(treated.iloc[context_start:])
+            fresh = fresh.iloc[start - context_start :]
+            features = pd.concat([frames["features"].iloc[:start], fresh])
+        LOGGER.info("Computed features from row %s of %s", start, len(treated))
+        cache.store("features", key, {"treated": treated, "features": features}, {"start": start})
+        return features
+
+    @_profiled("load_grid")
+    def _load_resampled_chunked(self, budget: MemoryBudget) -> pd.DataFrame:
+        """Build the bucketed metric grid `_bucket` returns, one shard block at a time."""
+
+        execution = self.config.execution
+        chunk_rows = execution.raw_chunk_rows or budget.raw_chunk_rows()
+        bucket_ns = fixed_frequency_ns(self.config.resample_rule)
+        if execution.spill_dir is not None:
+            execution.spill_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(prefix="preprocess-", dir=execution.spill_dir) as tmp:
+            spill = RawSpill.for_frequency(
+                Path(tmp), timestamp_column=self.config.timestamp_column, bucket_ns=bucket_ns
+            )
+            for piece in iter_raw(
+                self._raw_files(),
+                storage_format=self.config.raw_format,
+                metrics=self.config.metrics,
+                chunk_rows=chunk_rows,
+                timestamp_column=self.config.timestamp_column,
+                metric_column=self.config.metric_column,
+                value_column=self.config.value_column,
+            ):
+                spill.add(piece)
+            buckets: list[pd.DataFrame] = []
+            for block in spill.blocks(chunk_rows):
+                resampled = self._bucket(block)
+                if not resampled.empty:
+                    buckets.append(resampled)
+        columns = pd.Index(
+            sorted(set().union(*(frame.columns for frame in buckets))),
+            name=self.config.metric_column,
         )
-        combined.sort_values(by=self.config.timestamp_column, inplace=True)
+        if not buckets:
+            grid = pd.DataFrame(columns=columns)
+        else:
+            grid = pd.concat(buckets)
+            index = pd.date_range(
+                grid.index[0],
+                grid.index[-1],
+                freq=self.config.resample_rule,
+                unit=cast(pd.DatetimeIndex, grid.index).unit,
+                name=self.config.timestamp_column,
+            )
+            # Buckets without samples at block edges become NaN rows, as in `resample`.
+            grid = grid.reindex(index=index, columns=columns)
+        self._ensure_required_metrics(grid)
+        return grid
+
+    @_profiled("resample")
+    def _bucket(self, combined: pd.DataFrame) -> pd.DataFrame:
+        """Mean of every metric per `resample_rule` bucket of long-format samples."""
+
+        if self.config.resample_engine == "grid":
+            grid = align_samples(
+                combined,
+                rule=self.config.resample_rule,
+                timestamp_column=self.config.timestamp_column,
+                metric_column=self.config.metric_column,
+                value_column=self.config.value_column,
+            )
+            if grid is not None:
+                return grid
+        return self._pivot(combined).resample(self.config.resample_rule).mean()
+
+    def _pivot(self, combined: pd.DataFrame) -> pd.DataFrame:
+        # A stable sort keeps samples sharing a timestamp in file order, so their
+        # mean is summed in the same order however the rows were read.
+        combined = combined.sort_values(by=self.config.timestamp_column, kind="stable")
         pivot = combined.pivot_table(
             index=self.config.timestamp_column,
             columns=self.config.metric_column,
             values=self.config.value_column,
         )
-        pivot = pivot.sort_index()
-        self._ensure_required_metrics(pivot)
-        return pivot
+        return pivot.sort_index()
 
-    def _resample(self, frame: pd.DataFrame) -> pd.DataFrame:
-        resampled = frame.resample(self.config.resample_rule).mean()
+    @_profiled("fill_gaps")
+    def _fill_gaps(self, resampled: pd.DataFrame) -> pd.DataFrame:
         method: InterpolationMethod = self.config.interpolation_method
-        resampled = resampled.interpolate(method=method)
-        resampled = resampled.ffill()
-        resampled = resampled.bfill()
-        return resampled
+        max_gap = self.config.interpolation_max_gap
+        if self.config.resample_engine == "grid" and method in ("time", "linear"):
+            linear: Literal["time", "linear"] = "time" if method == "time" else "linear"
+            return fill_gaps(resampled, method=linear, max_gap=max_gap)
+        filled = resampled.interpolate(method=method)
+        filled = filled.ffill()
+        filled = filled.bfill()
+        if max_gap is not None:
+            filled = filled.mask(long_gaps(resampled.isna().to_numpy(), max_gap))
+        return filled
+
+    @_profiled("anomalies")
+    def _filter_anomalies(self, frame: pd.DataFrame) -> pd.DataFrame:
+        if not self.config.anomaly.enabled:
+            return frame
+        anomaly = self.config.anomaly
+        return treat_anomalies(
+            frame,
+            self.config.metrics,
+            threshold=anomaly.zscore_threshold,
+            method=anomaly.method,
+            mode=anomaly.mode,
+            window=anomaly.window,
+        )
+
+    def _feature_block(self, frame: pd.DataFrame, start: int, stop: int) -> pd.DataFrame:
+        """Features and targets of rows `start:stop`, computed from the rows they depend on."""
+
+        history = self._feature_plan(frame.columns).history
+        horizon = max([*self.config.sliding_window.forecast_steps, 0])
+        context_start = max(start - history, 0)
+        context = frame.iloc[context_start : stop + horizon]
+        enriched = self._build_targets(self._engineer_features(context))
+        return enriched.iloc[start - context_start : stop - context_start].dropna()
 
-    def _engineer_features(self, frame: pd.DataFrame) -> pd.DataFrame:
-        enriched = frame.copy()
-        if self.config.features.enable_time_features:
-            enriched = add_time_features(enriched)
-        enriched = add_lag_features(
-            enriched,
+    def _feature_plan(self, columns: Iterable[str]) -> FeaturePlan:
+        return FeaturePlan.build(
+            columns,
             self.config.metrics,
-            self.config.features.lags,
-        )
-        enriched = add_rolling_features(
-            enriched, self.config.metrics, self.config.features.rolling_windows
+            lags=self.config.features.lags,
+            rolling_windows=self.config.features.rolling_windows,
+            time_features=self.config.features.enable_time_features,
         )
-        return enriched
 
+    @_profiled("features")
+    def _engineer_features(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Features of the treated grid, computed in float64 and stored in `precision`."""
+
+        plan = self._feature_plan(frame.columns)
+        if self.config.precision == "float64":
+            return plan.compute(frame)
+        dtype = np.dtype(self.config.precision)
+        features = plan.compute(frame, dtype=dtype, compact_time=True)
+        floats = [column for column in frame.columns if frame[column].dtype.kind == "f"]
+        return features.astype(dict.fromkeys(floats, dtype))
+
+    @_profiled("targets")
     def _build_targets(self, frame: pd.DataFrame) -> pd.DataFrame:
-        enriched = frame.copy()
         target_metric = self.config.sliding_window.target_metric
-        for horizon in self.config.sliding_window.forecast_steps:
-            enriched[f"target_{target_metric}_t+{horizon}"] = enriched[target_metric].shift(
-                -horizon
+        target = frame[target_metric]
+        targets = pd.DataFrame(
+            {
+                f"target_{target_metric}_t+{horizon}": target.shift(-horizon)
+                for horizon in self.config.sliding_window.forecast_steps
+            },
+            index=frame.index,
+        )
+        return pd.concat([frame, targets], axis=1)
+
+    def config_hash(self) -> str:
+        """Hash of the settings that determine the transform from raw samples to features."""
+
+        settings = self.config.model_dump(
+            mode="json",
+            include={
+                "metrics",
+                "resample_rule",
+                "interpolation_method",
+                "interpolation_max_gap",
+                "precision",
+                "scaler_features",
+                "features",
+                "anomaly",
+                "sliding_window",
+            },
+        )
+        encoded = json.dumps(settings, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def transform_artifact(self, columns: list[str]) -> TransformArtifact:
+        """Describe the fitted transform producing a dataset with `columns`."""
+
+        feature_cols, _ = self._sequence_columns(columns)
+        plan = self._feature_plan(feature_cols)
+        metrics = list(dict.fromkeys(self.config.metrics))
+        metric_columns = [column for column in feature_cols if column in metrics]
+        # `treat_anomalies` appends the indicators in `config.metrics` order.
+        flag_columns = [
+            f"{metric}{FLAG_SUFFIX}"
+            for metric in metrics
+            if f"{metric}{FLAG_SUFFIX}" in feature_cols
+        ]
+        anomaly = self.config.anomaly
+        treatment = None
+        if anomaly.enabled and anomaly.mode != "drop":
+            treatment = AnomalyTreatment(
+                columns=[metric for metric in metrics if metric in metric_columns],
+                method=anomaly.method,
+                mode=anomaly.mode,
+                threshold=anomaly.zscore_threshold,
+                window=anomaly.window,
             )
-        return enriched
+        return TransformArtifact(
+            config_hash=self.config_hash(),
+            resample_rule=self.config.resample_rule,
+            metric_columns=metric_columns,
+            feature_columns=feature_cols,
+            target_columns=[column for column in columns if column not in feature_cols],
+            time_features=plan.time_features,
+            lags=list(plan.lags),
+            rolling_windows=list(plan.rolling_windows),
+            scaled_columns=[str(name) for name in self.scaler.feature_names_in_],
+            mean=self.scaler.mean_,
+            scale=self.scaler.scale_,
+            flag_columns=flag_columns,
+            anomaly=treatment,
+            precision=self.config.precision,
+        )
 
     def _determine_scaler_features(self, frame: pd.DataFrame) -> list[str]:
         if self.config.scaler_features:
             return [col for col in self.config.scaler_features if col in frame.columns]
         return [col for col in self.config.metrics if col in frame.columns]
 
-    def _split(self, frame: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    def _split_bounds(self, total: int) -> tuple[int, int]:
         if abs(self.config.splits.total - 1.0) > 1e-6:
             raise ValueError("Dataset splits must sum to 1.0")
-        total = len(frame)
         train_end = int(total * self.config.splits.train)
         val_end = train_end + int(total * self.config.splits.validation)
+        return train_end, val_end
+
+    def _split(self, frame: pd.DataFrame) -> dict[str, pd.DataFrame]:
+        train_end, val_end = self._split_bounds(len(frame))
         splits = {
             "train": frame.iloc[:train_end],
             "validation": frame.iloc[train_end:val_end],
@@ -133,6 +781,43 @@ class PreprocessingPipeline:
         }
         return splits
 
+    def _sequence_targets(self, split: str) -> dict[str, tuple[int, str]]:
+        """Artifact key, horizon and target column of every sequence artifact of `split`."""
+
+        sliding = self.config.sliding_window
+        steps = sliding.forecast_steps if sliding.all_horizons else sliding.forecast_steps[:1]
+        targets: dict[str, tuple[int, str]] = {}
+        for position, horizon in enumerate(dict.fromkeys(steps)):
+            suffix = "" if position == 0 else f"_t+{horizon}"
+            target = f"target_{sliding.target_metric}_t+{horizon}"
+            targets[f"sequences_{split}{suffix}"] = (horizon, target)
+        return targets
+
+    def _sequence_entry(self, split: str, key: str, entry: dict[str, Any]) -> dict[str, Any]:
+        return {**entry, "split": split, "horizon": self._sequence_targets(split)[key][0]}
+
+    def _sequence_columns(self, columns: list[str]) -> tuple[list[str], str]:
+        target_cols = [c for c in columns if c.startswith("target_")]
+        feature_cols = [c for c in columns if c not in target_cols]
+        main_target = (
+            f"target_{self.config.sliding_window.target_metric}_t+"
+            f"{self.config.sliding_window.forecast_steps[0]}"
+        )
+        return feature_cols, main_target
+
+    def _ensure_complete_rows(self, rows: int) -> None:
+        if rows:
+            return
+        max_gap = self.config.interpolation_max_gap
+        if max_gap is None:
+            reason = "the data is shorter than the longest lag, rolling window and forecast step"
+        else:
+            reason = (
+                f"interpolation_max_gap={max_gap} leaves longer gaps missing, and every row "
+                "has such a gap in its lags, rolling windows or targets; raise it or unset it"
+            )
+        raise ValueError(f"No complete rows left after feature engineering: {reason}")
+
     def _ensure_required_metrics(self, frame: pd.DataFrame) -> None:
         missing = [metric for metric in self.config.metrics if metric not in frame.columns]
         if not missing:
@@ -147,42 +832,141 @@ class PreprocessingPipeline:
     def _persist_splits(self, splits: dict[str, pd.DataFrame]) -> dict[str, Path]:
         self.config.output_dir.mkdir(parents=True, exist_ok=True)
         outputs: dict[str, Path] = {}
-        for name, data in splits.items():
-            path = self.config.output_dir / f"{name}.csv"
-            data.to_csv(path, index_label="timestamp")
-            outputs[name] = path
+        with self.profiler.stage("write_splits"):
+            for name, data in splits.items():
+                for key, writer in self._split_writers(name, data, len(data)).items():
+                    writer.append(data)
+                    outputs[key] = writer.path
+                    self._artifacts[key] = {"kind": "split", "split": name, **writer.close()}
         return outputs
 
+    def _split_writers(self, name: str, header: pd.DataFrame, rows: int) -> dict[str, SplitWriter]:
+        """One writer per configured format, keyed like the split's artifacts."""
+
+        output = self.config.split_output
+        return {
+            split_key(name, fmt, output.formats): SplitWriter(
+                split_path(self.config.output_dir, name, fmt),
+                fmt=fmt,
+                header=header,
+                rows=rows,
+                index_label="timestamp",
+                float32=output.float32,
+            )
+            for fmt in output.formats
+        }
+
     def _persist_sequences(
         self, dataset: pd.DataFrame, splits: dict[str, pd.DataFrame]
     ) -> dict[str, Path]:
-        outputs: dict[str, Path] = {}
-        target_cols = [c for c in dataset.columns if c.startswith("target_")]
-        feature_cols = [c for c in dataset.columns if c not in target_cols]
-        main_target = (
-            f"target_{self.config.sliding_window.target_metric}_t+"
-            f"{self.config.sliding_window.forecast_steps[0]}"
-        )
+        """Write the sequences of every split and horizon, in parallel across processes."""
+
+        feature_cols, main_target = self._sequence_columns(list(dataset.columns))
+        if main_target not in dataset.columns:
+            raise KeyError(f"Target column {main_target} not found in frame")
+        sliding = self.config.sliding_window
+        jobs: dict[str, SequenceJob] = {}
+        split_of: dict[str, str] = {}
         for name, data in splits.items():
-            sequences, targets, timestamps = build_sequences(
-                data,
-                feature_cols,
-                main_target,
-                self.config.sliding_window.sequence_length,
-                self.config.sliding_window.stride,
-            )
-            path = self.config.output_dir / f"sequences_{name}.npz"
-            np.savez_compressed(
-                path,
-                sequences=sequences,
-                targets=targets,
-                timestamps=np.array([ts.isoformat() for ts in timestamps]),
-                feature_columns=np.array(feature_cols),
-                target_column=main_target,
-            )
-            outputs[f"sequences_{name}"] = path
+            for key, (_, target) in self._sequence_targets(name).items():
+                split_of[key] = name
+                if target not in data.columns:
+                    raise KeyError(f"Target column {target} not found in frame")
+                jobs[key] = SequenceJob(
+                    path=self._sequence_path(key),
+                    frame=data[[*feature_cols, target]],
+                    storage=sliding.storage,
+                    codec=sliding.codec,
+                    feature_columns=feature_cols,
+                    target_column=target,
+                    sequence_length=sliding.sequence_length,
+                    stride=sliding.stride,
+                    dtype=self.config.precision,
+                )
+        workers = min(self.config.execution.workers or os.cpu_count() or 1, len(jobs))
+        with self.profiler.stage("write_sequences"):
+            if workers > 1:
+                LOGGER.info("Writing %s sequence artifacts with %s processes", len(jobs), workers)
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    entries = list(pool.map(write_sequences, jobs.values()))
+            else:
+                entries = [write_sequences(job) for job in jobs.values()]
+        outputs: dict[str, Path] = {}
+        for (key, job), entry in zip(jobs.items(), entries):
+            outputs[key] = job.path
+            self._artifacts[key] = self._sequence_entry(split_of[key], key, entry)
         return outputs
 
+    def _sequence_path(self, key: str) -> Path:
+        storage = self.config.sliding_window.storage
+        return sequence_path(self.config.output_dir, key.removeprefix("sequences_"), storage)
+
+    def _sequence_writer(
+        self, key: str, rows: int, feature_cols: list[str], target: str
+    ) -> SequenceWriter:
+        sliding = self.config.sliding_window
+        return SequenceWriter(
+            self._sequence_path(key),
+            storage=sliding.storage,
+            codec=sliding.codec,
+            rows=rows,
+            feature_columns=feature_cols,
+            target_column=target,
+            sequence_length=sliding.sequence_length,
+            stride=sliding.stride,
+            dtype=self.config.precision,
+        )
+
+    def _write_manifest(self, outputs: dict[str, Path]) -> Path:
+        """Describe every artifact of the run in `manifest.json` next to them."""
+
+        artifacts = {}
+        for key, path in outputs.items():
+            files = sorted(path.iterdir()) if path.is_dir() else [path]
+            artifacts[key] = {
+                "path": path.relative_to(self.config.output_dir).as_posix(),
+                "bytes": sum(item.stat().st_size for item in files),
+                **self._artifacts.get(key, {}),
+            }
+        manifest = {
+            "execution_mode": self.config.execution.mode,
+            "resample_rule": self.config.resample_rule,
+            "target_metric": self.config.sliding_window.target_metric,
+            "artifacts": artifacts,
+        }
+        path = self.config.output_dir / "manifest.json"
+        path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        return path
+
+
+@dataclass(slots=True)
+class SeriesJob:
+    """One label series of a grouped run, picklable for a worker process."""
+
+    partition: Path
+    config: PreprocessorConfig
+    raw: pd.DataFrame
+    trace_memory: bool = False
+
+
+def process_series(job: SeriesJob) -> dict[str, Path]:
+    """Run the pipeline over the samples of one series into its partition."""
+
+    profiler = StageProfiler(trace_memory=job.trace_memory)
+    return PreprocessingPipeline(job.config, profiler).run(raw=job.raw)
+
+
+def _series_key(text: str, group_by: list[str]) -> tuple[str, ...]:
+    labels = json.loads(text) if text else {}
+    if not isinstance(labels, dict):
+        raise ValueError(f"Series labels must be a JSON object, got {text!r}")
+    return tuple(str(labels.get(key, MISSING_LABEL)) for key in group_by)
+
+
+def _partition_value(value: str) -> str:
+    # Keep partition names portable: label values may contain `/` or `=`.
+    return re.sub(r"[^A-Za-z0-9._-]", "_", value) or "_"
+
 
 def build_sequences(
     frame: pd.DataFrame,
@@ -190,6 +974,7 @@ def build_sequences(
     target_column: str,
     sequence_length: int,
     stride: int,
+    dtype: DTypeLike = np.float64,
 ) -> tuple[np.ndarray, np.ndarray, list[pd.Timestamp]]:
     """Generate sliding windows for sequence models.
 
@@ -199,27 +984,19 @@ def build_sequences(
         target_column: Target column name (t + horizon).
         sequence_length: Number of timesteps per sequence.
         stride: Step size between neighboring windows.
+        dtype: Float dtype of the sequences and targets.
 
     Returns:
-        Tuple with stacked sequences, target values, and timestamps.
+        Tuple with the sequences (a read-only strided view), target values,
+        and timestamps.
     """
 
     if target_column not in frame.columns:
         raise KeyError(f"Target column {target_column} not found in frame")
-    values = frame[feature_columns].to_numpy(dtype=float)
-    targets = frame[target_column].to_numpy(dtype=float)
-    timestamps = frame.index.to_list()
-    sequences: list[np.ndarray] = []
-    y: list[float] = []
-    stamps: list[pd.Timestamp] = []
-    for start in range(0, len(frame) - sequence_length + 1, stride):
-        end = start + sequence_length
-        sequences.append(values[start:end])
-        y.append(targets[end - 1])
-        stamps.append(timestamps[end - 1])
-    if not sequences:
-        return np.empty((0, sequence_length, len(feature_columns))), np.empty((0,)), []
-    return np.stack(sequences), np.array(y), stamps
+    values = frame[feature_columns].to_numpy(dtype=dtype)
+    ends = window_ends(len(frame), sequence_length, stride)
+    targets = np.asarray(frame[target_column], dtype=dtype)[ends]
+    return window_view(values, sequence_length, stride), targets, frame.index[ends].to_list()
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -230,6 +1007,30 @@ def build_parser() -> argparse.ArgumentParser:
         default=None,
         help="Path to preprocessing YAML config",
     )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Record the peak of Python allocations per stage with tracemalloc (slower)",
+    )
+    parser.add_argument(
+        "--cprofile",
+        type=Path,
+        default=None,
+        help="Run under cProfile and write its statistics to this file (read with pstats)",
+    )
+    parser.add_argument(
+        "--profile-baseline",
+        type=Path,
+        default=None,
+        help="Stored profile.json, or an output directory holding one, to compare "
+        "the run against; exits with status 1 when a stage regressed",
+    )
+    parser.add_argument(
+        "--profile-tolerance",
+        type=float,
+        default=0.25,
+        help="Relative growth over the baseline reported as a regression",
+    )
     return parser
 
 
@@ -237,9 +1038,25 @@ def main(argv: list[str] | None = None) -> int:
     parser = build_parser()
     args = parser.parse_args(argv)
     config = load_config(args.config)
-    pipeline = PreprocessingPipeline(config)
-    pipeline.run()
-    return 0
+    # Read the baseline first: it may be the profile this run overwrites.
+    baseline = None if args.profile_baseline is None else load_profile(args.profile_baseline)
+    pipeline = PreprocessingPipeline(config, StageProfiler(trace_memory=args.trace_memory))
+    if args.cprofile is None:
+        outputs = pipeline.run()
+    else:
+        profile = cProfile.Profile()
+        outputs = profile.runcall(pipeline.run)
+        args.cprofile.parent.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(args.cprofile)
+        LOGGER.info("Wrote cProfile statistics to %s", args.cprofile)
+    if baseline is None:
+        return 0
+    regressions = compare_profiles(
+        load_profile(outputs["profile"]), baseline, tolerance=args.profile_tolerance
+    )
+    for message in regressions:
+        LOGGER.warning("Stage regressed against the baseline profile: %s", message)
+    return 1 if regressions else 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,211 @@
+"""Per-stage timing and memory profile of a preprocessing run.
+
+`PreprocessingPipeline.run` wraps each of its stages in `StageProfiler.stage`
+and writes the result to `profile.json` next to its outputs. Every stage
+records its wall and CPU time (worker processes included once they have
+exited), the process RSS high-water mark at its end and how much the stage
+raised it, the rows and columns of its result and, when tracing is enabled,
+the peak of memory allocated through Python. Stages running once per block
+in chunked mode are accumulated under one name.
+
+`compare_profiles` reports the stages of a run that got slower or larger
+than in a stored baseline profile.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Iterator
+
+import pandas as pd
+
+PROFILE_VERSION = 1
+PROFILE_FILENAME = "profile.json"
+
+
+@dataclass(slots=True)
+class StageProfile:
+    """Measurements of one stage, summed over its calls."""
+
+    name: str
+    calls: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_bytes: int | None = None
+    rss_growth_bytes: int | None = None
+    peak_traced_bytes: int | None = None
+    rows: int | None = None
+    columns: int | None = None
+
+    def record(self, frame: pd.DataFrame) -> None:
+        """Count `frame` as a result of the stage; rows add up across calls."""
+
+        self.rows = (self.rows or 0) + len(frame)
+        self.columns = frame.shape[1]
+
+
+@dataclass(slots=True)
+class StageProfiler:
+    """Collects `StageProfile`s; stages may be nested.
+
+    Args:
+        trace_memory: Track the peak of Python allocations with `tracemalloc`,
+            which slows allocation-heavy stages down noticeably.
+    """
+
+    trace_memory: bool = False
+    stages: dict[str, StageProfile] = field(default_factory=dict)
+    _open: list[list[int]] = field(default_factory=list)
+    _started_tracing: bool = False
+
+    def start(self) -> None:
+        """Forget earlier measurements and start tracing if requested."""
+
+        self.stages = {}
+        self._open = []
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stop(self) -> None:
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageProfile]:
+        entry = self.stages.setdefault(name, StageProfile(name))
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # The enclosing stage keeps the peak reached so far; this one starts afresh.
+            peak = tracemalloc.get_traced_memory()[1]
+            if self._open:
+                self._open[-1][0] = max(self._open[-1][0], peak)
+            tracemalloc.reset_peak()
+            self._open.append([0])
+        wall, cpu, rss = time.perf_counter(), _cpu_seconds(), _peak_rss_bytes()
+        try:
+            yield entry
+        finally:
+            entry.calls += 1
+            entry.wall_seconds += time.perf_counter() - wall
+            entry.cpu_seconds += _cpu_seconds() - cpu
+            peak_rss = _peak_rss_bytes()
+            if peak_rss is not None and rss is not None:
+                entry.peak_rss_bytes = max(entry.peak_rss_bytes or 0, peak_rss)
+                entry.rss_growth_bytes = (entry.rss_growth_bytes or 0) + peak_rss - rss
+            if tracing and tracemalloc.is_tracing():
+                peak = max(self._open.pop()[0], tracemalloc.get_traced_memory()[1])
+                entry.peak_traced_bytes = max(entry.peak_traced_bytes or 0, peak)
+                if self._open:
+                    self._open[-1][0] = max(self._open[-1][0], peak)
+
+    def to_dict(self, **meta: Any) -> dict[str, Any]:
+        return {
+            "version": PROFILE_VERSION,
+            **meta,
+            "trace_memory": self.trace_memory,
+            "stages": [asdict(stage) for stage in self.stages.values()],
+        }
+
+    def write(self, path: Path, **meta: Any) -> Path:
+        """Write the profile as JSON, with `meta` fields at the top level."""
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(**meta), indent=2), encoding="utf-8")
+        return path
+
+
+def load_profile(path: Path) -> dict[str, Any]:
+    """Read a profile, or the one inside a preprocessing output directory."""
+
+    path = Path(path)
+    if path.is_dir():
+        path = path / PROFILE_FILENAME
+    profile: dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+    if profile.get("version") != PROFILE_VERSION:
+        raise ValueError(f"Unsupported profile version {profile.get('version')} in {path}")
+    return profile
+
+
+def compare_profiles(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    *,
+    tolerance: float = 0.25,
+    min_seconds: float = 0.05,
+    min_bytes: int = 16 * 2**20,
+) -> list[str]:
+    """Describe every stage of `current` that regressed against `baseline`.
+
+    A stage regresses when its wall time, RSS growth or traced peak exceeds
+    the baseline by more than `tolerance` (relative) and by more than
+    `min_seconds` or `min_bytes` (absolute), so that noise in short stages
+    is not reported. Stages missing from either profile are skipped.
+
+    Returns:
+        One message per regressed measurement; empty when there is none.
+    """
+
+    previous = {stage["name"]: stage for stage in baseline["stages"]}
+    regressions = []
+    for stage in current["stages"]:
+        before = previous.get(stage["name"])
+        if before is None:
+            continue
+        for key, floor, unit in (
+            ("wall_seconds", min_seconds, "s"),
+            ("rss_growth_bytes", min_bytes, "B"),
+            ("peak_traced_bytes", min_bytes, "B"),
+        ):
+            now, then = stage.get(key), before.get(key)
+            if now is None or then is None:
+                continue
+            if now > then * (1 + tolerance) and now - then > floor:
+                regressions.append(
+                    f"{stage['name']}: {key} {now:.6g}{unit}, baseline {then:.6g}{unit}"
+                )
+    return regressions
+
+
+def _cpu_seconds() -> float:
+    seconds = time.process_time()
+    resource = _resource()
+    if resource is not None:
+        # Worker processes count once they have been waited for.
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        seconds += children.ru_utime + children.ru_stime
+    return seconds
+
+
+def _peak_rss_bytes() -> int | None:
+    resource = _resource()
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+
+def _resource() -> Any:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - not available on Windows
+        return None
+    return resource
+
+
+__all__ = [
+    "PROFILE_FILENAME",
+    "PROFILE_VERSION",
+    "StageProfile",
+    "StageProfiler",
+    "compare_profiles",
+    "load_profile",
+]
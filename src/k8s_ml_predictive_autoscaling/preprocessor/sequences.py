@@ -0,0 +1,372 @@
+"""Sliding-window sequence datasets for sequence models.
+
+A split of `rows` rows yields the windows `values[start : start + sequence_length]`
+for every `start` in `range(0, rows - sequence_length + 1, stride)`, each
+labelled with the target and timestamp of its last row. Windows overlap, so
+materializing them repeats every row up to `sequence_length` times. Three
+storage layouts are supported:
+
+* ``npz`` - the materialized windows in one compressed archive (the default).
+* ``npy`` - the same members as uncompressed ``.npy`` files in a directory,
+  loadable as memory maps.
+* ``indexed`` - a directory with only the split's feature matrix and the row
+  index at which each window ends; windows are sliced lazily on access by
+  `WindowedSequences`.
+
+All layouts are written by `SequenceWriter`, block by block, and read back by
+`load_sequences`. Members can be compressed with a `SequenceCodec`: the
+archive supports ``deflate`` and ``none``; directory members may also use
+``zstd`` or ``lz4`` (through pyarrow) and are then read fully instead of
+memory-mapped.
+"""
+
+from __future__ import annotations
+
+import gzip
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Any, Literal, cast
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from numpy.typing import DTypeLike
+
+SequenceStorage = Literal["npz", "npy", "indexed"]
+SequenceCodec = Literal["deflate", "none", "zstd", "lz4"]
+
+ARCHIVE_CODECS: dict[str, int] = {"deflate": zipfile.ZIP_DEFLATED, "none": zipfile.ZIP_STORED}
+_MEMBER_SUFFIXES = {"none": ".npy", "deflate": ".npy.gz", "zstd": ".npy.zst", "lz4": ".npy.lz4"}
+
+# Upper bound on the materialized windows converted to bytes at once.
+_WRITE_CHUNK_BYTES = 32 * 2**20
+
+
+def window_view(values: np.ndarray, sequence_length: int, stride: int = 1) -> np.ndarray:
+    """Return a read-only `(windows, sequence_length, features)` view over `values`.
+
+    No data is copied: consecutive windows share the rows of `values`.
+    """
+
+    if len(values) < sequence_length:
+        return np.empty((0, sequence_length, *values.shape[1:]), dtype=values.dtype)
+    view = sliding_window_view(values, sequence_length, axis=0)
+    return np.moveaxis(view, -1, 1)[::stride]
+
+
+def window_ends(rows: int, sequence_length: int, stride: int) -> np.ndarray:
+    """Row index of the last row of every window over `rows` rows."""
+
+    return np.arange(sequence_length - 1, rows, stride, dtype=np.int64)
+
+
+def sequence_path(output_dir: Path, name: str, storage: SequenceStorage) -> Path:
+    if storage == "npz":
+        return output_dir / f"sequences_{name}.npz"
+    return output_dir / f"sequences_{name}"
+
+
+def resolve_codec(storage: SequenceStorage, codec: SequenceCodec | None) -> SequenceCodec:
+    """Default to a compressed archive and to memory-mappable directory members."""
+
+    if codec is None:
+        return "deflate" if storage == "npz" else "none"
+    if storage == "npz" and codec not in ARCHIVE_CODECS:
+        raise ValueError(f"The npz sequence storage supports deflate or none, got {codec!r}")
+    return codec
+
+
+class WindowedSequences:
+    """Lazy `(windows, sequence_length, features)` array backed by the base feature matrix.
+
+    Indexing with an integer, slice or integer array materializes only the
+    selected windows, so training loaders can draw batches from a memory-mapped
+    `values` matrix without ever building the full sequence tensor.
+    """
+
+    def __init__(self, values: np.ndarray, ends: np.ndarray, sequence_length: int) -> None:
+        self.values = values
+        self.ends = ends
+        self.sequence_length = sequence_length
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return (len(self.ends), self.sequence_length, self.values.shape[1])
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def __getitem__(self, key: int | slice | np.ndarray) -> np.ndarray:
+        ends = self.ends[key]
+        if np.ndim(ends) == 0:
+            end = int(ends)
+            return np.array(self.values[end - self.sequence_length + 1 : end + 1])
+        starts = np.asarray(ends) - self.sequence_length + 1
+        view = window_view(self.values, self.sequence_length)
+        return np.ascontiguousarray(view[starts])
+
+    def __array__(self, dtype: np.dtype | None = None) -> np.ndarray:
+        windows = self[:]
+        return windows if dtype is None else windows.astype(dtype, copy=False)
+
+
+@dataclass(slots=True)
+class SequenceDataset:
+    sequences: np.ndarray | WindowedSequences
+    targets: np.ndarray
+    timestamps: np.ndarray
+    feature_columns: list[str]
+    target_column: str
+
+
+def load_sequences(path: Path, *, mmap: bool = True) -> SequenceDataset:
+    """Load a sequence dataset written in any of the storage layouts.
+
+    Args:
+        path: `.npz` archive or sequence directory.
+        mmap: Memory-map the `.npy` members of a directory instead of reading them.
+
+    Returns:
+        The dataset; `sequences` is a `WindowedSequences` for the indexed layout.
+    """
+
+    path = Path(path)
+    if path.is_dir():
+        members = {
+            item.name.split(".", 1)[0]: _load_member(item, mmap)
+            for item in sorted(path.glob("*.npy*"))
+        }
+    else:
+        with np.load(path) as archive:
+            members = {key: archive[key] for key in archive.files}
+    sequences: np.ndarray | WindowedSequences
+    if "window_ends" in members:
+        sequences = WindowedSequences(
+            members["values"], members["window_ends"], int(members["sequence_length"])
+        )
+    else:
+        sequences = members["sequences"]
+    return SequenceDataset(
+        sequences=sequences,
+        targets=members["targets"],
+        timestamps=members["timestamps"],
+        feature_columns=[str(column) for column in members["feature_columns"]],
+        target_column=str(members["target_column"]),
+    )
+
+
+def _load_member(path: Path, mmap: bool) -> np.ndarray:
+    if path.suffix == ".npy":
+        return np.asanyarray(np.load(path, mmap_mode="r" if mmap else None))
+    if path.suffix == ".gz":
+        with gzip.open(path, "rb") as handle:
+            return np.asarray(np.lib.format.read_array(handle))
+    pa = _require_pyarrow()
+    codec = "zstd" if path.suffix == ".zst" else "lz4"
+    with pa.CompressedInputStream(pa.OSFile(str(path), "rb"), codec) as stream:
+        return np.asarray(np.lib.format.read_array(stream))
+
+
+class SequenceWriter:
+    """Streams the sliding windows of one split into one of the storage layouts.
+
+    Blocks of consecutive rows are appended in order. The last
+    `sequence_length - 1` rows of each block are kept so that windows spanning
+    a block boundary are emitted once the block holding their last row
+    arrives; only the windows of the current block are materialized, a few
+    megabytes at a time. The header of the streamed member is written up front
+    from the split size, so a single `append` of the whole split and many
+    appends of smaller blocks produce the same files. Features and targets are
+    stored as `dtype`.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        storage: SequenceStorage,
+        codec: SequenceCodec | None = None,
+        rows: int,
+        feature_columns: list[str],
+        target_column: str,
+        sequence_length: int,
+        stride: int,
+        dtype: DTypeLike = np.float64,
+    ) -> None:
+        self.path = path
+        self.storage = storage
+        self.dtype = np.dtype(dtype)
+        self.codec = resolve_codec(storage, codec)
+        self.feature_columns = feature_columns
+        self.target_column = target_column
+        self.sequence_length = sequence_length
+        self.stride = stride
+        self.rows = rows
+        self.expected = len(window_ends(rows, sequence_length, stride))
+        self._position = 0
+        self._written = 0
+        self._tail_values = np.empty((0, len(feature_columns)), dtype=self.dtype)
+        self._tail_targets = np.empty((0,), dtype=self.dtype)
+        self._tail_index: pd.Index = pd.DatetimeIndex([])
+        self._targets: list[np.ndarray] = []
+        self._stamps: list[str] = []
+        self._archive: zipfile.ZipFile | None = None
+        if storage == "npz":
+            self._archive = zipfile.ZipFile(
+                path, mode="w", compression=ARCHIVE_CODECS[self.codec], allowZip64=True
+            )
+        else:
+            path.mkdir(parents=True, exist_ok=True)
+        if storage == "indexed":
+            self._stream = self._open_member("values")
+            shape: tuple[int, ...] = (rows, len(feature_columns))
+        else:
+            self._stream = self._open_member("sequences")
+            shape = (self.expected, sequence_length, len(feature_columns))
+        header = {
+            "descr": np.lib.format.dtype_to_descr(self.dtype),
+            "fortran_order": False,
+            "shape": shape,
+        }
+        np.lib.format.write_array_header_1_0(self._stream, header)
+
+    def append(self, frame: pd.DataFrame) -> None:
+        if not len(frame):
+            return
+        block = frame[self.feature_columns].to_numpy(dtype=self.dtype)
+        values = np.concatenate([self._tail_values, block])
+        target = frame[self.target_column].to_numpy(dtype=self.dtype)
+        targets = np.concatenate([self._tail_targets, target])
+        index = self._tail_index.append(frame.index) if len(self._tail_index) else frame.index
+        offset = self._position - len(self._tail_values)
+        stop = self._position + len(frame)
+        lowest = max(0, self._position - self.sequence_length + 1)
+        first = -(-lowest // self.stride) * self.stride
+        starts = range(first - offset, stop - self.sequence_length + 1 - offset, self.stride)
+        if self.storage == "indexed":
+            self._stream.write(block.tobytes())
+        elif len(starts):
+            windows = window_view(values[starts.start :], self.sequence_length, self.stride)
+            per_window = self.sequence_length * len(self.feature_columns) * self.dtype.itemsize
+            step = max(1, _WRITE_CHUNK_BYTES // max(per_window, 1))
+            for chunk in range(0, len(starts), step):
+                self._stream.write(windows[chunk : chunk + step].tobytes())
+        if len(starts):
+            ends = np.array(starts) + self.sequence_length - 1
+            self._targets.append(targets[ends])
+            self._stamps.extend(ts.isoformat() for ts in index[ends])
+            self._written += len(starts)
+        keep = min(self.sequence_length - 1, len(values))
+        self._tail_values = values[len(values) - keep :]
+        self._tail_targets = targets[len(targets) - keep :]
+        self._tail_index = index[len(index) - keep :]
+        self._position = stop
+
+    def close(self) -> Path:
+        self._stream.close()
+        if self._written != self.expected:
+            raise RuntimeError(f"Wrote {self._written} of {self.expected} sequences to {self.path}")
+        arrays = {
+            "targets": (
+                np.concatenate(self._targets) if self._targets else np.empty((0,), self.dtype)
+            ),
+            "timestamps": np.array(self._stamps),
+            "feature_columns": np.array(self.feature_columns),
+            "target_column": np.asanyarray(self.target_column),
+        }
+        if self.storage == "indexed":
+            arrays["window_ends"] = window_ends(self.rows, self.sequence_length, self.stride)
+            arrays["sequence_length"] = np.asanyarray(self.sequence_length)
+        for key, value in arrays.items():
+            with self._open_member(key) as handle:
+                np.lib.format.write_array(handle, value)
+        if self._archive is not None:
+            self._archive.close()
+        return self.path
+
+    def describe(self) -> dict[str, Any]:
+        """Manifest entry of the written artifact."""
+
+        return {
+            "kind": "sequences",
+            "storage": self.storage,
+            "codec": self.codec,
+            "target_column": self.target_column,
+            "sequence_length": self.sequence_length,
+            "stride": self.stride,
+            "rows": self.rows,
+            "windows": self.expected,
+            "features": len(self.feature_columns),
+            "dtype": self.dtype.name,
+        }
+
+    def _open_member(self, name: str) -> IO[bytes]:
+        if self._archive is not None:
+            return self._archive.open(f"{name}.npy", "w", force_zip64=True)
+        path = self.path / f"{name}{_MEMBER_SUFFIXES[self.codec]}"
+        if self.codec == "none":
+            return path.open("wb")
+        if self.codec == "deflate":
+            return cast(IO[bytes], gzip.open(path, "wb"))
+        pa = _require_pyarrow()
+        return cast(IO[bytes], pa.CompressedOutputStream(str(path), self.codec))
+
+
+@dataclass(slots=True)
+class SequenceJob:
+    """Everything needed to write one sequence artifact, picklable for a process pool."""
+
+    path: Path
+    frame: pd.DataFrame
+    storage: SequenceStorage
+    codec: SequenceCodec | None
+    feature_columns: list[str]
+    target_column: str
+    sequence_length: int
+    stride: int
+    dtype: DTypeLike = np.float64
+
+
+def write_sequences(job: SequenceJob) -> dict[str, Any]:
+    """Write the sequences of `job.frame` in one pass and return the manifest entry."""
+
+    writer = SequenceWriter(
+        job.path,
+        storage=job.storage,
+        codec=job.codec,
+        rows=len(job.frame),
+        feature_columns=job.feature_columns,
+        target_column=job.target_column,
+        sequence_length=job.sequence_length,
+        stride=job.stride,
+        dtype=job.dtype,
+    )
+    writer.append(job.frame)
+    writer.close()
+    return writer.describe()
+
+
+def _require_pyarrow() -> Any:
+    try:
+        import pyarrow as pa
+    except ImportError as exc:  # pragma: no cover - depends on optional dependency
+        msg = "The zstd and lz4 sequence codecs require pyarrow (poetry install --extras parquet)"
+        raise ImportError(msg) from exc
+    return pa
+
+
+__all__ = [
+    "SequenceCodec",
+    "SequenceDataset",
+    "SequenceJob",
+    "SequenceStorage",
+    "SequenceWriter",
+    "WindowedSequences",
+    "load_sequences",
+    "resolve_codec",
+    "sequence_path",
+    "window_ends",
+    "window_view",
+    "write_sequences",
+]
@@ -0,0 +1,273 @@
+"""Train/validation/test split files and the shared loader for them.
+
+Splits can be written as CSV (the original layout), Parquet, Feather (an
+uncompressed Arrow IPC file, memory-mapped on read) or NPY (a directory with
+one `.npy` file per column and a `schema.json`). Binary formats keep the column
+dtypes and the UTC timestamps, can store float columns as float32, and
+let `load_split` read only the requested columns.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Literal
+
+import numpy as np
+import pandas as pd
+
+from .out_of_core import SplitCsvWriter
+
+SplitFormat = Literal["csv", "parquet", "feather", "npy"]
+
+SPLIT_NAMES = ("train", "validation", "test")
+NPY_SCHEMA_FILENAME = "schema.json"
+# Formats `load_split` picks from a manifest, fastest to read first.
+_PREFERRED_FORMATS: tuple[SplitFormat, ...] = ("feather", "npy", "parquet", "csv")
+
+
+def split_path(output_dir: Path, name: str, fmt: SplitFormat) -> Path:
+    """File of split `name` in `fmt`; NPY splits are a directory named after the split."""
+
+    return output_dir / (name if fmt == "npy" else f"{name}.{fmt}")
+
+
+def split_key(name: str, fmt: SplitFormat, formats: list[SplitFormat]) -> str:
+    """Artifact key: the split name for the first configured format, `<name>_<fmt>` after."""
+
+    return name if fmt == formats[0] else f"{name}_{fmt}"
+
+
+class SplitWriter:
+    """Writes one split block by block; the result equals writing all rows at once.
+
+    Args:
+        path: Output file, or directory for `npy`.
+        fmt: Output format.
+        header: Frame with the split's columns, used when no rows are appended.
+        rows: Total number of rows that will be appended (needed by `npy`).
+        index_label: Name of the timestamp column the index is written as.
+        float32: Store float columns as float32 (binary formats only).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        fmt: SplitFormat,
+        header: pd.DataFrame,
+        rows: int,
+        index_label: str = "timestamp",
+        float32: bool = False,
+    ) -> None:
+        self.path = path
+        self.fmt = fmt
+        self.rows = rows
+        self.index_label = index_label
+        self.float32 = float32 and fmt != "csv"
+        self._header = header.iloc[:0]
+        self._written = 0
+        self._schema: dict[str, str] | None = None
+        self._csv = SplitCsvWriter(path, header, index_label=index_label) if fmt == "csv" else None
+        self._writer: Any = None
+        self._arrays: list[np.memmap] = []
+        if fmt in ("parquet", "feather"):
+            self._pa = _require_pyarrow()
+
+    def append(self, frame: pd.DataFrame) -> None:
+        if self._csv is not None:
+            self._csv.append(frame)
+            self._written += len(frame)
+            if self._schema is None:
+                self._schema = _schema(self._columns(frame))
+            return
+        if not len(frame):
+            return
+        self._write(self._columns(frame))
+
+    def close(self) -> dict[str, Any]:
+        """Finish the file and describe it for the manifest."""
+
+        if self._schema is None:
+            self._write(self._columns(self._header))
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for array in self._arrays:
+            array.flush()
+        if self._written != self.rows and self.fmt == "npy":
+            raise ValueError(f"Split {self.path} expected {self.rows} rows, got {self._written}")
+        return {"format": self.fmt, "rows": self._written, "schema": self._schema or {}}
+
+    def _columns(self, frame: pd.DataFrame) -> pd.DataFrame:
+        columns = frame.reset_index(names=self.index_label)
+        if self.float32:
+            floats = [c for c in columns.columns if pd.api.types.is_float_dtype(columns[c])]
+            columns = columns.astype(dict.fromkeys(floats, np.float32))
+        return columns
+
+    def _write(self, columns: pd.DataFrame) -> None:
+        if self._schema is None:
+            self._schema = _schema(columns)
+            self._open(columns)
+        if self.fmt == "npy":
+            stop = self._written + len(columns)
+            for array, column in zip(self._arrays, columns.columns):
+                array[self._written : stop] = _npy_values(columns[column])
+        elif len(columns):
+            table = self._pa.Table.from_pandas(columns, preserve_index=False)
+            self._writer.write_table(table)
+        self._written += len(columns)
+
+    def _open(self, columns: pd.DataFrame) -> None:
+        if self.fmt == "npy":
+            self.path.mkdir(parents=True, exist_ok=True)
+            files = []
+            for position, column in enumerate(columns.columns):
+                name = f"column_{position:04d}.npy"
+                values = _npy_values(columns[column])
+                self._arrays.append(
+                    np.lib.format.open_memmap(
+                        self.path / name, mode="w+", dtype=values.dtype, shape=(self.rows,)
+                    )
+                )
+                files.append(
+                    {"name": str(column), "file": name, "dtype": str(columns[column].dtype)}
+                )
+            (self.path / NPY_SCHEMA_FILENAME).write_text(
+                json.dumps({"index": self.index_label, "columns": files}, indent=2),
+                encoding="utf-8",
+            )
+            return
+        schema = self._pa.Schema.from_pandas(columns, preserve_index=False)
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(self.path, schema)
+        else:
+            options = self._pa.ipc.IpcWriteOptions(compression=None)
+            self._writer = self._pa.ipc.new_file(str(self.path), schema, options=options)
+
+
+def load_split(
+    path: Path | str,
+    split: str | None = None,
+    *,
+    columns: list[str] | None = None,
+    fmt: SplitFormat | None = None,
+    timestamp_column: str = "timestamp",
+) -> pd.DataFrame:
+    """Load a split written by `PreprocessingPipeline`, optionally only some columns.
+
+    Args:
+        path: A split file or NPY split directory, or a preprocessing output
+            directory.
+        split: Split name (`train`, `validation`, `test`) to read when `path`
+            is an output directory; the fastest format listed in its manifest
+            is used. Ignored when `path` is a split itself.
+        columns: Columns to read besides the timestamp; all when None.
+        fmt: Format to use from an output directory, or to read `path` as.
+        timestamp_column: Name of the timestamp column.
+
+    Returns:
+        Frame with the UTC `timestamp_column` first, then the requested columns.
+    """
+
+    path = _resolve_split(Path(path), split, fmt)
+    fmt = fmt or _format_of(path)
+    wanted = None if columns is None else [timestamp_column, *columns]
+    if fmt == "csv":
+        frame = pd.read_csv(path, usecols=wanted, parse_dates=[timestamp_column])
+        frame[timestamp_column] = pd.to_datetime(frame[timestamp_column], utc=True)
+    elif fmt == "npy":
+        frame = _load_npy(path, wanted)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        _require_pyarrow()
+        frame = pq.read_table(path, columns=wanted).to_pandas()
+    else:
+        feather = _require_pyarrow().feather
+        frame = feather.read_table(path, columns=wanted, memory_map=True).to_pandas()
+    if wanted is None:
+        return frame
+    return frame[wanted]
+
+
+def _resolve_split(path: Path, split: str | None, fmt: SplitFormat | None) -> Path:
+    if split is None or not path.is_dir() or (path / NPY_SCHEMA_FILENAME).exists():
+        return path
+    manifest_path = path / "manifest.json"
+    if not manifest_path.exists():
+        return split_path(path, split, fmt or "csv")
+    artifacts = json.loads(manifest_path.read_text(encoding="utf-8"))["artifacts"]
+    available: dict[str, Path] = {
+        entry.get("format", "csv"): path / entry["path"]
+        for key, entry in artifacts.items()
+        if entry.get("kind") == "split" and entry.get("split", key) == split
+    }
+    for candidate in (fmt,) if fmt is not None else _PREFERRED_FORMATS:
+        if candidate in available:
+            return available[candidate]
+    raise FileNotFoundError(f"No {fmt or 'readable'} '{split}' split listed in {manifest_path}")
+
+
+def _format_of(path: Path) -> SplitFormat:
+    if path.is_dir():
+        return "npy"
+    formats: dict[str, SplitFormat] = {".csv": "csv", ".parquet": "parquet", ".feather": "feather"}
+    if path.suffix in formats:
+        return formats[path.suffix]
+    raise ValueError(f"Cannot infer the split format of {path}; pass fmt")
+
+
+def _load_npy(path: Path, wanted: list[str] | None) -> pd.DataFrame:
+    schema = json.loads((path / NPY_SCHEMA_FILENAME).read_text(encoding="utf-8"))
+    entries = {entry["name"]: entry for entry in schema["columns"]}
+    missing = [name for name in wanted or [] if name not in entries]
+    if missing:
+        raise KeyError(f"Columns not in split {path}: {', '.join(missing)}")
+    data: dict[str, Any] = {}
+    for name in wanted or list(entries):
+        entry = entries[name]
+        values = np.load(path / entry["file"], mmap_mode="r")
+        if entry["dtype"].startswith("datetime64"):
+            data[name] = pd.to_datetime(np.asarray(values), unit="ns", utc=True)
+        else:
+            data[name] = np.asarray(values)
+    return pd.DataFrame(data)
+
+
+def _npy_values(column: pd.Series) -> np.ndarray:
+    if isinstance(column.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(column):
+        # Epoch nanoseconds in UTC, whatever unit the timestamps were held in.
+        stamps = pd.DatetimeIndex(column).as_unit("ns")
+        ticks: np.ndarray = stamps.values.view(np.int64)
+        return ticks
+    values: np.ndarray = column.to_numpy()
+    return values
+
+
+def _schema(columns: pd.DataFrame) -> dict[str, str]:
+    return {str(name): str(dtype) for name, dtype in columns.dtypes.items()}
+
+
+def _require_pyarrow() -> Any:
+    try:
+        import pyarrow as pa
+        import pyarrow.feather  # noqa: F401
+        import pyarrow.ipc  # noqa: F401
+    except ImportError as exc:  # pragma: no cover - depends on optional dependency
+        msg = "The parquet and feather split formats require pyarrow (poetry install --extras parquet)"
+        raise ImportError(msg) from exc
+    return pa
+
+
+__all__ = [
+    "SPLIT_NAMES",
+    "SplitFormat",
+    "SplitWriter",
+    "load_split",
+    "split_key",
+    "split_path",
+]
@@ -0,0 +1,510 @@
+"""Raw sample storage shared by the collector (writers) and preprocessor (readers).
+
+Two layouts are supported:
+
+* ``csv`` (legacy) — ``{prefix}_{YYYYMMDD}.csv`` with ISO timestamps and a JSON
+  labels column on every row.
+* ``parquet`` — ``metric=<name>/day=<YYYYMMDD>/part-*.parquet`` partitions with
+  int64 epoch-millisecond timestamps and dictionary-encoded metric, promql and
+  labels columns. Requires the optional ``pyarrow`` dependency.
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from itertools import repeat
+from pathlib import Path
+from typing import IO, Any, Iterator, Literal, Protocol, cast
+
+import numpy as np
+import pandas as pd
+
+from .logging import get_logger
+
+LOGGER = get_logger(__name__)
+
+RAW_FIELDNAMES = ["timestamp", "metric", "promql", "value", "labels"]
+PARQUET_ROW_GROUP_SIZE = 65_536
+
+RawStorageFormat = Literal["csv", "parquet"]
+
+
+MS_PER_DAY = 86_400_000
+
+
+@dataclass(slots=True)
+class SeriesBatch:
+    """Columnar samples of a single series returned by one query_range chunk.
+
+    `timestamps` holds sorted int64 epoch milliseconds and `values` the matching
+    float64 samples. `labels` is the canonical JSON encoding of the series
+    labels, encoded once per series and shared by every row written for it.
+    """
+
+    metric: str
+    promql: str
+    labels: str
+    timestamps: np.ndarray
+    values: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def after(self, timestamp_ms: int) -> "SeriesBatch":
+        """Return the samples strictly newer than `timestamp_ms`."""
+
+        start = int(np.searchsorted(self.timestamps, timestamp_ms, side="right"))
+        if start == 0:
+            return self
+        return self.slice(start, len(self))
+
+    def slice(self, start: int, end: int) -> "SeriesBatch":
+        return SeriesBatch(
+            metric=self.metric,
+            promql=self.promql,
+            labels=self.labels,
+            timestamps=self.timestamps[start:end],
+            values=self.values[start:end],
+        )
+
+    def day_segments(self) -> list[tuple[str, int, int]]:
+        """Split the batch into `(YYYYMMDD, start, end)` runs of consecutive rows."""
+
+        if not len(self):
+            return []
+        days = self.timestamps // MS_PER_DAY
+        bounds = [0, *(np.flatnonzero(np.diff(days)) + 1).tolist(), len(self)]
+        return [
+            (_day_of(int(self.timestamps[start])), start, end)
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+
+
+class SampleSink(Protocol):
+    def write(self, batch: SeriesBatch) -> None:
+        """Append a batch of samples to the underlying storage."""
+
+    def flush(self) -> None:
+        """Persist everything written so far, so that a checkpoint can point past it."""
+
+    def close(self) -> list[Path]:
+        """Flush pending data and return the files that received samples."""
+
+
+class LabelEncoder:
+    """Interns JSON label encodings so repeated series share one string."""
+
+    def __init__(self) -> None:
+        self._cache: dict[str, str] = {}
+
+    def encode(self, labels: dict[str, Any]) -> str:
+        encoded = json.dumps(labels, sort_keys=True)
+        return self._cache.setdefault(encoded, encoded)
+
+
+class CsvDaySink:
+    """Writes samples into `{prefix}_{YYYYMMDD}.csv` files as batches arrive.
+
+    Day files are opened lazily and kept open while batches for that day keep
+    arriving. Once a batch starts on a later day, earlier files are closed, so
+    the number of open handles stays small when chunks are written in time
+    order. A day that is revisited after being closed is appended to; with
+    `append=True` existing day files from previous runs are appended to as well.
+    """
+
+    def __init__(self, output_dir: Path, prefix: str, *, append: bool = False) -> None:
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.append = append
+        self._handles: dict[str, tuple[IO[str], Any]] = {}
+        self._closed_days: set[str] = set()
+        self._rows: dict[str, int] = {}
+
+    def write(self, batch: SeriesBatch) -> None:
+        segments = batch.day_segments()
+        if not segments:
+            return
+        self._close_days_before(segments[0][0])
+        stamps = isoformat_ms(batch.timestamps)
+        values = batch.values.tolist()
+        for day, start, end in segments:
+            writer = self._writer_for(day)
+            writer.writerows(
+                zip(
+                    stamps[start:end],
+                    repeat(batch.metric),
+                    repeat(batch.promql),
+                    values[start:end],
+                    repeat(batch.labels),
+                )
+            )
+            self._rows[day] += end - start
+
+    def flush(self) -> None:
+        for handle, _ in self._handles.values():
+            handle.flush()
+
+    def close(self) -> list[Path]:
+        self._close_days_before(None)
+        written: list[Path] = []
+        for day in sorted(self._rows):
+            path = self._path_for(day)
+            LOGGER.info("Wrote %s samples to %s", self._rows[day], path)
+            written.append(path)
+        return written
+
+    def _writer_for(self, day: str) -> Any:
+        entry = self._handles.get(day)
+        if entry is not None:
+            return entry[1]
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path_for(day)
+        reopen = day in self._closed_days or (self.append and path.exists())
+        handle = path.open("a" if reopen else "w", encoding="utf-8", newline="")
+        writer = csv.writer(handle)
+        if not reopen:
+            writer.writerow(RAW_FIELDNAMES)
+        self._handles[day] = (handle, writer)
+        self._rows.setdefault(day, 0)
+        return writer
+
+    def _close_days_before(self, day: str | None) -> None:
+        for open_day in list(self._handles):
+            if day is None or open_day < day:
+                handle, _ = self._handles.pop(open_day)
+                handle.close()
+                self._closed_days.add(open_day)
+
+    def _path_for(self, day: str) -> Path:
+        return self.output_dir / f"{self.prefix}_{day}.csv"
+
+
+class ParquetDaySink:
+    """Writes samples into metric/day partitioned Parquet files as batches arrive.
+
+    Batches are buffered per day and flushed as one row group once
+    `row_group_size` rows accumulate, so memory stays bounded by the row group
+    size rather than by the lookback. Existing parts of a day are replaced the
+    first time the sink touches it, mirroring the overwrite semantics of the
+    CSV layout; a day revisited after being closed or flushed gets an
+    additional part.
+    With `append=True` existing parts are kept and new data lands in a new part.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        metric: str,
+        *,
+        append: bool = False,
+        row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+    ) -> None:
+        self._pa, self._pq = _require_pyarrow()
+        self.output_dir = output_dir
+        self.metric = metric
+        self.append = append
+        self.row_group_size = row_group_size
+        self._schema = parquet_schema(self._pa)
+        self._writers: dict[str, Any] = {}
+        self._buffers: dict[str, list[SeriesBatch]] = {}
+        self._buffered_rows: dict[str, int] = {}
+        self._closed_days: set[str] = set()
+        self._written: dict[str, list[Path]] = {}
+        self._rows: dict[str, int] = {}
+
+    def write(self, batch: SeriesBatch) -> None:
+        segments = batch.day_segments()
+        if not segments:
+            return
+        self._close_days_before(segments[0][0])
+        for day, start, end in segments:
+            self._buffers.setdefault(day, []).append(batch.slice(start, end))
+            self._buffered_rows[day] = self._buffered_rows.get(day, 0) + end - start
+            self._rows[day] = self._rows.get(day, 0) + end - start
+            if self._buffered_rows[day] >= self.row_group_size:
+                self._flush(day)
+
+    def flush(self) -> None:
+        # A Parquet file is only readable once its footer is written, so open
+        # days are closed; later batches for them land in a new part.
+        self._close_days_before(None)
+
+    def close(self) -> list[Path]:
+        self._close_days_before(None)
+        written: list[Path] = []
+        for day in sorted(self._written):
+            LOGGER.info(
+                "Wrote %s samples to %s",
+                self._rows[day],
+                partition_dir(self.output_dir, self.metric, day),
+            )
+            written.extend(self._written[day])
+        return written
+
+    def _flush(self, day: str) -> None:
+        parts = self._buffers.pop(day, [])
+        self._buffered_rows.pop(day, None)
+        if not parts:
+            return
+        pa = self._pa
+        counts = [len(part) for part in parts]
+        table = pa.table(
+            {
+                "timestamp": pa.array(
+                    np.concatenate([part.timestamps for part in parts]), type=pa.int64()
+                ).cast(self._schema.field("timestamp").type),
+                "metric": _dictionary_column(pa, [part.metric for part in parts], counts),
+                "promql": _dictionary_column(pa, [part.promql for part in parts], counts),
+                "value": pa.array(
+                    np.concatenate([part.values for part in parts]), type=pa.float64()
+                ),
+                "labels": _dictionary_column(pa, [part.labels for part in parts], counts),
+            },
+            schema=self._schema,
+        )
+        self._writer_for(day).write_table(table)
+
+    def _writer_for(self, day: str) -> Any:
+        writer = self._writers.get(day)
+        if writer is not None:
+            return writer
+        directory = partition_dir(self.output_dir, self.metric, day)
+        directory.mkdir(parents=True, exist_ok=True)
+        if not self.append and day not in self._closed_days:
+            for stale in directory.glob("*.parquet"):
+                stale.unlink()
+        path = directory / f"part-{uuid.uuid4().hex[:12]}.parquet"
+        writer = self._pq.ParquetWriter(path, self._schema)
+        self._writers[day] = writer
+        self._written.setdefault(day, []).append(path)
+        return writer
+
+    def _close_days_before(self, day: str | None) -> None:
+        for open_day in sorted(set(self._writers) | set(self._buffers)):
+            if day is not None and open_day >= day:
+                continue
+            self._flush(open_day)
+            writer = self._writers.pop(open_day, None)
+            if writer is not None:
+                writer.close()
+            self._closed_days.add(open_day)
+
+
+def open_sink(
+    storage_format: RawStorageFormat,
+    output_dir: Path,
+    *,
+    metric: str,
+    prefix: str,
+    append: bool = False,
+) -> SampleSink:
+    """Create the sink implementing `storage_format` for a single metric."""
+
+    if storage_format == "parquet":
+        return ParquetDaySink(output_dir, metric, append=append)
+    return CsvDaySink(output_dir, prefix, append=append)
+
+
+def read_raw(
+    paths: list[str],
+    *,
+    storage_format: RawStorageFormat,
+    metrics: list[str],
+    timestamp_column: str = "timestamp",
+    metric_column: str = "metric",
+    value_column: str = "value",
+    label_column: str | None = None,
+) -> pd.DataFrame:
+    """Load raw samples for `metrics` into a long frame with UTC timestamps.
+
+    Parquet partitions whose ``metric=<name>`` directory is not requested are
+    skipped without being opened, and the metric filter is pushed down into the
+    remaining reads. When `label_column` is given, the series labels are
+    returned as well, as strings.
+    """
+
+    columns = [timestamp_column, metric_column, value_column]
+    if label_column is not None:
+        columns.append(label_column)
+    if storage_format == "parquet":
+        return _read_parquet(paths, columns, metrics, metric_column)
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path, parse_dates=[timestamp_column])
+        missing = [column for column in columns if column not in df.columns]
+        if missing:
+            raise ValueError(f"Raw file {path} has no {', '.join(missing)} column")
+        frames.append(_select_csv_rows(df, columns, metrics, metric_column))
+    combined = pd.concat(frames, ignore_index=True)
+    combined[timestamp_column] = pd.to_datetime(combined[timestamp_column], utc=True)
+    return combined
+
+
+def iter_raw(
+    paths: list[str],
+    *,
+    storage_format: RawStorageFormat,
+    metrics: list[str],
+    chunk_rows: int,
+    timestamp_column: str = "timestamp",
+    metric_column: str = "metric",
+    value_column: str = "value",
+) -> Iterator[pd.DataFrame]:
+    """Stream the rows `read_raw` would return in pieces of at most `chunk_rows`.
+
+    Pieces are yielded in the same file and row order as `read_raw`, with the
+    same column types, so concatenating them reproduces its result.
+    """
+
+    columns = [timestamp_column, metric_column, value_column]
+    if storage_format == "parquet":
+        yield from _iter_parquet(paths, columns, metrics, metric_column, chunk_rows)
+        return
+    for path in paths:
+        with pd.read_csv(path, parse_dates=[timestamp_column], chunksize=chunk_rows) as reader:
+            for df in reader:
+                df = _select_csv_rows(df, columns, metrics, metric_column)
+                if df.empty:
+                    continue
+                yield df.assign(
+                    **{timestamp_column: pd.to_datetime(df[timestamp_column], utc=True)}
+                )
+
+
+def _select_csv_rows(
+    df: pd.DataFrame, columns: list[str], metrics: list[str], metric_column: str
+) -> pd.DataFrame:
+    df = df[columns]
+    return df[df[metric_column].isin(metrics)]
+
+
+def partition_dir(output_dir: Path, metric: str, day: str) -> Path:
+    return output_dir / f"metric={metric}" / f"day={day}"
+
+
+def parquet_schema(pa: Any) -> Any:
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema(
+        [
+            ("timestamp", pa.timestamp("ms", tz="UTC")),
+            ("metric", dictionary),
+            ("promql", dictionary),
+            ("value", pa.float64()),
+            ("labels", dictionary),
+        ]
+    )
+
+
+def _read_parquet(
+    paths: list[str], columns: list[str], metrics: list[str], metric_column: str
+) -> pd.DataFrame:
+    pa, pq = _require_pyarrow()
+    wanted = set(metrics)
+    tables = []
+    for path in paths:
+        partition = _partition_metric(path)
+        if partition is not None and partition not in wanted:
+            continue
+        tables.append(
+            pq.read_table(path, columns=columns, filters=[(metric_column, "in", metrics)])
+        )
+    if not tables:
+        return pd.DataFrame(columns=columns)
+    table = pa.concat_tables(tables, promote_options="permissive")
+    for column in columns:
+        if pa.types.is_dictionary(table.schema.field(column).type):
+            index = table.schema.get_field_index(column)
+            table = table.set_column(index, column, table.column(column).cast(pa.string()))
+    return cast(pd.DataFrame, table.to_pandas())
+
+
+def _iter_parquet(
+    paths: list[str],
+    columns: list[str],
+    metrics: list[str],
+    metric_column: str,
+    chunk_rows: int,
+) -> Iterator[pd.DataFrame]:
+    pa, pq = _require_pyarrow()
+    pc = _require_pyarrow_compute()
+    wanted = set(metrics)
+    for path in paths:
+        partition = _partition_metric(path)
+        if partition is not None and partition not in wanted:
+            continue
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            table = pa.Table.from_batches([batch])
+            names = table.column(metric_column).cast(pa.string())
+            table = table.set_column(
+                table.schema.get_field_index(metric_column), metric_column, names
+            )
+            table = table.filter(pc.is_in(names, value_set=pa.array(metrics, pa.string())))
+            if table.num_rows:
+                yield cast(pd.DataFrame, table.to_pandas())
+
+
+def isoformat_ms(timestamps: np.ndarray) -> list[str]:
+    """Vectorized `datetime.isoformat()` for int64 epoch milliseconds in UTC."""
+
+    moments = timestamps.astype("datetime64[ms]")
+    stamps = np.datetime_as_string(moments, unit="s")
+    fractional = timestamps % 1000 != 0
+    if fractional.any():
+        stamps = np.where(fractional, np.datetime_as_string(moments, unit="us"), stamps)
+    return [f"{stamp}+00:00" for stamp in stamps.tolist()]
+
+
+def _dictionary_column(pa: Any, keys: list[str], counts: list[int]) -> Any:
+    dictionary = list(dict.fromkeys(keys))
+    positions = {key: index for index, key in enumerate(dictionary)}
+    indices = np.repeat(np.array([positions[key] for key in keys], dtype=np.int32), counts)
+    return pa.DictionaryArray.from_arrays(pa.array(indices), pa.array(dictionary))
+
+
+def _partition_metric(path: str) -> str | None:
+    for part in Path(path).parts:
+        if part.startswith("metric="):
+            return part.split("=", 1)[1]
+    return None
+
+
+def _require_pyarrow() -> tuple[Any, Any]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # pragma: no cover - depends on optional dependency
+        msg = "The parquet raw storage format requires pyarrow (poetry install --extras parquet)"
+        raise ImportError(msg) from exc
+    return pa, pq
+
+
+def _require_pyarrow_compute() -> Any:
+    _require_pyarrow()
+    import pyarrow.compute as pc
+
+    return pc
+
+
+def _day_of(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=UTC).strftime("%Y%m%d")
+
+
+__all__ = [
+    "CsvDaySink",
+    "LabelEncoder",
+    "MS_PER_DAY",
+    "ParquetDaySink",
+    "RAW_FIELDNAMES",
+    "RawStorageFormat",
+    "SampleSink",
+    "SeriesBatch",
+    "isoformat_ms",
+    "iter_raw",
+    "open_sink",
+    "partition_dir",
+    "read_raw",
+]
@@ -0,0 +1,174 @@
+"""Tests for remote-read and exposition-dump bulk imports."""
+
+from __future__ import annotations
+
+import csv
+import json
+import struct
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import httpx
+import numpy as np
+import pytest
+
+from k8s_ml_predictive_autoscaling.collector import collect_historical
+from k8s_ml_predictive_autoscaling.collector.bulk_import import BulkImporter, iter_exposition_series
+from k8s_ml_predictive_autoscaling.collector.config import CollectorConfig
+from k8s_ml_predictive_autoscaling.collector.remote_read import (
+    LabelMatcher,
+    RemoteReadClient,
+    decode_read_response,
+    parse_selector,
+    snappy_compress,
+    snappy_decompress,
+)
+
+NOW = datetime(2024, 1, 1, 12, tzinfo=UTC)
+
+
+def varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def message(field: int, payload: bytes) -> bytes:
+    return varint(field << 3 | 2) + varint(len(payload)) + payload
+
+
+def encode_response(series: list[tuple[dict[str, str], list[tuple[int, float]]]]) -> bytes:
+    encoded = b""
+    for labels, samples in series:
+        body = b"".join(
+            message(1, message(1, name.encode()) + message(2, value.encode()))
+            for name, value in labels.items()
+        )
+        body += b"".join(
+            message(2, b"\x09" + struct.pack("<d", value) + b"\x10" + varint(stamp))
+            for stamp, value in samples
+        )
+        encoded += message(1, body)
+    return message(1, encoded)
+
+
+def config_for(tmp_path: Path, promql: str) -> CollectorConfig:
+    return CollectorConfig.model_validate(
+        {
+            "collection": {"output_dir": tmp_path, "lookback_hours": 2, "chunk_hours": 1},
+            "metrics": [{"name": "requests", "promql": promql, "output_prefix": "requests"}],
+        }
+    )
+
+
+def read_rows(paths: list[Path]) -> list[dict[str, str]]:
+    return [row for path in paths for row in csv.DictReader(path.open(encoding="utf-8"))]
+
+
+def test_parse_selector() -> None:
+    matchers = parse_selector('http_requests_total{job="api", pod=~"web-.*",code!="500"}')
+
+    assert matchers == [
+        LabelMatcher("__name__", "=", "http_requests_total"),
+        LabelMatcher("job", "=", "api"),
+        LabelMatcher("pod", "=~", "web-.*"),
+        LabelMatcher("code", "!=", "500"),
+    ]
+    assert matchers[2].matches({"pod": "web-1"})
+    assert not matchers[2].matches({"pod": "db-web-1"})
+    with pytest.raises(ValueError, match="plain series selector"):
+        parse_selector("rate(http_requests_total[5m])")
+
+
+def test_snappy_roundtrip_and_copies() -> None:
+    data = b"remote read " * 100
+    assert snappy_decompress(snappy_compress(data)) == data
+    # "abc" literal followed by a 9-byte overlapping copy at offset 3.
+    assert snappy_decompress(bytes([12, 2 << 2]) + b"abc" + bytes([5 << 2 | 1, 3])) == b"abc" * 4
+
+
+def test_decode_read_response_handles_mixed_varint_widths() -> None:
+    payload = encode_response([({"__name__": "up"}, [(1_000, 1.0), (1_700_000_000_000, 2.5)])])
+
+    [[series]] = decode_read_response(payload)
+
+    assert series.labels == {"__name__": "up"}
+    np.testing.assert_array_equal(series.timestamps, [1_000, 1_700_000_000_000])
+    np.testing.assert_array_equal(series.values, [1.0, 2.5])
+
+
+def test_remote_read_import_writes_raw_csv(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz: Any = None) -> "FrozenDatetime":
+            return cls.fromtimestamp(NOW.timestamp(), tz=tz)
+
+    monkeypatch.setattr(collect_historical, "datetime", FrozenDatetime)
+    monkeypatch.setattr(
+        "k8s_ml_predictive_autoscaling.collector.bulk_import.datetime", FrozenDatetime
+    )
+    requests: list[bytes] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = snappy_decompress(request.content)
+        requests.append(body)
+        assert request.headers["X-Prometheus-Remote-Read-Version"] == "0.1.0"
+        assert b"http_requests_total" in body
+        end_ms = int(NOW.timestamp() * 1000) - (2 - len(requests)) * 3_600_000
+        samples = [(end_ms - 3_600_000 + 15_000 * index, float(index)) for index in range(241)]
+        payload = encode_response([({"__name__": "http_requests_total", "pod": "a"}, samples)])
+        return httpx.Response(200, content=snappy_compress(payload))
+
+    client = RemoteReadClient(
+        "http://prometheus:9090",
+        client=httpx.Client(transport=httpx.MockTransport(handler), base_url="http://prometheus"),
+    )
+    importer = BulkImporter(config_for(tmp_path, 'http_requests_total{pod="a"}'))
+
+    outputs = importer.import_remote_read([(client, {"cluster": "eu"})])
+
+    rows = read_rows(outputs)
+    assert len(requests) == 2
+    assert len(rows) == 481  # two hourly windows of 241 samples sharing one boundary sample
+    assert json.loads(rows[0]["labels"]) == {
+        "__name__": "http_requests_total",
+        "pod": "a",
+        "cluster": "eu",
+    }
+
+
+def test_openmetrics_dump_import(tmp_path: Path) -> None:
+    start = int(NOW.timestamp())
+    dump = [
+        "# HELP http_requests_total Requests.",
+        "# TYPE http_requests_total counter",
+        *(f'http_requests_total{{pod="a"}} {i} {start + 15 * i}.000' for i in range(4)),
+        *(
+            f'http_requests_total{{pod="b"}} {i} {start + 15 * i} # {{trace_id="x"}} 1'
+            for i in range(2)
+        ),
+        *(f'other_metric{{pod="a"}} 1 {start + 15 * i}' for i in range(3)),
+        "# EOF",
+    ]
+    importer = BulkImporter(config_for(tmp_path, "http_requests_total"))
+
+    rows = read_rows(importer.import_openmetrics(dump))
+
+    assert len(rows) == 6
+    assert {json.loads(row["labels"])["pod"] for row in rows} == {"a", "b"}
+    assert rows[0]["timestamp"].startswith("2024-01-01T12:00:00")
+
+
+def test_promtool_dump_uses_millisecond_timestamps() -> None:
+    start_ms = int(NOW.timestamp() * 1000)
+    lines = [f'{{__name__="up", job="api"}} 1 {start_ms + 30_000 * i}' for i in range(3)]
+
+    [series] = list(iter_exposition_series(lines))
+
+    assert series.labels == {"__name__": "up", "job": "api"}
+    np.testing.assert_array_equal(series.timestamps, start_ms + 30_000 * np.arange(3))
+    assert series.timestamps.dtype == np.int64
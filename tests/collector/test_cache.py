@@ -0,0 +1,126 @@
+"""Tests for the query_range response cache."""
+
+from __future__ import annotations
+
+import os
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from k8s_ml_predictive_autoscaling.collector.cache import (
+    AsyncCachedPrometheusClient,
+    CachedPrometheusClient,
+    QueryRangeCache,
+)
+
+STEP = timedelta(seconds=30)
+NOW = datetime(2024, 1, 2, tzinfo=UTC)
+
+
+def grid_result(start: datetime, end: datetime) -> list[dict[str, Any]]:
+    points = int((end - start) / STEP) + 1
+    values = [[(start + STEP * index).timestamp(), "1.0"] for index in range(points)]
+    return [{"metric": {"pod": "demo"}, "values": values}]
+
+
+class CountingClient:
+    def __init__(self) -> None:
+        self.calls: list[tuple[datetime, datetime]] = []
+
+    def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        self.calls.append((start, end))
+        return grid_result(start, end)
+
+
+class AsyncCountingClient(CountingClient):
+    async def query_range(  # type: ignore[override]
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        return CountingClient.query_range(self, query, start=start, end=end, step=step)
+
+
+def test_cached_client_serves_repeated_requests_from_disk(tmp_path: Path) -> None:
+    inner = CountingClient()
+    cache = QueryRangeCache(tmp_path, max_bytes=10_000_000)
+    client = CachedPrometheusClient(
+        inner, cache, immutable_after=timedelta(hours=1), clock=lambda: NOW
+    )
+    start = NOW - timedelta(hours=6, seconds=7)
+    end = NOW - timedelta(hours=5)
+
+    first = client.query_range("up", start=start, end=end, step=STEP)
+    second = client.query_range("up", start=start, end=end, step=STEP)
+
+    assert len(inner.calls) == 1
+    assert inner.calls[0][0] == NOW - timedelta(hours=6, seconds=30)
+    assert first == second
+
+
+def test_cached_client_fetches_live_tail(tmp_path: Path) -> None:
+    inner = CountingClient()
+    cache = QueryRangeCache(tmp_path, max_bytes=10_000_000)
+    client = CachedPrometheusClient(
+        inner, cache, immutable_after=timedelta(hours=1), clock=lambda: NOW
+    )
+    start = NOW - timedelta(hours=2)
+
+    result = client.query_range("up", start=start, end=NOW, step=STEP)
+    client.query_range("up", start=start, end=NOW, step=STEP)
+
+    horizon = NOW - timedelta(hours=1)
+    assert inner.calls == [
+        (start, horizon),
+        (horizon + STEP, NOW),
+        (horizon + STEP, NOW),
+    ]
+    timestamps = [point[0] for point in result[0]["values"]]
+    assert timestamps == sorted(set(timestamps))
+    assert len(timestamps) == int((NOW - start) / STEP) + 1
+
+
+@pytest.mark.asyncio
+async def test_async_cached_client_reuses_entries(tmp_path: Path) -> None:
+    inner = AsyncCountingClient()
+    cache = QueryRangeCache(tmp_path, max_bytes=10_000_000)
+    client = AsyncCachedPrometheusClient(
+        inner, cache, immutable_after=timedelta(hours=1), clock=lambda: NOW
+    )
+    start, end = NOW - timedelta(hours=4), NOW - timedelta(hours=3)
+
+    await client.query_range("up", start=start, end=end, step=STEP)
+    await client.query_range("up", start=start, end=end, step=STEP)
+
+    assert inner.calls == [(start, end)]
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    payload = grid_result(NOW - timedelta(hours=1), NOW)
+    probe = QueryRangeCache(tmp_path / "probe", max_bytes=10_000_000)
+    probe.put("00probe", payload)
+    entry_size = sum(path.stat().st_size for path in (tmp_path / "probe").rglob("*.json.gz"))
+
+    cache = QueryRangeCache(tmp_path / "cache", max_bytes=entry_size * 2)
+    cache.put("aa", payload)
+    cache.put("bb", payload)
+    os.utime(cache._path_for("aa"), (0, 0))
+    os.utime(cache._path_for("bb"), (1, 1))
+    assert cache.get("aa") == payload  # refreshes "aa", leaving "bb" as the oldest entry
+    cache.put("cc", payload)
+
+    assert cache.get("bb") is None
+    assert cache.get("aa") == payload
+    assert cache.get("cc") == payload
@@ -0,0 +1,83 @@
+"""Tests for adaptive chunk sizing."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+
+import httpx
+
+from k8s_ml_predictive_autoscaling.collector.chunking import (
+    AdaptiveChunkPlanner,
+    is_splittable_error,
+)
+from k8s_ml_predictive_autoscaling.collector.prometheus_client import PrometheusQueryError
+
+
+def _planner(initial: timedelta = timedelta(hours=6)) -> AdaptiveChunkPlanner:
+    return AdaptiveChunkPlanner(
+        step=timedelta(seconds=30),
+        initial=initial,
+        min_span=timedelta(minutes=5),
+        max_points_per_series=11_000,
+        target_samples=10_000,
+        target_seconds=5.0,
+    )
+
+
+def test_planner_caps_span_at_prometheus_resolution_limit() -> None:
+    planner = _planner(initial=timedelta(days=7))
+
+    assert planner.span == timedelta(seconds=30 * 10_999)
+
+
+def test_planner_grows_small_responses_and_shrinks_heavy_ones() -> None:
+    planner = _planner()
+
+    planner.record_success(timedelta(hours=6), samples=100, seconds=0.1)
+    assert planner.span == timedelta(hours=12)
+
+    planner.record_success(timedelta(hours=12), samples=40_000, seconds=0.1)
+    assert planner.span == timedelta(hours=3)
+
+
+def test_planner_halves_on_failure_until_minimum() -> None:
+    planner = _planner(initial=timedelta(minutes=10))
+
+    assert planner.record_failure(timedelta(minutes=10))
+    assert planner.span == timedelta(minutes=5)
+    assert not planner.record_failure(timedelta(minutes=5))
+
+
+def test_planner_spans_and_split_points_are_whole_steps() -> None:
+    step = timedelta(seconds=45)
+    planner = AdaptiveChunkPlanner(
+        step=step,
+        initial=timedelta(hours=6),
+        min_span=timedelta(seconds=10),
+        max_points_per_series=11_000,
+        target_samples=10_000,
+        target_seconds=5.0,
+    )
+
+    assert planner.min_span == step
+    spans = [planner.span]
+    while planner.record_failure(planner.span):
+        spans.append(planner.span)
+    planner.record_success(planner.span, samples=3_000, seconds=0.1)
+    spans.append(planner.span)
+    assert spans[-2] == step
+    assert all(span % step == timedelta(0) for span in spans)
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    assert planner.split_point(start, start + timedelta(seconds=675)) == start + 7 * step
+    assert planner.split_point(start, start + step * 1.5) == start + step
+
+
+def test_is_splittable_error_detects_resolution_and_timeouts() -> None:
+    resolution = PrometheusQueryError(
+        "exceeded maximum resolution of 11,000 points per timeseries", "bad_data"
+    )
+
+    assert is_splittable_error(resolution)
+    assert is_splittable_error(PrometheusQueryError("query timed out", "timeout"))
+    assert is_splittable_error(httpx.ReadTimeout("slow"))
+    assert not is_splittable_error(PrometheusQueryError("parse error", "bad_data"))
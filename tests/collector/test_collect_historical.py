@@ -2,12 +2,21 @@
 
 from __future__ import annotations
 
+import asyncio
+import math
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
 from typing import Any
 
-from k8s_ml_predictive_autoscaling.collector.collect_historical import HistoricalCollector
+import pytest
+
+from k8s_ml_predictive_autoscaling.collector import collect_historical
+from k8s_ml_predictive_autoscaling.collector.collect_historical import (
+    AsyncHistoricalCollector,
+    HistoricalCollector,
+)
 from k8s_ml_predictive_autoscaling.collector.config import CollectorConfig
+from k8s_ml_predictive_autoscaling.collector.prometheus_client import PrometheusQueryError
 
 
 class StubPrometheusClient:
@@ -27,7 +36,112 @@ class StubPrometheusClient:
         return self.payload
 
 
-def config_for_tests(tmp_path: Path) -> CollectorConfig:
+class StubAsyncPrometheusClient:
+    """Answers each chunk with its start timestamp, finishing later chunks first."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.02 / self.calls)
+        self.in_flight -= 1
+        return [{"metric": {"pod": "demo"}, "values": [[start.timestamp(), "1.0"]]}]
+
+
+class SlowFirstChunkClient:
+    """Answers the first request late, recording how many chunks were requested meanwhile."""
+
+    def __init__(self) -> None:
+        self.requested = 0
+        self.requested_while_first_pending: int | None = None
+
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        self.requested += 1
+        if self.requested == 1:
+            await asyncio.sleep(0.05)
+            self.requested_while_first_pending = self.requested
+        return [{"metric": {"pod": "demo"}, "values": [[start.timestamp(), "1.0"]]}]
+
+
+class GridPrometheusClient:
+    """Returns one sample per 30s grid point inside the requested range, inclusive."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[datetime, datetime]] = []
+
+    def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        self.calls.append((start, end))
+        first = math.ceil(start.timestamp() / 30) * 30
+        stamps = range(int(first), int(end.timestamp()) + 1, 30)
+        return [{"metric": {"pod": "demo"}, "values": [[ts, "1.0"] for ts in stamps]}]
+
+
+class ResolutionLimitedClient(GridPrometheusClient):
+    """Rejects ranges longer than `limit` like Prometheus' resolution limit."""
+
+    def __init__(self, limit: timedelta = timedelta(minutes=20)) -> None:
+        super().__init__()
+        self.limit = limit
+
+    def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        if end - start > self.limit:
+            self.calls.append((start, end))
+            raise PrometheusQueryError("exceeded maximum resolution of 11,000 points", "bad_data")
+        return super().query_range(query, start=start, end=end, step=step)
+
+
+class AsyncAdapter:
+    """Serves a synchronous stub client through the async interface."""
+
+    def __init__(self, client: GridPrometheusClient) -> None:
+        self.client = client
+
+    async def query_range(self, query: str, **kwargs: Any) -> list[dict[str, Any]]:
+        return self.client.query_range(query, **kwargs)
+
+
+class FrozenDatetime(datetime):
+    current = datetime(2024, 1, 1, 12, tzinfo=UTC)
+
+    @classmethod
+    def now(cls, tz: Any = None) -> "FrozenDatetime":
+        return cls.fromtimestamp(cls.current.timestamp(), tz=tz)
+
+
+def config_for_tests(tmp_path: Path, **collection: Any) -> CollectorConfig:
     return CollectorConfig.model_validate(
         {
             "prometheus": {"base_url": "http://localhost:9090"},
@@ -36,6 +150,7 @@ def config_for_tests(tmp_path: Path) -> CollectorConfig:
                 "lookback_hours": 1,
                 "chunk_hours": 1,
                 "default_step": "30s",
+                **collection,
             },
             "metrics": [
                 {
@@ -81,3 +196,116 @@ def test_collect_invokes_prometheus_with_chunks(tmp_path: Path) -> None:
     collector.collect()
 
     assert client.calls  # at least one call executed
+
+
+@pytest.mark.asyncio
+async def test_async_collector_bounds_concurrency_and_keeps_order(tmp_path: Path) -> None:
+    client = StubAsyncPrometheusClient()
+    config = config_for_tests(tmp_path, lookback_hours=6, concurrency=2)
+    collector = AsyncHistoricalCollector(config, client)
+
+    outputs = await collector.collect()
+
+    assert client.max_in_flight == 2
+    rows = [
+        line.split(",")[0]
+        for path in sorted(outputs)
+        for line in path.read_text(encoding="utf-8").splitlines()[1:]
+    ]
+    assert len(rows) == 6
+    assert rows == sorted(rows)
+
+
+@pytest.mark.asyncio
+async def test_async_collector_bounds_chunks_waiting_for_a_slow_one(tmp_path: Path) -> None:
+    client = SlowFirstChunkClient()
+    config = config_for_tests(tmp_path, lookback_hours=6, concurrency=3, max_pending_chunks=2)
+
+    outputs = await AsyncHistoricalCollector(config, client).collect()
+
+    assert client.requested_while_first_pending == 2
+    assert client.requested == 6
+    rows = [
+        line.split(",")[0]
+        for path in sorted(outputs)
+        for line in path.read_text(encoding="utf-8").splitlines()[1:]
+    ]
+    assert len(rows) == 6
+    assert rows == sorted(rows)
+
+
+def test_incremental_collection_resumes_from_watermark(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(collect_historical, "datetime", FrozenDatetime)
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 1, 1, 12, tzinfo=UTC))
+    config = config_for_tests(tmp_path, chunk_hours=1, incremental=True)
+
+    first_client = GridPrometheusClient()
+    outputs = HistoricalCollector(config, first_client).collect()  # type: ignore[arg-type]
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 1, 1, 12, 10, tzinfo=UTC))
+    second_client = GridPrometheusClient()
+    HistoricalCollector(config, second_client).collect()  # type: ignore[arg-type]
+
+    assert (tmp_path / ".collector_state.json").exists()
+    assert second_client.calls == [
+        (datetime(2024, 1, 1, 12, tzinfo=UTC), datetime(2024, 1, 1, 12, 10, tzinfo=UTC))
+    ]
+    rows = outputs[0].read_text(encoding="utf-8").splitlines()[1:]
+    stamps = [row.split(",")[0] for row in rows]
+    assert len(stamps) == len(set(stamps)) == 121 + 20
+    assert stamps == sorted(stamps)
+
+
+def test_adaptive_collection_splits_rejected_chunks(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(collect_historical, "datetime", FrozenDatetime)
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 1, 1, 12, tzinfo=UTC))
+    config = config_for_tests(tmp_path, adaptive_chunks=True, min_chunk_minutes=5)
+    client = ResolutionLimitedClient()
+
+    outputs = HistoricalCollector(config, client).collect()  # type: ignore[arg-type]
+
+    spans = [end - start for start, end in client.calls]
+    assert spans[:3] == [timedelta(hours=1), timedelta(minutes=30), timedelta(minutes=15)]
+    rows = outputs[0].read_text(encoding="utf-8").splitlines()[1:]
+    stamps = [row.split(",")[0] for row in rows]
+    assert len(stamps) == len(set(stamps)) == 121
+
+
+@pytest.mark.asyncio
+async def test_async_adaptive_collection_splits_on_whole_steps(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(collect_historical, "datetime", FrozenDatetime)
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 1, 1, 12, tzinfo=UTC))
+    config = config_for_tests(
+        tmp_path, lookback_hours=2, adaptive_chunks=True, min_chunk_minutes=1, concurrency=2
+    )
+    client = ResolutionLimitedClient(limit=timedelta(minutes=4))
+
+    outputs = await AsyncHistoricalCollector(config, AsyncAdapter(client)).collect()
+
+    first = client.calls[0][0]
+    assert all((start - first) % timedelta(seconds=30) == timedelta(0) for start, _ in client.calls)
+    assert min(end - start for start, end in client.calls) < timedelta(minutes=4)
+    rows = outputs[0].read_text(encoding="utf-8").splitlines()[1:]
+    stamps = [row.split(",")[0] for row in rows]
+    assert len(stamps) == len(set(stamps)) == 241
+    assert stamps == sorted(stamps)
+
+
+@pytest.mark.asyncio
+async def test_async_adaptive_collection_grows_small_chunks(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(collect_historical, "datetime", FrozenDatetime)
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 1, 1, 12, tzinfo=UTC))
+    config = config_for_tests(tmp_path, lookback_hours=6, adaptive_chunks=True, concurrency=1)
+    client = GridPrometheusClient()
+
+    await AsyncHistoricalCollector(config, AsyncAdapter(client)).collect()
+
+    spans = [end - start for start, end in client.calls]
+    assert spans == [timedelta(hours=1), timedelta(hours=2), timedelta(hours=3)]
@@ -0,0 +1,219 @@
+"""Tests for multi-source Prometheus federation."""
+
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from k8s_ml_predictive_autoscaling.collector.collect_historical import AsyncHistoricalCollector
+from k8s_ml_predictive_autoscaling.collector.config import CollectorConfig
+from k8s_ml_predictive_autoscaling.collector.federation import (
+    FederatedPrometheusClient,
+    FederatedSource,
+)
+
+
+class ShardClient:
+    def __init__(
+        self,
+        pod: str,
+        *,
+        delay: float = 0.0,
+        fail: bool = False,
+        timeout_over: timedelta | None = None,
+    ) -> None:
+        self.pod = pod
+        self.delay = delay
+        self.fail = fail
+        self.timeout_over = timeout_over
+        self.finished: list[float] = []
+
+    async def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.pod} is down")
+        if self.timeout_over is not None and end - start > self.timeout_over:
+            raise httpx.ReadTimeout(f"{self.pod} timed out")
+        self.finished.append(asyncio.get_running_loop().time())
+        return [
+            {
+                "metric": {"pod": self.pod, "cluster": "scraped"},
+                "values": [[start.timestamp(), "1.0"], [end.timestamp(), "2.0"]],
+            }
+        ]
+
+
+def window() -> dict[str, Any]:
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    return {"start": start, "end": start + timedelta(minutes=1), "step": timedelta(seconds=30)}
+
+
+@pytest.mark.asyncio
+async def test_federated_client_merges_sources_and_injects_labels() -> None:
+    client = FederatedPrometheusClient(
+        [
+            FederatedSource("eu", ShardClient("a"), labels={"cluster": "eu"}),
+            FederatedSource("us", ShardClient("b"), labels={"cluster": "us"}),
+        ]
+    )
+
+    result = await client.query_range("up", **window())
+
+    assert [series["metric"] for series in result] == [
+        {"pod": "a", "cluster": "eu", "exported_cluster": "scraped"},
+        {"pod": "b", "cluster": "us", "exported_cluster": "scraped"},
+    ]
+    assert client.stats["eu"].requests == 1
+    assert client.stats["us"].samples == 2
+
+
+@pytest.mark.asyncio
+async def test_fast_source_chunks_keep_flowing_while_another_is_slow(tmp_path: Path) -> None:
+    config = CollectorConfig.model_validate(
+        {
+            "collection": {
+                "output_dir": tmp_path,
+                "lookback_hours": 6,
+                "chunk_hours": 1,
+                "max_pending_chunks": 6,
+            },
+            "metrics": [{"name": "cpu", "promql": "up", "output_prefix": "cpu"}],
+        }
+    )
+    slow, fast = ShardClient("slow", delay=0.05), ShardClient("fast")
+    client = FederatedPrometheusClient(
+        [FederatedSource("slow", slow), FederatedSource("fast", fast)]
+    )
+
+    await AsyncHistoricalCollector(config, client).collect()
+
+    # One slot per source: the slow shard's queue does not hold the fast shard's requests.
+    assert len(slow.finished) == len(fast.finished) == 6
+    assert fast.finished[-1] < slow.finished[0]
+    assert client.stats["slow"].max_seconds >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_required_source_failure_cancels_other_requests() -> None:
+    slow = ShardClient("slow", delay=0.1)
+    client = FederatedPrometheusClient(
+        [FederatedSource("slow", slow), FederatedSource("main", ShardClient("a", fail=True))]
+    )
+
+    with pytest.raises(RuntimeError, match="a is down"):
+        await client.query_range("up", **window())
+    await asyncio.sleep(0.2)
+
+    assert slow.finished == []
+
+
+@pytest.mark.asyncio
+async def test_optional_source_failure_is_skipped_and_counted() -> None:
+    client = FederatedPrometheusClient(
+        [
+            FederatedSource("main", ShardClient("a")),
+            FederatedSource("edge", ShardClient("b", fail=True), optional=True),
+        ]
+    )
+
+    result = await client.query_range("up", **window())
+
+    assert [series["metric"]["pod"] for series in result] == ["a"]
+    assert client.stats["edge"].failures == 1
+
+    client.sources[1].optional = False
+    with pytest.raises(RuntimeError, match="b is down"):
+        await client.query_range("up", **window())
+
+
+@pytest.mark.asyncio
+async def test_optional_source_timeouts_are_split_before_being_skipped(tmp_path: Path) -> None:
+    config = CollectorConfig.model_validate(
+        {
+            "collection": {
+                "output_dir": tmp_path,
+                "lookback_hours": 1,
+                "chunk_hours": 1,
+                "adaptive_chunks": True,
+                "min_chunk_minutes": 5,
+            },
+            "metrics": [{"name": "cpu", "promql": "up", "output_prefix": "cpu"}],
+        }
+    )
+    client = FederatedPrometheusClient(
+        [
+            FederatedSource("main", ShardClient("a")),
+            FederatedSource(
+                "edge", ShardClient("b", timeout_over=timedelta(minutes=20)), optional=True
+            ),
+            FederatedSource("dead", ShardClient("c", timeout_over=timedelta(0)), optional=True),
+        ]
+    )
+    with pytest.raises(httpx.ReadTimeout, match="c timed out"):
+        await client.query_range("up", **window())
+
+    outputs = await AsyncHistoricalCollector(config, client).collect()
+
+    rows = [row for path in outputs for row in csv.DictReader(path.open(encoding="utf-8"))]
+    assert {json.loads(row["labels"])["pod"] for row in rows} == {"a", "b"}
+    assert client.stats["dead"].failures > 1
+
+
+@pytest.mark.asyncio
+async def test_collector_writes_all_sources_into_one_dataset(tmp_path: Path) -> None:
+    config = CollectorConfig.model_validate(
+        {
+            "collection": {"output_dir": tmp_path, "lookback_hours": 1, "chunk_hours": 1},
+            "sources": [
+                {"name": "eu", "base_url": "http://eu:9090", "labels": {"cluster": "eu"}},
+                {"name": "us", "base_url": "http://us:9090", "labels": {"cluster": "us"}},
+            ],
+            "metrics": [{"name": "cpu", "promql": "up", "output_prefix": "cpu"}],
+        }
+    )
+    client = FederatedPrometheusClient(
+        [
+            FederatedSource(source.name, ShardClient(source.name), labels=source.labels)
+            for source in config.resolved_sources()
+        ]
+    )
+
+    outputs = await AsyncHistoricalCollector(config, client).collect()
+
+    rows = [row for path in outputs for row in csv.DictReader(path.open(encoding="utf-8"))]
+    clusters = {json.loads(row["labels"])["cluster"] for row in rows}
+    assert clusters == {"eu", "us"}
+
+
+def test_sources_default_to_single_prometheus_endpoint() -> None:
+    config = CollectorConfig.model_validate(
+        {"prometheus": {"base_url": "http://prom:9090"}, "metrics": [{"name": "m", "promql": "up"}]}
+    )
+
+    sources = config.resolved_sources()
+
+    assert [(source.name, source.base_url) for source in sources] == [
+        ("default", "http://prom:9090")
+    ]
+    with pytest.raises(ValidationError, match="Duplicate Prometheus source names"):
+        CollectorConfig.model_validate(
+            {
+                "sources": [{"name": "a"}, {"name": "a"}],
+                "metrics": [{"name": "m", "promql": "up"}],
+            }
+        )
@@ -0,0 +1,122 @@
+"""Tests for collector self-instrumentation."""
+
+from __future__ import annotations
+
+import json
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from k8s_ml_predictive_autoscaling.collector.collect_historical import (
+    AsyncHistoricalCollector,
+    HistoricalCollector,
+)
+from k8s_ml_predictive_autoscaling.collector.config import CollectorConfig
+from k8s_ml_predictive_autoscaling.collector.instrumentation import CollectorInstrumentation
+from k8s_ml_predictive_autoscaling.collector.prometheus_client import (
+    AsyncPrometheusClient,
+    PrometheusQueryError,
+)
+
+
+class SplittingClient:
+    """Returns two series per chunk and rejects chunks longer than 30 minutes."""
+
+    def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        if end - start > timedelta(minutes=30):
+            raise PrometheusQueryError("exceeded maximum resolution of 11,000 points", "bad_data")
+        values = [[start.timestamp(), "1.0"], [end.timestamp(), "2.0"]]
+        return [{"metric": {"pod": pod}, "values": values} for pod in ("a", "b")]
+
+
+def make_config(tmp_path: Path, **collection: Any) -> CollectorConfig:
+    return CollectorConfig.model_validate(
+        {
+            "collection": {
+                "output_dir": str(tmp_path),
+                "lookback_hours": 1,
+                "chunk_hours": 1,
+                **collection,
+            },
+            "instrumentation": {"textfile_path": str(tmp_path / "collector.prom")},
+            "metrics": [
+                {"name": "cpu", "promql": "cpu_query"},
+                {"name": "memory", "promql": "memory_query"},
+            ],
+        }
+    )
+
+
+def test_collector_writes_report_and_textfile(tmp_path: Path) -> None:
+    config = make_config(tmp_path, adaptive_chunks=True, min_chunk_minutes=5)
+
+    HistoricalCollector(config, SplittingClient()).collect()
+
+    report = json.loads((tmp_path / "collector_report.json").read_text(encoding="utf-8"))
+    cpu = report["metrics"]["cpu"]
+    assert cpu["promql"] == "cpu_query"
+    assert cpu["errors"] == 1
+    assert cpu["retries"] == 1
+    assert cpu["series_max"] == 2
+    assert cpu["queries"] == 3
+    assert cpu["samples"] == 8
+    assert report["totals"]["retries"] == 2
+    assert len(report["slowest_queries"]) <= 10
+
+    textfile = (tmp_path / "collector.prom").read_text(encoding="utf-8")
+    assert 'collector_queries_total{metric="cpu",status="error"} 1.0' in textfile
+    assert 'collector_query_retries_total{metric="memory"} 1.0' in textfile
+    assert 'collector_series{metric="cpu"} 2.0' in textfile
+    assert "collector_query_duration_seconds_bucket" in textfile
+
+
+@pytest.mark.asyncio
+async def test_response_bytes_are_attributed_per_query(tmp_path: Path) -> None:
+    bodies: dict[str, int] = {}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        query = request.url.params["query"]
+        payload = {
+            "status": "success",
+            "data": {"result": [{"metric": {"q": query}, "values": [[1, "1"]] * len(query)}]},
+        }
+        response = httpx.Response(200, json=payload)
+        bodies[query] = bodies.get(query, 0) + len(response.content)
+        return response
+
+    transport = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler), base_url="http://prometheus"
+    )
+    client = AsyncPrometheusClient("http://prometheus", client=transport)
+    config = make_config(tmp_path, concurrency=4, chunk_hours=1, lookback_hours=3)
+    collector = AsyncHistoricalCollector(config, client)
+
+    await collector.collect()
+    await transport.aclose()
+
+    report = collector.instrumentation.report()
+    assert report["metrics"]["cpu"]["bytes"] == bodies["cpu_query"]
+    assert report["metrics"]["memory"]["bytes"] == bodies["memory_query"]
+    assert report["metrics"]["cpu"]["queries"] == 3
+
+
+def test_failed_query_is_recorded_and_reraised() -> None:
+    instrumentation = CollectorInstrumentation()
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+
+    with pytest.raises(RuntimeError):
+        with instrumentation.query("cpu", "up", start, start + timedelta(hours=1)):
+            raise RuntimeError("boom")
+
+    [record] = instrumentation.report()["slowest_queries"]
+    assert record["error"] == "RuntimeError: boom"
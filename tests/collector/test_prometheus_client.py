@@ -2,14 +2,18 @@
 
 from __future__ import annotations
 
+import importlib.util
 from datetime import UTC, datetime, timedelta
 
 import httpx
+import numpy as np
 import pytest
 
 from k8s_ml_predictive_autoscaling.collector.prometheus_client import (
+    AsyncPrometheusClient,
     PrometheusClient,
     PrometheusQueryError,
+    decode_values,
 )
 
 
@@ -51,3 +55,49 @@ def test_query_range_raises_on_error_status() -> None:
             end=datetime(2024, 1, 1, 0, 5, tzinfo=UTC),
             step=timedelta(minutes=1),
         )
+
+
+@pytest.mark.asyncio
+async def test_async_query_range_returns_result() -> None:
+    seen: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.params["start"])
+        payload = {
+            "status": "success",
+            "data": {"result": [{"metric": {}, "values": [[1, "0.5"]]}]},
+        }
+        return httpx.Response(200, json=payload)
+
+    transport = httpx.MockTransport(handler)
+    http_client = httpx.AsyncClient(transport=transport, base_url="http://prometheus:9090")
+    async with AsyncPrometheusClient(
+        "http://prometheus:9090", client=http_client, max_requests_per_second=100
+    ) as client:
+        result = await client.query_range(
+            "up",
+            start=datetime(2024, 1, 1, tzinfo=UTC),
+            end=datetime(2024, 1, 1, 0, 5, tzinfo=UTC),
+            step=timedelta(minutes=1),
+        )
+    await http_client.aclose()
+    assert result
+    assert seen == [f"{datetime(2024, 1, 1, tzinfo=UTC).timestamp():.3f}"]
+
+
+def test_async_client_names_the_http2_extra_without_h2() -> None:
+    if importlib.util.find_spec("h2") is not None:
+        pytest.skip("h2 is installed")
+
+    with pytest.raises(ImportError, match="--extras http2"):
+        AsyncPrometheusClient("http://prometheus:9090", http2=True)
+
+
+def test_decode_values_returns_numpy_columns() -> None:
+    timestamps, values = decode_values([[1704067200, "0.5"], [1704067230.5, "NaN"]])
+
+    assert timestamps.dtype == np.int64
+    assert timestamps.tolist() == [1704067200000, 1704067230500]
+    assert values.dtype == np.float64
+    assert values[0] == 0.5
+    assert np.isnan(values[1])
@@ -0,0 +1,339 @@
+"""Tests for retries, circuit breaking and resumption of interrupted runs."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from k8s_ml_predictive_autoscaling.collector import collect_historical
+from k8s_ml_predictive_autoscaling.collector.collect_historical import HistoricalCollector
+from k8s_ml_predictive_autoscaling.collector.config import CollectorConfig
+from k8s_ml_predictive_autoscaling.collector.instrumentation import CollectorInstrumentation
+from k8s_ml_predictive_autoscaling.collector.prometheus_client import PrometheusQueryError
+from k8s_ml_predictive_autoscaling.collector.resilience import (
+    AsyncRetryingPrometheusClient,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryingPrometheusClient,
+    RetryPolicy,
+    circuit_breaker_for,
+    is_retryable_error,
+)
+from k8s_ml_predictive_autoscaling.collector.state import WatermarkStore
+
+START = datetime(2024, 1, 1, tzinfo=UTC)
+STEP = timedelta(seconds=30)
+
+
+class FlakyClient:
+    """Fails with the queued errors first, then answers one sample per 30s grid point."""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.calls: list[tuple[datetime, datetime]] = []
+
+    def query_range(
+        self,
+        query: str,
+        *,
+        start: datetime,
+        end: datetime,
+        step: timedelta,
+    ) -> list[dict[str, Any]]:
+        self.calls.append((start, end))
+        if self.errors:
+            raise self.errors.pop(0)
+        first = math.ceil(start.timestamp() / 30) * 30
+        stamps = range(int(first), int(end.timestamp()) + 1, 30)
+        return [{"metric": {"pod": "demo"}, "values": [[ts, "1.0"] for ts in stamps]}]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def unavailable() -> PrometheusQueryError:
+    return PrometheusQueryError("HTTP 503", status_code=503)
+
+
+def test_retries_transient_errors_with_backoff() -> None:
+    sleeps: list[float] = []
+    client = FlakyClient(unavailable(), httpx.ConnectError("refused"))
+    retrying = RetryingPrometheusClient(
+        client, retry=RetryPolicy(max_attempts=3, base_delay=1.0), sleep=sleeps.append
+    )
+
+    result = retrying.query_range("up", start=START, end=START + STEP, step=STEP)
+
+    assert len(result) == 1
+    assert len(client.calls) == 3
+    assert len(sleeps) == 2
+    assert 0 <= sleeps[0] <= 1.0 and 0 <= sleeps[1] <= 2.0
+
+
+def test_does_not_retry_bad_queries() -> None:
+    sleeps: list[float] = []
+    client = FlakyClient(PrometheusQueryError("parse error", "bad_data", 400))
+    retrying = RetryingPrometheusClient(client, retry=RetryPolicy(), sleep=sleeps.append)
+
+    with pytest.raises(PrometheusQueryError, match="parse error"):
+        retrying.query_range("up{", start=START, end=START + STEP, step=STEP)
+
+    assert len(client.calls) == 1
+    assert not sleeps
+    assert not is_retryable_error(httpx.ReadTimeout("slow"))
+
+
+def test_gives_up_after_max_attempts() -> None:
+    client = FlakyClient(*(unavailable() for _ in range(3)))
+    retrying = RetryingPrometheusClient(
+        client, retry=RetryPolicy(max_attempts=3), sleep=lambda _: None
+    )
+
+    with pytest.raises(PrometheusQueryError, match="503"):
+        retrying.query_range("up", start=START, end=START + STEP, step=STEP)
+
+    assert len(client.calls) == 3
+
+
+def test_circuit_breaker_opens_and_recovers_through_a_trial_call() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker(
+        "http://prometheus", failure_threshold=2, reset_seconds=10, clock=clock
+    )
+    client = FlakyClient(unavailable(), unavailable(), unavailable())
+    retrying = RetryingPrometheusClient(
+        client, retry=RetryPolicy(max_attempts=1), breaker=breaker, sleep=lambda _: None
+    )
+
+    def query() -> list[dict[str, Any]]:
+        return retrying.query_range("up", start=START, end=START + STEP, step=STEP)
+
+    for _ in range(2):
+        with pytest.raises(PrometheusQueryError):
+            query()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        query()
+    assert len(client.calls) == 2  # rejected without contacting Prometheus
+
+    clock.now = 10
+    assert breaker.state == "half-open"
+    with pytest.raises(PrometheusQueryError, match="503"):
+        query()  # the trial call fails and reopens the circuit
+    assert breaker.state == "open"
+
+    clock.now = 20
+    assert len(query()) == 1
+    assert breaker.state == "closed"
+    assert len(client.calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_cancelled_trial_call_does_not_keep_the_circuit_half_open() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker("http://prometheus", failure_threshold=1, reset_seconds=5, clock=clock)
+    breaker.record_failure()
+    clock.now = 5
+
+    class HangingClient:
+        async def query_range(self, query: str, **kwargs: Any) -> list[dict[str, Any]]:
+            await asyncio.Event().wait()
+            return []
+
+    hanging = AsyncRetryingPrometheusClient(
+        HangingClient(), retry=RetryPolicy(max_attempts=1), breaker=breaker
+    )
+    trial = asyncio.create_task(hanging.query_range("up", start=START, end=START + STEP, step=STEP))
+    await asyncio.sleep(0)
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert breaker.state == "half-open"
+    breaker.before_call()  # the next caller gets the trial instead of CircuitOpenError
+
+
+def test_shared_breaker_takes_settings_of_the_latest_client() -> None:
+    first = circuit_breaker_for("http://shared-prometheus", failure_threshold=5, reset_seconds=30)
+    second = circuit_breaker_for("http://shared-prometheus", failure_threshold=2, reset_seconds=1)
+
+    assert second is first
+    assert (first.failure_threshold, first.reset_seconds) == (2, 1)
+
+
+def test_retry_waits_for_open_circuit() -> None:
+    clock = FakeClock()
+    breaker = CircuitBreaker("http://prometheus", failure_threshold=1, reset_seconds=5, clock=clock)
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        clock.now += seconds
+
+    client = FlakyClient(unavailable())
+    retrying = RetryingPrometheusClient(
+        client, retry=RetryPolicy(base_delay=0.1), breaker=breaker, sleep=sleep
+    )
+
+    assert len(retrying.query_range("up", start=START, end=START + STEP, step=STEP)) == 1
+    assert sleeps == [5.0]
+
+
+@pytest.mark.asyncio
+async def test_async_client_retries() -> None:
+    sleeps: list[float] = []
+
+    class AsyncFlaky:
+        def __init__(self) -> None:
+            self.sync = FlakyClient(unavailable())
+
+        async def query_range(self, query: str, **kwargs: Any) -> list[dict[str, Any]]:
+            return self.sync.query_range(query, **kwargs)
+
+    async def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+
+    inner = AsyncFlaky()
+    retrying = AsyncRetryingPrometheusClient(inner, retry=RetryPolicy(), sleep=sleep)
+
+    assert len(await retrying.query_range("up", start=START, end=START + STEP, step=STEP)) == 1
+    assert len(inner.sync.calls) == 2
+    assert len(sleeps) == 1
+
+
+def test_retries_are_counted_in_the_report() -> None:
+    instrumentation = CollectorInstrumentation()
+    retrying = RetryingPrometheusClient(
+        FlakyClient(unavailable(), unavailable()), retry=RetryPolicy(), sleep=lambda _: None
+    )
+
+    with instrumentation.query("cpu", "up", START, START + STEP) as record:
+        record.observe_result(retrying.query_range("up", start=START, end=START + STEP, step=STEP))
+
+    assert instrumentation.report()["metrics"]["cpu"]["retries"] == 2
+
+
+class FrozenDatetime(datetime):
+    current = datetime(2024, 1, 1, 12, tzinfo=UTC)
+
+    @classmethod
+    def now(cls, tz: Any = None) -> "FrozenDatetime":
+        return cls.fromtimestamp(cls.current.timestamp(), tz=tz)
+
+
+def make_config(tmp_path: Path, **collection: Any) -> CollectorConfig:
+    return CollectorConfig.model_validate(
+        {
+            "collection": {
+                "output_dir": str(tmp_path),
+                "lookback_hours": 3,
+                "chunk_hours": 1,
+                "default_step": "30s",
+                **collection,
+            },
+            "metrics": [
+                {"name": "cpu", "promql": "cpu_query"},
+                {"name": "memory", "promql": "memory_query"},
+            ],
+        }
+    )
+
+
+def test_interrupted_run_resumes_from_checkpoint(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(collect_historical, "datetime", FrozenDatetime)
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 1, 1, 12, tzinfo=UTC))
+    config = make_config(tmp_path)
+    failing = FlakyClient()
+    failing.query_range = _fail_on_call(failing.query_range, 5)  # type: ignore[method-assign]
+
+    with pytest.raises(PrometheusQueryError):
+        HistoricalCollector(config, failing).collect()
+
+    state = json.loads(config.collection.state_path.read_text(encoding="utf-8"))
+    assert state["pending_run"]["checkpoints"] == {
+        "cpu": "2024-01-01T12:00:00+00:00",
+        "memory": "2024-01-01T10:00:00+00:00",
+    }
+
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 1, 1, 12, 30, tzinfo=UTC))
+    client = FlakyClient()
+    outputs = HistoricalCollector(config, client).collect()
+
+    # The completed metric is skipped and the run keeps its original end time.
+    assert client.calls == [
+        (datetime(2024, 1, 1, 10, tzinfo=UTC), datetime(2024, 1, 1, 11, tzinfo=UTC)),
+        (datetime(2024, 1, 1, 11, tzinfo=UTC), datetime(2024, 1, 1, 12, tzinfo=UTC)),
+    ]
+    for path in outputs:
+        stamps = [row.split(",")[0] for row in path.read_text(encoding="utf-8").splitlines()[1:]]
+        assert len(stamps) == len(set(stamps)) == 361
+        assert stamps == sorted(stamps)
+    assert WatermarkStore.load(config.collection.state_path).pending_run is None
+
+
+def test_checkpoint_is_saved_after_every_chunk(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(collect_historical, "datetime", FrozenDatetime)
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 1, 1, 12, tzinfo=UTC))
+    config = make_config(tmp_path)
+    client = FlakyClient()
+    seen: list[tuple[dict[str, str], int]] = []
+    query_range = client.query_range
+
+    def observing(query: str, **kwargs: Any) -> list[dict[str, Any]]:
+        if len(client.calls) == 2:
+            state = json.loads(config.collection.state_path.read_text(encoding="utf-8"))
+            rows = (tmp_path / "cpu_20240101.csv").read_text(encoding="utf-8").splitlines()
+            seen.append((state["pending_run"]["checkpoints"], len(rows) - 1))
+        return query_range(query, **kwargs)
+
+    client.query_range = observing  # type: ignore[method-assign]
+    HistoricalCollector(config, client).collect()
+
+    # While the third chunk is requested, the first two are on disk and checkpointed.
+    assert seen == [({"cpu": "2024-01-01T11:00:00+00:00"}, 241)]
+
+
+def test_restart_discards_pending_run(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(collect_historical, "datetime", FrozenDatetime)
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 1, 1, 12, tzinfo=UTC))
+    failing = FlakyClient(unavailable())
+    with pytest.raises(PrometheusQueryError):
+        HistoricalCollector(make_config(tmp_path), failing).collect()
+
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 1, 1, 13, tzinfo=UTC))
+    client = FlakyClient()
+    HistoricalCollector(make_config(tmp_path, resume_failed_runs=False), client).collect()
+
+    assert client.calls[0] == (
+        datetime(2024, 1, 1, 10, tzinfo=UTC),
+        datetime(2024, 1, 1, 11, tzinfo=UTC),
+    )
+
+
+def _fail_on_call(query_range: Any, failing_call: int) -> Any:
+    calls = 0
+
+    def wrapper(query: str, **kwargs: Any) -> list[dict[str, Any]]:
+        nonlocal calls
+        calls += 1
+        if calls == failing_call:
+            raise unavailable()
+        return query_range(query, **kwargs)
+
+    return wrapper
@@ -1,6 +1,87 @@
 """Pytest configuration and shared fixtures."""
 
+from __future__ import annotations
+
+import json
 import os
+from pathlib import Path
+from typing import Any, Callable, Mapping, Sequence
 
 os.environ.setdefault("AUTOSCALER_API_TOKEN", "unit-test-token")
 os.environ.setdefault("AUTOSCALER_API_KEY_HEADER", "X-API-Key")
+
+# Imported after the environment above, which the package settings read on import.
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+
+from k8s_ml_predictive_autoscaling.preprocessor.config import (  # noqa: E402
+    ExecutionConfig,
+    PreprocessorConfig,
+)
+
+
+@pytest.fixture()
+def write_raw(tmp_path: Path) -> Callable[..., Path]:
+    """Write raw samples into `tmp_path / raw`.
+
+    `data` is either a long frame written as is or metric names to draw
+    normally distributed values for, optionally tagged with `labels`.
+    """
+
+    def write(
+        data: Sequence[str] | pd.DataFrame,
+        *,
+        periods: int = 300,
+        freq: str = "1min",
+        start: str = "2024-01-01",
+        seed: int = 0,
+        mean: float = 5.0,
+        std: float = 1.0,
+        labels: Mapping[str, str] | None = None,
+        raw: str = "raw",
+        name: str = "metrics.csv",
+    ) -> Path:
+        raw_dir = tmp_path / raw
+        raw_dir.mkdir(parents=True, exist_ok=True)
+        if isinstance(data, pd.DataFrame):
+            data.to_csv(raw_dir / name, index=False)
+            return raw_dir / name
+        stamps = pd.date_range(start, periods=periods, freq=freq, tz="UTC")
+        rng = np.random.default_rng(seed)
+        frames = [
+            pd.DataFrame(
+                {"timestamp": stamps, "metric": metric, "value": rng.normal(mean, std, periods)}
+            )
+            for metric in data
+        ]
+        frame = pd.concat(frames)
+        if labels is not None:
+            frame["labels"] = json.dumps(dict(labels), sort_keys=True)
+        frame.to_csv(raw_dir / name, index=False)
+        return raw_dir / name
+
+    return write
+
+
+@pytest.fixture()
+def make_config(tmp_path: Path) -> Callable[..., PreprocessorConfig]:
+    """Build a config reading `tmp_path / raw` and writing to `tmp_path / output`."""
+
+    def build(
+        output: str = "out",
+        *,
+        raw: str = "raw",
+        execution: dict[str, Any] | None = None,
+        **settings: Any,
+    ) -> PreprocessorConfig:
+        return PreprocessorConfig.model_validate(
+            {
+                "input_glob": str(tmp_path / raw / "*.csv"),
+                "output_dir": tmp_path / output,
+                "execution": ExecutionConfig.model_validate(execution or {}),
+                **settings,
+            }
+        )
+
+    return build
@@ -0,0 +1,111 @@
+"""Parity tests between online feature state and the batch feature engine."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from k8s_ml_predictive_autoscaling.predictor.features import OnlineFeatureState
+from k8s_ml_predictive_autoscaling.preprocessor.config import (
+    AnomalyConfig,
+    FeatureConfig,
+    PreprocessorConfig,
+)
+from k8s_ml_predictive_autoscaling.preprocessor.feature_engineering import FeaturePlan
+from k8s_ml_predictive_autoscaling.preprocessor.pipeline import PreprocessingPipeline
+
+
+def _frame(rows: int = 400) -> pd.DataFrame:
+    rng = np.random.default_rng(21)
+    index = pd.date_range("2024-01-06 21:00", periods=rows, freq="1min", tz="UTC")
+    frame = pd.DataFrame(
+        {
+            "cpu_metrics": rng.normal(0.7, 0.3, rows),
+            "memory_metrics": rng.lognormal(5, 1, rows),
+            "request_rate": rng.normal(100, 40, rows),
+        },
+        index=index,
+    )
+    return frame
+
+
+@pytest.mark.parametrize("precision", ["float64", "float32"])
+def test_online_features_match_batch_pipeline_bit_for_bit(precision: str) -> None:
+    config = PreprocessorConfig(
+        metrics=["request_rate", "cpu_metrics", "memory_metrics"],
+        features=FeatureConfig(lags=[1, 5, 15, 30], rolling_windows=[5, 15, 30, 7]),
+        precision=precision,
+    )
+    frame = _frame()
+    frame.iloc[57, 1] = np.nan
+    expected = PreprocessingPipeline(config)._engineer_features(frame)
+    state = OnlineFeatureState.from_config(config)
+
+    rows = [state.update(stamp, row.to_dict()) for stamp, row in frame.iterrows()]
+
+    assert state.names == list(expected.columns)
+    np.testing.assert_array_equal(np.stack(rows), expected.to_numpy(dtype=precision), strict=True)
+    assert state.ready
+
+
+@pytest.mark.parametrize("method", ["rolling_mad", "ewma"])
+def test_online_anomaly_flags_match_batch_pipeline(method: str) -> None:
+    config = PreprocessorConfig(
+        metrics=["request_rate", "cpu_metrics"],
+        features=FeatureConfig(lags=[1, 4], rolling_windows=[3]),
+        anomaly=AnomalyConfig.model_validate(
+            {"method": method, "mode": "flag", "window": 12, "zscore_threshold": 2.0}
+        ),
+    )
+    frame = _frame()[["cpu_metrics", "request_rate"]]
+    frame.iloc[[40, 41, 200], 1] *= 8
+    pipeline = PreprocessingPipeline(config)
+    expected = pipeline._engineer_features(pipeline._filter_anomalies(frame))
+    state = OnlineFeatureState.from_config(config)
+
+    rows = [state.update(stamp, row.to_dict()) for stamp, row in frame.iterrows()]
+
+    assert state.names == list(expected.columns)
+    assert state.flag_columns == ["request_rate_anomaly", "cpu_metrics_anomaly"]
+    assert expected["request_rate_anomaly"].sum() >= 2
+    np.testing.assert_array_equal(np.stack(rows), expected.to_numpy(dtype=float), strict=True)
+
+
+def test_online_state_rejects_whole_series_anomaly_treatment() -> None:
+    config = PreprocessorConfig(anomaly=AnomalyConfig(method="zscore", mode="flag"))
+
+    with pytest.raises(ValueError, match="use rolling_mad or ewma"):
+        OnlineFeatureState.from_config(config)
+
+
+def test_online_state_tracks_readiness_and_missing_metrics() -> None:
+    frame = _frame(6)
+    plan = FeaturePlan.build(frame.columns, ["cpu_metrics"], lags=[2], rolling_windows=[3])
+    state = OnlineFeatureState(plan, list(frame.columns), freq="1min")
+
+    first = state.update(frame.index[0], {"cpu_metrics": 1.0})
+    assert np.isnan(first[1:3]).all()
+    assert np.isnan(first[-2:]).all()
+    assert not state.ready
+    state.update(frame.index[1], {"cpu_metrics": 2.0})
+    third = state.update(frame.index[2], {"cpu_metrics": 6.0})
+    assert state.ready
+    assert third[-2:].tolist() == [1.0, 3.0]
+
+
+def test_online_state_rejects_gaps_and_future_lags() -> None:
+    frame = _frame(3)
+    plan = FeaturePlan.build(frame.columns, ["cpu_metrics"], lags=[1], rolling_windows=[2])
+    state = OnlineFeatureState(plan, list(frame.columns), freq="1min")
+    state.update(frame.index[0], {})
+
+    with pytest.raises(ValueError, match="gaps must be filled"):
+        state.update(frame.index[2], {})
+    with pytest.raises(ValueError, match="time order"):
+        state.update(frame.index[0], {})
+    with pytest.raises(ValueError, match="negative lags"):
+        OnlineFeatureState(
+            FeaturePlan.build(frame.columns, ["cpu_metrics"], lags=[-1], rolling_windows=[]),
+            list(frame.columns),
+        )
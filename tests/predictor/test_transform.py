@@ -0,0 +1,130 @@
+"""Tests for the fitted transform artifact and its numpy-only runtime."""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from k8s_ml_predictive_autoscaling.predictor import OnlineFeatureState, load_transform
+from k8s_ml_predictive_autoscaling.preprocessor.config import (
+    FeatureConfig,
+    PreprocessorConfig,
+    SlidingWindowConfig,
+)
+from k8s_ml_predictive_autoscaling.preprocessor.pipeline import PreprocessingPipeline
+
+METRICS = ["request_rate", "cpu_metrics"]
+Run = tuple[PreprocessingPipeline, dict[str, Path]]
+
+
+@pytest.fixture
+def run(
+    write_raw: Callable[..., Path], make_config: Callable[..., PreprocessorConfig]
+) -> Callable[..., Run]:
+    def run(output: str = "processed", *, raw: str = "raw", **overrides: Any) -> Run:
+        write_raw(METRICS, periods=240, seed=4, std=2, raw=raw)
+        config = make_config(
+            output,
+            raw=raw,
+            metrics=METRICS,
+            scaler_features=["request_rate", "cpu_metrics_lag_1"],
+            features=FeatureConfig(lags=[1, 3], rolling_windows=[4]),
+            sliding_window=SlidingWindowConfig(
+                sequence_length=5, forecast_steps=[2, 6], target_metric="request_rate"
+            ),
+            **overrides,
+        )
+        pipeline = PreprocessingPipeline(config)
+        return pipeline, pipeline.run()
+
+    return run
+
+
+def test_artifact_reproduces_the_fitted_scaler(run: Callable[..., Run]) -> None:
+    pipeline, outputs = run()
+
+    artifact = load_transform(outputs["transform"].parent)
+
+    assert artifact.feature_columns == OnlineFeatureState.from_artifact(artifact).names
+    assert artifact.metric_columns == ["cpu_metrics", "request_rate"]
+    assert artifact.target_columns == [
+        "target_request_rate_t+2",
+        "target_request_rate_t+6",
+    ]
+    assert artifact.config_hash == pipeline.config_hash()
+    batch = np.random.default_rng(8).normal(3, 2, (50, len(artifact.feature_columns)))
+    transformed = artifact.transform(batch)
+    positions = [artifact.feature_columns.index(name) for name in artifact.scaled_columns]
+    expected = pipeline.scaler.transform(
+        pd.DataFrame(batch[:, positions], columns=artifact.scaled_columns)
+    )
+    np.testing.assert_array_equal(transformed[:, positions], expected)
+    untouched = [i for i in range(batch.shape[1]) if i not in positions]
+    np.testing.assert_array_equal(transformed[:, untouched], batch[:, untouched])
+    np.testing.assert_array_equal(artifact.transform(batch[0]), transformed[0])
+
+    manifest = json.loads(outputs["manifest"].read_text(encoding="utf-8"))
+    assert manifest["artifacts"]["transform"]["config_hash"] == artifact.config_hash
+
+
+def test_artifact_records_anomaly_flags_apart_from_metrics(run: Callable[..., Run]) -> None:
+    anomaly = {"method": "ewma", "mode": "flag", "window": 10, "zscore_threshold": 2.0}
+    _, outputs = run(anomaly=anomaly)
+
+    artifact = load_transform(outputs["transform"])
+
+    assert artifact.metric_columns == ["cpu_metrics", "request_rate"]
+    assert artifact.flag_columns == ["request_rate_anomaly", "cpu_metrics_anomaly"]
+    assert artifact.anomaly is not None and artifact.anomaly.method == "ewma"
+    assert artifact.feature_columns == OnlineFeatureState.from_artifact(artifact).names
+
+
+def test_artifact_records_the_feature_precision(run: Callable[..., Run]) -> None:
+    _, outputs = run(precision="float32")
+
+    state = OnlineFeatureState.from_artifact(load_transform(outputs["transform"]))
+
+    assert state.dtype == np.float32
+    assert state.update(pd.Timestamp("2024-01-01", tz="UTC"), {}).dtype == np.float32
+
+
+def test_config_hash_tracks_transform_settings(run: Callable[..., Run]) -> None:
+    first, _ = run("a", raw="raw-a")
+    moved, _ = run("b", raw="raw-b")
+    changed, _ = run("c", raw="raw-c", resample_rule="2min")
+
+    assert first.config_hash() == moved.config_hash()
+    assert first.config_hash() != changed.config_hash()
+
+
+def test_artifact_rejects_unknown_versions(run: Callable[..., Run]) -> None:
+    _, outputs = run()
+    payload = json.loads(outputs["transform"].read_text(encoding="utf-8"))
+    payload["version"] = 99
+    outputs["transform"].write_text(json.dumps(payload), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="version 99"):
+        load_transform(outputs["transform"])
+
+
+def test_runtime_imports_without_pandas_or_sklearn() -> None:
+    code = (
+        "import sys; import k8s_ml_predictive_autoscaling.predictor.transform; "
+        "print(sorted({'pandas', 'sklearn'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,143 @@
+"""Tests for the epoch-grid alignment engine."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from k8s_ml_predictive_autoscaling.preprocessor.alignment import align_samples, fill_gaps, long_gaps
+from k8s_ml_predictive_autoscaling.preprocessor.config import (
+    FeatureConfig,
+    PreprocessorConfig,
+    SlidingWindowConfig,
+)
+from k8s_ml_predictive_autoscaling.preprocessor.pipeline import PreprocessingPipeline
+
+
+def _samples(unit: str = "ns", seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = 4_000
+    offsets = np.sort(rng.integers(0, 6 * 3_600, rows))
+    stamps = pd.Timestamp("2024-01-01 22:00", tz="UTC") + pd.to_timedelta(offsets, unit="s")
+    values = rng.lognormal(2, 2, rows) * rng.choice([-1.0, 1.0], rows)
+    values[rng.random(rows) < 0.05] = np.nan
+    frame = pd.DataFrame(
+        {
+            "timestamp": stamps.as_unit(unit),
+            "metric": rng.choice(["cpu", "memory", "requests"], rows),
+            "value": values,
+        }
+    )
+    # Drop a stretch of one metric and add one that only has missing values.
+    frame = frame[~((frame["metric"] == "memory") & (offsets > 3_600) & (offsets < 7_200))]
+    missing = pd.DataFrame({"timestamp": stamps[:3], "metric": "latency", "value": np.nan})
+    return pd.concat([frame, missing], ignore_index=True).sample(frac=1, random_state=seed)
+
+
+def _pandas_grid(frame: pd.DataFrame, rule: str) -> pd.DataFrame:
+    ordered = frame.sort_values(by="timestamp", kind="stable")
+    pivot = ordered.pivot_table(index="timestamp", columns="metric", values="value")
+    return pivot.sort_index().resample(rule).mean()
+
+
+@pytest.mark.parametrize("rule", ["1s", "30s", "1min", "7min", "1h"])
+@pytest.mark.parametrize("unit", ["ns", "ms"])
+def test_align_samples_matches_pivot_and_resample(rule: str, unit: str) -> None:
+    frame = _samples(unit)
+
+    grid = align_samples(
+        frame, rule=rule, timestamp_column="timestamp", metric_column="metric", value_column="value"
+    )
+
+    expected = _pandas_grid(frame, rule)
+    assert grid is not None
+    pd.testing.assert_frame_equal(grid, expected, check_exact=True)
+    assert np.array_equal(grid.to_numpy(), expected.to_numpy(), equal_nan=True)
+
+
+def test_align_samples_declines_calendar_rules() -> None:
+    frame = _samples()
+    kwargs = {"timestamp_column": "timestamp", "metric_column": "metric", "value_column": "value"}
+
+    assert align_samples(frame, rule="MS", **kwargs) is None
+    assert align_samples(frame.assign(value=np.nan), rule="1min", **kwargs) is None
+
+
+@pytest.mark.parametrize("method", ["time", "linear"])
+def test_fill_gaps_matches_interpolate_ffill_bfill(method: str) -> None:
+    grid = _pandas_grid(_samples(), "1min")
+    grid.iloc[:5, 0] = np.nan
+
+    filled = fill_gaps(grid, method="time" if method == "time" else "linear")
+
+    expected = grid.interpolate(method=method).ffill().bfill()
+    pd.testing.assert_frame_equal(filled, expected, check_exact=True)
+
+
+def test_fill_gaps_leaves_long_gaps_missing() -> None:
+    index = pd.date_range("2024-01-01", periods=9, freq="1min", tz="UTC")
+    grid = pd.DataFrame(
+        {"a": [np.nan, 1, np.nan, 3, np.nan, np.nan, np.nan, 7, np.nan]}, index=index
+    )
+
+    filled = fill_gaps(grid, method="time", max_gap=2)
+
+    np.testing.assert_array_equal(filled["a"], [1, 1, 2, 3, np.nan, np.nan, np.nan, 7, 7])
+    missing = np.array([[True, False], [True, True], [False, True], [True, True]])
+    np.testing.assert_array_equal(
+        long_gaps(missing, 1), [[True, False], [True, True], [False, True], [False, True]]
+    )
+
+
+def test_pipeline_engines_write_identical_outputs(
+    write_raw: Callable[..., Path], make_config: Callable[..., PreprocessorConfig]
+) -> None:
+    frame = _samples()
+    write_raw(frame[frame["metric"] != "latency"])
+
+    def run(name: str, **overrides: Any) -> dict[str, Path]:
+        config = make_config(
+            name,
+            metrics=["cpu", "memory", "requests"],
+            features=FeatureConfig(lags=[1, 3], rolling_windows=[4]),
+            sliding_window=SlidingWindowConfig(
+                sequence_length=4, forecast_steps=[1], target_metric="requests"
+            ),
+            **overrides,
+        )
+        return PreprocessingPipeline(config).run()
+
+    grid, reference = run("grid"), run("pandas", resample_engine="pandas")
+    for key in ("train", "validation", "test", "sequences_train", "transform"):
+        assert grid[key].read_bytes() == reference[key].read_bytes()
+
+    limited = run("limited", interpolation_max_gap=5)
+    limited_reference = run("limited-pandas", interpolation_max_gap=5, resample_engine="pandas")
+    train = pd.read_csv(limited["train"])
+    assert len(train) < len(pd.read_csv(grid["train"]))
+    assert limited["train"].read_bytes() == limited_reference["train"].read_bytes()
+
+
+@pytest.mark.parametrize("mode", ["memory", "chunked"])
+def test_pipeline_reports_gap_limit_masking_every_row(
+    write_raw: Callable[..., Path], make_config: Callable[..., PreprocessorConfig], mode: str
+) -> None:
+    write_raw(["cpu"], periods=600, name="cpu.csv")
+    write_raw(["memory"], periods=60, freq="10min", name="memory.csv")
+    config = make_config(
+        execution={"mode": mode},
+        metrics=["cpu", "memory"],
+        resample_rule="1min",
+        interpolation_max_gap=2,
+        features=FeatureConfig(lags=[1], rolling_windows=[]),
+        sliding_window=SlidingWindowConfig(
+            sequence_length=4, forecast_steps=[1], target_metric="cpu"
+        ),
+    )
+
+    with pytest.raises(ValueError, match="interpolation_max_gap=2"):
+        PreprocessingPipeline(config).run()
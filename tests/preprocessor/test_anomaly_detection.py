@@ -0,0 +1,105 @@
+"""Tests for the anomaly detectors and treatment modes."""
+
+from __future__ import annotations
+
+from typing import Literal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from k8s_ml_predictive_autoscaling.preprocessor.anomaly_detection import (
+    MAD_SCALE,
+    AnomalyMode,
+    StreamingAnomalyDetector,
+    detector_scores,
+    filter_zscore,
+    treat_anomalies,
+)
+
+SPIKES = [150, 420, 777]
+
+
+def _frame(rows: int = 1_000) -> pd.DataFrame:
+    rng = np.random.default_rng(12)
+    index = pd.date_range("2024-01-01", periods=rows, freq="1min", tz="UTC")
+    frame = pd.DataFrame(
+        {"cpu": rng.normal(1.0, 0.05, rows), "rate": 100 + 10 * np.sin(np.arange(rows) / 60)},
+        index=index,
+    )
+    frame.iloc[SPIKES, 0] = 5.0
+    return frame
+
+
+def test_zscore_drop_keeps_legacy_behaviour() -> None:
+    frame = _frame()
+
+    actual = treat_anomalies(frame, ["cpu", "rate", "absent"], threshold=3.0)
+
+    pd.testing.assert_frame_equal(actual, filter_zscore(frame, ["cpu", "rate"], 3.0))
+    assert len(actual) == len(frame) - len(SPIKES)
+
+
+def test_zscore_modes_share_one_mask_and_skip_constant_series() -> None:
+    frame = _frame()
+    # Its population std is rounding noise, which scores every sample at 1.
+    frame["constant"] = 7.7
+    frame.iloc[5, 0] = np.nan
+    columns = ["cpu", "rate", "constant"]
+
+    kept = treat_anomalies(frame, columns, threshold=0.9)
+    clipped = treat_anomalies(frame, columns, threshold=0.9, mode="clip")
+    flagged = treat_anomalies(frame, columns, threshold=0.9, mode="flag")
+
+    anomalous = flagged[[f"{column}_anomaly" for column in columns]].any(axis=1)
+    assert 0 < len(kept) < len(frame)
+    pd.testing.assert_index_equal(kept.index, frame.index[~anomalous.to_numpy()])
+    assert not flagged["constant_anomaly"].any()
+    pd.testing.assert_series_equal(clipped["constant"], frame["constant"])
+
+
+@pytest.mark.parametrize("method", ["rolling_mad", "ewma"])
+def test_detectors_keep_the_grid_and_catch_spikes(method: Literal["rolling_mad", "ewma"]) -> None:
+    frame = _frame()
+
+    flagged = treat_anomalies(frame, ["cpu"], threshold=4.0, method=method, mode="flag", window=30)
+    imputed = treat_anomalies(
+        frame, ["cpu"], threshold=4.0, method=method, mode="impute", window=30
+    )
+    clipped = treat_anomalies(frame, ["cpu"], threshold=4.0, method=method, mode="clip", window=30)
+
+    assert np.flatnonzero(flagged["cpu_anomaly"]).tolist() == SPIKES
+    pd.testing.assert_series_equal(flagged["cpu"], frame["cpu"])
+    assert flagged["cpu_anomaly"].dtype == np.int8
+    for treated in (imputed, clipped):
+        assert treated.index.equals(frame.index)
+        assert (treated["cpu"].iloc[SPIKES] < 1.5).all()
+        pd.testing.assert_series_equal(treated["rate"], frame["rate"])
+    if method == "rolling_mad":
+        history = frame["cpu"].iloc[SPIKES[0] - 30 : SPIKES[0]]
+        median = history.median()
+        assert imputed["cpu"].iloc[SPIKES[0]] == median
+        mad = MAD_SCALE * (history - median).abs().median()
+        assert clipped["cpu"].iloc[SPIKES[0]] == pytest.approx(median + 4.0 * mad)
+
+
+@pytest.mark.parametrize("method", ["rolling_mad", "ewma"])
+@pytest.mark.parametrize("mode", ["clip", "impute", "flag"])
+def test_streaming_detector_matches_batch(
+    method: Literal["rolling_mad", "ewma"], mode: AnomalyMode
+) -> None:
+    values = _frame().to_numpy()
+    values[300:305, 1] = np.nan
+    treated, flags = detector_scores(values, method, 25).treat(values, 3.5, mode)
+    detector = StreamingAnomalyDetector(2, method=method, threshold=3.5, mode=mode, window=25)
+
+    rows = [detector.update(row) for row in values]
+
+    np.testing.assert_array_equal(np.stack([row for row, _ in rows]), treated)
+    np.testing.assert_array_equal(np.stack([flag for _, flag in rows]), flags)
+    assert flags.any()
+
+
+def test_streaming_detector_cannot_drop() -> None:
+    with pytest.raises(ValueError, match="cannot drop"):
+        StreamingAnomalyDetector(1, method="ewma", threshold=3.0, mode="drop")
@@ -0,0 +1,116 @@
+"""Tests for the planned feature engine."""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from k8s_ml_predictive_autoscaling.preprocessor.feature_engineering import (
+    COMPACT_TIME_DTYPES,
+    TIME_FEATURES,
+    FeaturePlan,
+    WindowSums,
+    add_lag_features,
+    add_rolling_features,
+    add_time_features,
+)
+
+
+def _frame(rows: int = 500) -> pd.DataFrame:
+    rng = np.random.default_rng(3)
+    index = pd.date_range("2024-01-05 22:00", periods=rows, freq="1min", tz="UTC")
+    return pd.DataFrame(
+        {"cpu": rng.normal(1, 0.2, rows), "memory": rng.normal(200, 5, rows), "other": 1.0},
+        index=index,
+    )
+
+
+def test_plan_matches_incremental_helpers() -> None:
+    frame = _frame()
+    frame.iloc[40, 0] = np.nan
+    lags, windows = [1, 5, 15], [3, 5, 30]
+
+    expected = add_rolling_features(
+        add_lag_features(add_time_features(frame), ["cpu", "memory"], lags),
+        ["cpu", "memory"],
+        windows,
+    )
+    plan = FeaturePlan.build(
+        frame.columns, ["cpu", "memory", "absent"], lags=lags, rolling_windows=windows
+    )
+    actual = plan.compute(frame)
+
+    pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+    assert plan.names == list(expected.columns[3:])
+    assert plan.history == 29
+
+
+def test_plan_float32_block_and_options() -> None:
+    frame = _frame(50)
+    plan = FeaturePlan.build(
+        frame.columns, ["cpu"], lags=[-2, 60], rolling_windows=[4], time_features=False
+    )
+
+    actual = plan.compute(frame, dtype=np.float32)
+
+    assert list(actual.columns) == [
+        "cpu",
+        "memory",
+        "other",
+        "cpu_lag_-2",
+        "cpu_lag_60",
+        "cpu_rolling_mean_4",
+    ]
+    assert actual["cpu_lag_-2"].dtype == np.float32
+    assert actual["cpu"].dtype == np.float64
+    np.testing.assert_array_equal(actual["cpu_lag_-2"][:-2], frame["cpu"][2:].astype(np.float32))
+    assert actual["cpu_lag_-2"][-2:].isna().all()
+    assert actual["cpu_lag_60"].isna().all()
+    np.testing.assert_allclose(
+        actual["cpu_rolling_mean_4"][3:], frame["cpu"].rolling(4).mean()[3:], rtol=1e-6
+    )
+
+
+def test_plan_result_shares_the_feature_block() -> None:
+    frame = _frame(50)
+    plan = FeaturePlan.build(frame.columns, ["cpu", "memory"], lags=[1, 5], rolling_windows=[3])
+
+    actual = plan.compute(frame)
+
+    numeric = [name for name in plan.names if name not in TIME_FEATURES]
+    block = actual[numeric[0]].to_numpy()
+    while isinstance(block.base, np.ndarray):
+        block = block.base
+    assert block.shape == (len(frame), len(numeric))
+    assert all(np.shares_memory(block, actual[name].to_numpy()) for name in numeric)
+    assert np.shares_memory(actual["cpu"].to_numpy(), frame["cpu"].to_numpy())
+
+
+def test_plan_compact_calendar_columns() -> None:
+    frame = _frame(3000)
+    plan = FeaturePlan.build(frame.columns, ["cpu"], lags=[1], rolling_windows=[3])
+
+    expected = plan.compute(frame)
+    actual = plan.compute(frame, compact_time=True)
+
+    assert {column: actual[column].dtype for column in COMPACT_TIME_DTYPES} == {
+        column: np.dtype(dtype) for column, dtype in COMPACT_TIME_DTYPES.items()
+    }
+    assert actual["minute_of_day"].max() == 1439
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_exact=True)
+
+
+def test_window_sums_only_read_their_window() -> None:
+    values = np.random.default_rng(5).normal(0, 1, 100)
+    sums = WindowSums(values)
+
+    for window in (1, 6, 7, 13, 64, 100):
+        out = np.empty(len(values) - window + 1)
+        sums.total_into(out, window)
+        naive = [values[i : i + window].sum() for i in range(len(out))]
+        np.testing.assert_allclose(out, naive, rtol=1e-12)
+    tail = WindowSums(values[40:])
+    out, expected = np.empty(54), np.empty(94)
+    tail.total_into(out, 7)
+    sums.total_into(expected, 7)
+    np.testing.assert_array_equal(out, expected[40:])
@@ -0,0 +1,130 @@
+"""Tests for walk-forward folds."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import StandardScaler
+
+from k8s_ml_predictive_autoscaling.preprocessor.config import (
+    FeatureConfig,
+    PreprocessorConfig,
+    SlidingWindowConfig,
+    WalkForwardConfig,
+)
+from k8s_ml_predictive_autoscaling.preprocessor.folds import WalkForwardFolds, fold_bounds
+from k8s_ml_predictive_autoscaling.preprocessor.pipeline import (
+    PreprocessingPipeline,
+    build_sequences,
+)
+
+METRICS = ["cpu_metrics", "request_rate"]
+
+
+def test_fold_bounds_expand_roll_and_leave_a_gap() -> None:
+    expanding = fold_bounds(100, folds=4, gap=3)
+    rolling = fold_bounds(100, folds=4, test_rows=10, max_train_rows=30)
+
+    assert [(f.train, f.test) for f in expanding] == [
+        (range(0, 17), range(20, 40)),
+        (range(0, 37), range(40, 60)),
+        (range(0, 57), range(60, 80)),
+        (range(0, 77), range(80, 100)),
+    ]
+    assert [(f.train, f.test) for f in rolling] == [
+        (range(30, 60), range(60, 70)),
+        (range(40, 70), range(70, 80)),
+        (range(50, 80), range(80, 90)),
+        (range(60, 90), range(90, 100)),
+    ]
+    with pytest.raises(ValueError, match="cannot hold 4 test blocks"):
+        fold_bounds(100, folds=4, test_rows=24, min_train_rows=5)
+
+
+def test_prefix_sum_statistics_match_standard_scaler() -> None:
+    rng = np.random.default_rng(7)
+    index = pd.date_range("2024-01-01", periods=2_000, freq="1min", tz="UTC")
+    dataset = pd.DataFrame(
+        {
+            "level": 1e6 + np.cumsum(rng.normal(0, 1, 2_000)),
+            "noise": rng.normal(0, 1e-3, 2_000),
+            "constant": 4.0,
+            "hour": index.hour,
+        },
+        index=index,
+    )
+    columns = ["level", "noise", "constant"]
+    folds = WalkForwardFolds(
+        dataset, columns, fold_bounds(len(dataset), folds=20, max_train_rows=600, gap=2)
+    )
+
+    assert len(folds) == 20
+    for fold in folds:
+        rows = fold.fold.train
+        scaler = StandardScaler().fit(dataset[columns].iloc[rows.start : rows.stop])
+        mean, scale = fold.scaler
+        np.testing.assert_allclose(mean, scaler.mean_, rtol=1e-12)
+        np.testing.assert_allclose(scale, scaler.scale_, rtol=1e-7)
+        held_out = dataset[columns].iloc[fold.fold.test.start : fold.fold.test.stop]
+        np.testing.assert_allclose(
+            fold.test[columns], scaler.transform(held_out), rtol=1e-6, atol=1e-9
+        )
+        np.testing.assert_array_equal(fold.test["hour"], held_out.index.hour)
+    assert fold.train is fold.train
+    assert folds[-1] is folds[19] and folds[19].test is list(folds)[19].test
+
+
+SETTINGS = {
+    "metrics": METRICS,
+    "features": FeatureConfig(lags=[1, 5], rolling_windows=[3]),
+    "sliding_window": SlidingWindowConfig(
+        sequence_length=6, forecast_steps=[2, 4], target_metric="request_rate"
+    ),
+    "walk_forward": WalkForwardConfig(folds=4, min_train_rows=50),
+}
+
+
+def test_pipeline_computes_features_once_for_all_folds(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    write_raw: Callable[..., Path],
+    make_config: Callable[..., PreprocessorConfig],
+) -> None:
+    write_raw(METRICS, periods=400, seed=2)
+    calls: list[int] = []
+    engineer = PreprocessingPipeline._engineer_features
+
+    def counted(self: PreprocessingPipeline, frame: pd.DataFrame) -> pd.DataFrame:
+        calls.append(len(frame))
+        return engineer(self, frame)
+
+    monkeypatch.setattr(PreprocessingPipeline, "_engineer_features", counted)
+    folds = PreprocessingPipeline(make_config(**SETTINGS)).walk_forward()
+
+    assert len(calls) == 1
+    assert [fold.fold.test.start - fold.fold.train.stop for fold in folds] == [4] * 4
+    assert folds.scaled_columns == METRICS
+    assert not (tmp_path / "out").exists()
+    last = folds[3]
+    pd.testing.assert_index_equal(last.test.index, folds.dataset.index[-len(last.test) :])
+    features = [column for column in last.train.columns if not column.startswith("target_")]
+    windows, targets = last.sequences(
+        "train",
+        feature_columns=features,
+        target_column="target_request_rate_t+2",
+        sequence_length=6,
+        stride=2,
+    )
+    expected = build_sequences(last.train, features, "target_request_rate_t+2", 6, 2)
+    np.testing.assert_array_equal(windows, expected[0])
+    np.testing.assert_array_equal(targets, expected[1])
+
+    chunked = PreprocessingPipeline(
+        make_config(execution={"mode": "chunked", "block_rows": 64}, **SETTINGS)
+    )
+    with pytest.raises(ValueError, match="whole feature dataset in memory"):
+        chunked.walk_forward()
@@ -0,0 +1,169 @@
+"""Parity tests for the out-of-core (chunked) preprocessing mode."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Callable
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from k8s_ml_predictive_autoscaling.preprocessor.config import FeatureConfig, PreprocessorConfig
+from k8s_ml_predictive_autoscaling.preprocessor.out_of_core import MemoryBudget, fixed_frequency_ns
+from k8s_ml_predictive_autoscaling.preprocessor.pipeline import PreprocessingPipeline
+from k8s_ml_predictive_autoscaling.preprocessor.sequences import load_sequences
+from k8s_ml_predictive_autoscaling.raw_storage import ParquetDaySink, SeriesBatch
+
+METRICS = ["cpu_metrics", "memory_metrics", "request_rate"]
+
+
+def _raw_series() -> list[tuple[str, str, np.ndarray, np.ndarray]]:
+    """30s samples over ~26 hours with jitter, duplicate series, a gap and spikes."""
+
+    rng = np.random.default_rng(7)
+    start = pd.Timestamp("2024-01-01 23:00", tz="UTC").value // 1_000_000
+    steps = np.arange(26 * 120)
+    series = []
+    for metric, pods in (("cpu_metrics", 2), ("memory_metrics", 1), ("request_rate", 1)):
+        for pod in range(pods):
+            stamps = start + steps * 30_000 + rng.integers(0, 5, len(steps)) * 1_000
+            values = 10 + np.sin(steps / 50 + pod) * 3 + rng.normal(0, 0.3, len(steps))
+            values[rng.integers(0, len(steps), 5)] *= 20
+            keep = np.ones(len(steps), dtype=bool)
+            if metric == "memory_metrics":
+                keep[300:340] = False
+            series.append((metric, f'{{"pod": "{pod}"}}', stamps[keep], values[keep]))
+    return series
+
+
+def _write_csv(raw_dir: Path) -> str:
+    raw_dir.mkdir(parents=True)
+    for metric, labels, stamps, values in _raw_series():
+        frame = pd.DataFrame(
+            {
+                "timestamp": pd.to_datetime(stamps, unit="ms", utc=True),
+                "metric": metric,
+                "value": values,
+                "labels": labels,
+            }
+        )
+        days = frame["timestamp"].dt.strftime("%Y%m%d")
+        for day, rows in frame.groupby(days):
+            path = raw_dir / f"{metric}_{day}.csv"
+            rows.to_csv(path, mode="a", header=not path.exists(), index=False)
+    return str(raw_dir / "*.csv")
+
+
+def _write_parquet(raw_dir: Path) -> str:
+    pytest.importorskip("pyarrow")
+    for metric, labels, stamps, values in _raw_series():
+        sink = ParquetDaySink(raw_dir, metric, append=True)
+        sink.write(SeriesBatch(metric, "query", labels, stamps.astype(np.int64), values))
+        sink.close()
+    return str(raw_dir / "metric=*" / "day=*" / "*.parquet")
+
+
+SLIDING_WINDOW = {
+    "sequence_length": 10,
+    "forecast_steps": [2, 5],
+    "stride": 3,
+    "target_metric": "request_rate",
+}
+SETTINGS = {
+    "metrics": METRICS,
+    "resample_rule": "1min",
+    "features": FeatureConfig(lags=[1, 5], rolling_windows=[3, 7]),
+    "sliding_window": SLIDING_WINDOW,
+}
+
+
+@pytest.mark.parametrize(
+    ("raw_format", "storage", "precision"),
+    [
+        ("csv", "npz", "float64"),
+        ("parquet", "npz", "float64"),
+        ("csv", "indexed", "float64"),
+        ("csv", "npz", "float32"),
+    ],
+)
+def test_chunked_outputs_match_in_memory_bit_for_bit(
+    tmp_path: Path,
+    make_config: Callable[..., PreprocessorConfig],
+    raw_format: str,
+    storage: str,
+    precision: str,
+) -> None:
+    writer = _write_parquet if raw_format == "parquet" else _write_csv
+    settings = {
+        **SETTINGS,
+        "input_glob": writer(tmp_path / "raw"),
+        "raw_format": raw_format,
+        "precision": precision,
+        "sliding_window": {**SLIDING_WINDOW, "storage": storage},
+    }
+    execution = {
+        "mode": "chunked",
+        "block_rows": 97,
+        "raw_chunk_rows": 300,
+        "spill_dir": tmp_path / "spill",
+    }
+
+    expected = PreprocessingPipeline(make_config("memory", **settings)).run()
+    actual = PreprocessingPipeline(make_config("chunked", execution=execution, **settings)).run()
+
+    assert expected.keys() == actual.keys()
+    for name in ("train", "validation", "test"):
+        assert actual[name].read_bytes() == expected[name].read_bytes()
+    sequence_keys = [key for key in expected if key.startswith("sequences_")]
+    assert len(sequence_keys) == 6
+    for key in sequence_keys:
+        want = load_sequences(expected[key])
+        got = load_sequences(actual[key])
+        for key in ("sequences", "targets", "timestamps"):
+            np.testing.assert_array_equal(
+                np.asarray(getattr(got, key)), np.asarray(getattr(want, key)), strict=True
+            )
+        assert got.feature_columns == want.feature_columns
+        assert got.target_column == want.target_column
+    want_scaler, got_scaler = joblib.load(expected["scaler"]), joblib.load(actual["scaler"])
+    for attribute in ("mean_", "var_", "scale_", "feature_names_in_"):
+        np.testing.assert_array_equal(
+            getattr(got_scaler, attribute), getattr(want_scaler, attribute)
+        )
+    want_manifest = json.loads(expected["manifest"].read_text(encoding="utf-8"))
+    got_manifest = json.loads(actual["manifest"].read_text(encoding="utf-8"))
+    assert got_manifest["execution_mode"] == "chunked"
+    assert got_manifest["artifacts"] == want_manifest["artifacts"]
+    assert len(pd.read_csv(actual["train"])) > 900
+    assert not list((tmp_path / "spill").iterdir())
+
+
+def test_chunked_mode_rejects_missing_metrics(
+    tmp_path: Path, make_config: Callable[..., PreprocessorConfig]
+) -> None:
+    input_glob = _write_csv(tmp_path / "raw")
+    config = make_config(execution={"mode": "chunked"}, input_glob=input_glob, **SETTINGS)
+    config.metrics = [*METRICS, "latency_p95"]
+
+    with pytest.raises(ValueError, match="missing required metrics: latency_p95"):
+        PreprocessingPipeline(config).run()
+
+
+def test_fixed_frequency_rules() -> None:
+    assert fixed_frequency_ns("30s") == 30_000_000_000
+    assert fixed_frequency_ns("1h") == 3_600_000_000_000
+    for rule in ("7min", "MS", "500ms"):
+        with pytest.raises(ValueError, match="resample_rule"):
+            fixed_frequency_ns(rule)
+
+
+def test_memory_budget_sizes_blocks() -> None:
+    budget = MemoryBudget(64 * 2**20)
+
+    rows = budget.block_rows(resident_bytes=16 * 2**20, columns=40, sequence_bytes_per_row=5_000)
+
+    assert rows == 48 * 2**20 // (40 * 8 * 6 + 5_000)
+    assert budget.block_rows(resident_bytes=64 * 2**20, columns=40, sequence_bytes_per_row=1) == 256
@@ -0,0 +1,150 @@
+"""Tests for per-stage profiles of preprocessing runs."""
+
+from __future__ import annotations
+
+import itertools
+import json
+import pstats
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable
+
+import pandas as pd
+import pytest
+import yaml
+
+from k8s_ml_predictive_autoscaling.preprocessor import profiling
+from k8s_ml_predictive_autoscaling.preprocessor.config import (
+    FeatureConfig,
+    PreprocessorConfig,
+    SlidingWindowConfig,
+)
+from k8s_ml_predictive_autoscaling.preprocessor.pipeline import PreprocessingPipeline, main
+from k8s_ml_predictive_autoscaling.preprocessor.profiling import (
+    StageProfiler,
+    compare_profiles,
+    load_profile,
+)
+
+METRICS = ["cpu_metrics", "request_rate"]
+
+
+def test_stages_nest_and_accumulate() -> None:
+    profiler = StageProfiler(trace_memory=True)
+    profiler.start()
+    try:
+        with profiler.stage("outer"):
+            for rows in (3, 4):
+                with profiler.stage("inner") as stage:
+                    block = bytearray(4 * 2**20)
+                    stage.record(pd.DataFrame({"a": range(rows), "b": 0.0}))
+                    del block
+    finally:
+        profiler.stop()
+
+    outer, inner = profiler.stages["outer"], profiler.stages["inner"]
+    assert (outer.calls, inner.calls) == (1, 2)
+    assert (inner.rows, inner.columns) == (7, 2)
+    assert outer.wall_seconds >= inner.wall_seconds > 0
+    assert inner.peak_traced_bytes is not None and inner.peak_traced_bytes >= 4 * 2**20
+    assert outer.peak_traced_bytes is not None
+    assert outer.peak_traced_bytes >= inner.peak_traced_bytes
+    profile = profiler.to_dict(resample_rule="1min")
+    assert [stage["name"] for stage in profile["stages"]] == ["outer", "inner"]
+    assert profile["resample_rule"] == "1min" and profile["trace_memory"] is True
+
+
+def test_compare_profiles_reports_only_significant_growth() -> None:
+    def profile(**seconds: float) -> dict[str, object]:
+        stages = [{"name": name, "wall_seconds": value} for name, value in seconds.items()]
+        return {"version": 1, "stages": stages}
+
+    baseline = profile(read_raw=1.0, features=0.01, scale=2.0)
+    current = profile(read_raw=1.5, features=0.04, scale=2.1, write_splits=9.0)
+
+    assert compare_profiles(current, baseline) == ["read_raw: wall_seconds 1.5s, baseline 1s"]
+    assert compare_profiles(current, baseline, tolerance=0.6) == []
+
+
+SETTINGS = {
+    "metrics": METRICS,
+    "features": FeatureConfig(lags=[1, 3], rolling_windows=[2]),
+    "sliding_window": SlidingWindowConfig(
+        sequence_length=4, forecast_steps=[1], target_metric="request_rate"
+    ),
+}
+
+
+@pytest.fixture()
+def raw(write_raw: Callable[..., Path]) -> None:
+    write_raw(METRICS, periods=300, freq="30s", seed=5, mean=4.0)
+
+
+@pytest.mark.parametrize(
+    ("execution", "extra_stages"),
+    [({}, set()), ({"mode": "chunked", "block_rows": 32}, {"fit_scaler"})],
+)
+@pytest.mark.usefixtures("raw")
+def test_run_writes_profile_of_every_stage(
+    tmp_path: Path,
+    make_config: Callable[..., PreprocessorConfig],
+    execution: dict[str, object],
+    extra_stages: set[str],
+) -> None:
+    outputs = PreprocessingPipeline(make_config(execution=execution, **SETTINGS)).run()
+
+    profile = load_profile(tmp_path / "out")
+    assert outputs["profile"] == tmp_path / "out" / "profile.json"
+    manifest = json.loads(outputs["manifest"].read_text(encoding="utf-8"))
+    assert "profile" not in manifest["artifacts"]
+    stages = {stage["name"]: stage for stage in profile["stages"]}
+    assert set(stages) >= {
+        "run",
+        "load_grid",
+        "resample",
+        "fill_gaps",
+        "anomalies",
+        "features",
+        "targets",
+        "scale",
+        "write_splits",
+        "write_sequences",
+        "write_artifacts",
+        *extra_stages,
+    }
+    assert stages["fill_gaps"]["rows"] == 150
+    assert stages["fill_gaps"]["columns"] == len(METRICS)
+    assert all(stage["calls"] >= 1 and stage["wall_seconds"] >= 0 for stage in stages.values())
+    assert profile["execution_mode"] == execution.get("mode", "memory")
+
+
+@pytest.mark.usefixtures("raw")
+def test_main_dumps_cprofile_and_checks_baseline(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, make_config: Callable[..., PreprocessorConfig]
+) -> None:
+    # A clock ticking a second per reading makes every stage slow enough to compare.
+    clock = itertools.count()
+    fake_time = SimpleNamespace(
+        perf_counter=lambda: float(next(clock)), process_time=time.process_time
+    )
+    monkeypatch.setattr(profiling, "time", fake_time)
+    config_path = tmp_path / "preprocessing.yaml"
+    config_path.write_text(
+        yaml.safe_dump(make_config(**SETTINGS).model_dump(mode="json")), encoding="utf-8"
+    )
+    stats = tmp_path / "run.prof"
+
+    assert main(["--config", str(config_path), "--cprofile", str(stats)]) == 0
+    assert any("_run_in_memory" in name for _, _, name in pstats.Stats(str(stats)).stats)
+
+    baseline = load_profile(tmp_path / "out")
+    for stage in baseline["stages"]:
+        stage["wall_seconds"] /= 100
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps(baseline), encoding="utf-8")
+    args = ["--config", str(config_path), "--profile-baseline", str(baseline_path)]
+    assert main(args) == 1
+    assert main([*args, "--profile-tolerance", "1000"]) == 0
+    output_dir = ["--profile-baseline", str(tmp_path / "out"), "--profile-tolerance", "1000"]
+    assert main([*args[:2], *output_dir]) == 0
@@ -0,0 +1,200 @@
+"""Tests for the sliding-window sequence builder and storage layouts."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from k8s_ml_predictive_autoscaling.preprocessor.config import (
+    FeatureConfig,
+    PreprocessorConfig,
+    SlidingWindowConfig,
+)
+from k8s_ml_predictive_autoscaling.preprocessor.pipeline import (
+    PreprocessingPipeline,
+    build_sequences,
+)
+from k8s_ml_predictive_autoscaling.preprocessor.sequences import (
+    SequenceCodec,
+    SequenceStorage,
+    SequenceWriter,
+    WindowedSequences,
+    load_sequences,
+    sequence_path,
+)
+
+FEATURES = ["cpu", "memory"]
+
+
+def _frame(rows: int = 40) -> pd.DataFrame:
+    index = pd.date_range("2024-01-01", periods=rows, freq="1min", tz="UTC")
+    values = np.arange(rows * 2, dtype=float).reshape(rows, 2)
+    frame = pd.DataFrame(values, index=index, columns=FEATURES)
+    frame["target"] = np.arange(rows) * 10.0
+    return frame
+
+
+def test_build_sequences_returns_strided_windows() -> None:
+    frame = _frame()
+
+    sequences, targets, stamps = build_sequences(frame, FEATURES, "target", 6, 4)
+
+    starts = range(0, len(frame) - 6 + 1, 4)
+    values = frame[FEATURES].to_numpy()
+    np.testing.assert_array_equal(sequences, np.stack([values[i : i + 6] for i in starts]))
+    np.testing.assert_array_equal(targets, [frame["target"].iloc[i + 5] for i in starts])
+    assert stamps == [frame.index[i + 5] for i in starts]
+    assert not sequences.flags.writeable
+    assert sequences.base is not None
+
+    empty, no_targets, no_stamps = build_sequences(frame.iloc[:3], FEATURES, "target", 6, 1)
+    assert empty.shape == (0, 6, 2) and no_targets.shape == (0,) and no_stamps == []
+
+
+@pytest.mark.parametrize(
+    ("storage", "codec"),
+    [
+        ("npz", None),
+        ("npz", "none"),
+        ("npy", None),
+        ("npy", "deflate"),
+        ("indexed", None),
+        ("indexed", "zstd"),
+        ("indexed", "lz4"),
+    ],
+)
+def test_storage_layouts_round_trip(
+    tmp_path: Path, storage: SequenceStorage, codec: SequenceCodec | None
+) -> None:
+    if codec in ("zstd", "lz4"):
+        pytest.importorskip("pyarrow")
+    frame = _frame()
+    expected, targets, stamps = build_sequences(frame, FEATURES, "target", 6, 4)
+    path = sequence_path(tmp_path, "train", storage)
+    writer = SequenceWriter(
+        path,
+        storage=storage,
+        codec=codec,
+        rows=len(frame),
+        feature_columns=FEATURES,
+        target_column="target",
+        sequence_length=6,
+        stride=4,
+    )
+    for start in range(0, len(frame), 7):
+        writer.append(frame.iloc[start : start + 7])
+    writer.close()
+
+    dataset = load_sequences(path)
+
+    assert dataset.sequences.shape == expected.shape
+    np.testing.assert_array_equal(np.asarray(dataset.sequences), expected)
+    np.testing.assert_array_equal(dataset.targets, targets)
+    assert list(dataset.timestamps) == [stamp.isoformat() for stamp in stamps]
+    assert dataset.feature_columns == FEATURES
+    assert dataset.target_column == "target"
+    if storage == "indexed":
+        assert isinstance(dataset.sequences, WindowedSequences)
+        assert isinstance(dataset.sequences.values, np.memmap) == (codec is None)
+        np.testing.assert_array_equal(dataset.sequences[2], expected[2])
+        np.testing.assert_array_equal(dataset.sequences[np.array([5, 1])], expected[[5, 1]])
+        np.testing.assert_array_equal(dataset.sequences[1:4], expected[1:4])
+
+
+def test_build_sequences_and_writer_keep_float32() -> None:
+    frame = _frame()
+    expected, targets, _ = build_sequences(frame, FEATURES, "target", 6, 4, dtype=np.float32)
+
+    assert expected.dtype == np.float32 and targets.dtype == np.float32
+    np.testing.assert_array_equal(expected, build_sequences(frame, FEATURES, "target", 6, 4)[0])
+
+
+def test_npz_storage_rejects_directory_codecs() -> None:
+    with pytest.raises(ValidationError, match="deflate or none"):
+        SlidingWindowConfig(storage="npz", codec="zstd")
+
+
+PIPELINE_METRICS = ["cpu_metrics", "request_rate"]
+
+
+def test_pipeline_writes_every_horizon_in_parallel(
+    write_raw: Callable[..., Path], make_config: Callable[..., PreprocessorConfig]
+) -> None:
+    write_raw(PIPELINE_METRICS, seed=11)
+
+    def run(name: str, workers: int) -> dict[str, Path]:
+        config = make_config(
+            name,
+            execution={"workers": workers},
+            metrics=PIPELINE_METRICS,
+            features=FeatureConfig(lags=[1], rolling_windows=[3]),
+            sliding_window=SlidingWindowConfig(
+                sequence_length=8,
+                forecast_steps=[1, 4],
+                stride=2,
+                target_metric="request_rate",
+                storage="indexed",
+            ),
+        )
+        return PreprocessingPipeline(config).run()
+
+    serial, parallel = run("serial", 1), run("parallel", 3)
+
+    manifest = json.loads(parallel["manifest"].read_text(encoding="utf-8"))
+    assert manifest == json.loads(serial["manifest"].read_text(encoding="utf-8"))
+    for split in ("train", "validation", "test"):
+        first = load_sequences(parallel[f"sequences_{split}"])
+        second = load_sequences(parallel[f"sequences_{split}_t+4"])
+        np.testing.assert_array_equal(np.asarray(first.sequences), np.asarray(second.sequences))
+        assert first.target_column == "target_request_rate_t+1"
+        assert second.target_column == "target_request_rate_t+4"
+        frame = pd.read_csv(parallel[split])
+        np.testing.assert_allclose(second.targets, frame[second.target_column].to_numpy()[7::2])
+        entry = manifest["artifacts"][f"sequences_{split}_t+4"]
+        assert entry["path"] == f"sequences_{split}_t+4"
+        assert entry["horizon"] == 4 and entry["split"] == split and entry["codec"] == "none"
+        assert entry["windows"] == len(second.targets)
+        assert manifest["artifacts"][split]["rows"] == len(frame)
+    assert manifest["artifacts"]["scaler"]["features"] == ["cpu_metrics", "request_rate"]
+
+
+def test_pipeline_float32_precision_halves_sequences(
+    write_raw: Callable[..., Path], make_config: Callable[..., PreprocessorConfig]
+) -> None:
+    write_raw(PIPELINE_METRICS, seed=11)
+
+    def run(precision: str) -> dict[str, Path]:
+        config = make_config(
+            precision,
+            execution={"workers": 1},
+            metrics=PIPELINE_METRICS,
+            precision=precision,
+            features=FeatureConfig(lags=[1], rolling_windows=[3]),
+            sliding_window=SlidingWindowConfig(
+                sequence_length=8,
+                forecast_steps=[1],
+                target_metric="request_rate",
+                storage="npy",
+            ),
+        )
+        return PreprocessingPipeline(config).run()
+
+    wide, compact = run("float64"), run("float32")
+
+    want, got = load_sequences(wide["sequences_train"]), load_sequences(compact["sequences_train"])
+    assert got.sequences.dtype == np.float32 and got.targets.dtype == np.float32
+    np.testing.assert_allclose(got.sequences, want.sequences, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(got.targets, want.targets, rtol=1e-5, atol=1e-6)
+    members = (
+        compact["sequences_train"] / "sequences.npy",
+        wide["sequences_train"] / "sequences.npy",
+    )
+    assert members[0].stat().st_size < 0.51 * members[1].stat().st_size
+    manifest = json.loads(compact["manifest"].read_text(encoding="utf-8"))
+    assert manifest["artifacts"]["sequences_train"]["dtype"] == "float32"
@@ -0,0 +1,119 @@
+"""Tests for per-series preprocessing grouped by label values."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Callable
+
+import pytest
+from pydantic import ValidationError
+
+from k8s_ml_predictive_autoscaling.preprocessor.config import (
+    ExecutionConfig,
+    FeatureConfig,
+    PreprocessorConfig,
+    SeriesConfig,
+    SlidingWindowConfig,
+)
+from k8s_ml_predictive_autoscaling.preprocessor.pipeline import PreprocessingPipeline
+
+METRICS = ["cpu_metrics", "request_rate"]
+SERIES = [
+    ({"deployment": "api", "namespace": "prod", "pod": "api-1"}, METRICS),
+    ({"deployment": "api", "namespace": "prod", "pod": "api-2"}, METRICS),
+    ({"deployment": "web/v2", "namespace": "prod", "pod": "web-1"}, METRICS),
+    ({"deployment": "batch", "namespace": "prod", "pod": "batch-1"}, ["cpu_metrics"]),
+]
+SETTINGS = {
+    "metrics": METRICS,
+    "resample_rule": "1min",
+    "features": FeatureConfig(lags=[1], rolling_windows=[3]),
+    "sliding_window": SlidingWindowConfig(
+        sequence_length=6, forecast_steps=[1, 2], target_metric="request_rate"
+    ),
+}
+
+
+def _write_series(
+    write_raw: Callable[..., Path],
+    raw: str = "raw",
+    *,
+    deployment: str | None = None,
+    omit: tuple[str, ...] = (),
+) -> None:
+    """Write one file per pod, keeping each series' values independent of the selection."""
+    for seed, (labels, metrics) in enumerate(SERIES):
+        if deployment in (None, labels["deployment"]):
+            write_raw(
+                metrics,
+                periods=240,
+                freq="30s",
+                seed=seed,
+                mean=10,
+                std=2,
+                labels={key: value for key, value in labels.items() if key not in omit},
+                raw=raw,
+                name=f"{labels['pod']}.csv",
+            )
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_series_partitions_match_single_series_runs(
+    tmp_path: Path,
+    write_raw: Callable[..., Path],
+    make_config: Callable[..., PreprocessorConfig],
+    workers: int,
+) -> None:
+    _write_series(write_raw)
+    config = make_config(
+        "processed",
+        execution={"workers": workers},
+        series=SeriesConfig(group_by=["deployment"]),
+        **SETTINGS,
+    )
+
+    outputs = PreprocessingPipeline(config).run()
+
+    manifest = json.loads(outputs["manifest"].read_text(encoding="utf-8"))
+    assert manifest["group_by"] == ["deployment"]
+    assert [(entry["path"], entry["status"]) for entry in manifest["series"]] == [
+        ("deployment=api", "processed"),
+        ("deployment=batch", "skipped"),
+        ("deployment=web_v2", "processed"),
+    ]
+    assert manifest["series"][1]["missing_metrics"] == ["request_rate"]
+    assert not (tmp_path / "processed" / "deployment=batch").exists()
+    for deployment, partition in (("api", "deployment=api"), ("web/v2", "deployment=web_v2")):
+        _write_series(write_raw, f"raw-{partition}", deployment=deployment)
+        expected = PreprocessingPipeline(
+            make_config(f"alone-{partition}", raw=f"raw-{partition}", **SETTINGS)
+        ).run()
+        for key in ("train", "test", "transform", "manifest", "sequences_train_t+2"):
+            assert outputs[f"{partition}/{key}"] == tmp_path / "processed" / partition / (
+                expected[key].name
+            )
+            assert outputs[f"{partition}/{key}"].read_bytes() == expected[key].read_bytes()
+
+
+def test_series_grouping_marks_missing_labels(
+    write_raw: Callable[..., Path], make_config: Callable[..., PreprocessorConfig]
+) -> None:
+    _write_series(write_raw, omit=("namespace",))
+    config = make_config(
+        "processed", series=SeriesConfig(group_by=["namespace", "deployment"]), **SETTINGS
+    )
+
+    outputs = PreprocessingPipeline(config).run()
+
+    assert "namespace=__missing__/deployment=api/train" in outputs
+    manifest = json.loads(outputs["manifest"].read_text(encoding="utf-8"))
+    assert manifest["series"][0]["labels"] == {"namespace": "__missing__", "deployment": "api"}
+
+
+def test_series_grouping_requires_memory_mode() -> None:
+    with pytest.raises(ValidationError, match="series.group_by"):
+        PreprocessorConfig(
+            series=SeriesConfig(group_by=["deployment"]),
+            execution=ExecutionConfig(mode="chunked"),
+        )
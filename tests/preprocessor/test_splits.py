@@ -0,0 +1,119 @@
+"""Tests for binary split formats and `load_split`."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from k8s_ml_predictive_autoscaling.preprocessor import load_split
+from k8s_ml_predictive_autoscaling.preprocessor.config import (
+    AnomalyConfig,
+    FeatureConfig,
+    PreprocessorConfig,
+    SlidingWindowConfig,
+    SplitOutputConfig,
+)
+from k8s_ml_predictive_autoscaling.preprocessor.pipeline import PreprocessingPipeline
+
+pytest.importorskip("pyarrow")
+
+METRICS = ["cpu_metrics", "request_rate"]
+FORMATS = ["csv", "parquet", "feather", "npy"]
+
+
+@pytest.fixture
+def run(
+    write_raw: Callable[..., Path], make_config: Callable[..., PreprocessorConfig]
+) -> Callable[..., Path]:
+    write_raw(METRICS, periods=600, freq="20s", seed=3, mean=10, std=2, name="metrics_20240101.csv")
+
+    def run(output: str, **overrides: Any) -> Path:
+        settings: dict[str, Any] = {
+            "metrics": METRICS,
+            "features": FeatureConfig(lags=[1, 4], rolling_windows=[3]),
+            "anomaly": AnomalyConfig(enabled=False),
+            "sliding_window": SlidingWindowConfig(
+                sequence_length=5, forecast_steps=[2], target_metric="request_rate"
+            ),
+            "split_output": SplitOutputConfig(formats=FORMATS),
+        }
+        settings.update(overrides)
+        config = make_config(output, **settings)
+        PreprocessingPipeline(config).run()
+        return config.output_dir
+
+    return run
+
+
+def test_every_format_loads_the_same_split(run: Callable[..., Path]) -> None:
+    output_dir = run("out")
+    manifest = json.loads((output_dir / "manifest.json").read_text(encoding="utf-8"))
+
+    assert (output_dir / "train.csv").exists()
+    assert manifest["artifacts"]["train"]["format"] == "csv"
+    assert manifest["artifacts"]["train_parquet"]["split"] == "train"
+    expected = load_split(output_dir / "validation.csv")
+    assert str(expected["timestamp"].dt.tz) == "UTC"
+    binary = {fmt: load_split(output_dir, "validation", fmt=fmt) for fmt in FORMATS[1:]}
+    for fmt, frame in binary.items():
+        pd.testing.assert_frame_equal(frame, binary["parquet"], check_exact=True, obj=fmt)
+        schema = manifest["artifacts"][f"validation_{fmt}"]["schema"]
+        assert {column: str(dtype) for column, dtype in frame.dtypes.items()} == schema
+        # The default CSV float parser may be off in the last bit.
+        pd.testing.assert_frame_equal(frame, expected, check_dtype=False, rtol=1e-15)
+
+
+def test_projection_reads_timestamp_and_requested_columns(run: Callable[..., Path]) -> None:
+    output_dir = run("out")
+
+    for fmt in FORMATS:
+        frame = load_split(output_dir, "test", columns=["request_rate"], fmt=fmt)
+        assert list(frame.columns) == ["timestamp", "request_rate"]
+        assert str(frame["timestamp"].dt.tz) == "UTC"
+    # Without a format the fastest listed one is used; split paths are read directly.
+    fastest = load_split(output_dir, "test", columns=["request_rate"])
+    direct = load_split(output_dir / "test", "ignored", columns=["request_rate"])
+    pd.testing.assert_frame_equal(fastest, direct, check_exact=True)
+    with pytest.raises(KeyError):
+        load_split(output_dir / "test", columns=["unknown"])
+
+
+def test_float32_applies_to_binary_formats_only(run: Callable[..., Path]) -> None:
+    output_dir = run("out", split_output=SplitOutputConfig(formats=FORMATS, float32=True))
+
+    full = load_split(output_dir / "train.csv")
+    for fmt in FORMATS[1:]:
+        frame = load_split(output_dir, "train", fmt=fmt)
+        floats = [column for column in full.columns if full[column].dtype == np.float64]
+        assert floats and all(frame[column].dtype == np.float32 for column in floats)
+        np.testing.assert_array_equal(
+            frame[floats].to_numpy(), full[floats].to_numpy(dtype=np.float32)
+        )
+    assert all(load_split(output_dir / "train.csv")[floats].dtypes == np.float64)
+
+
+def test_chunked_splits_match_in_memory(run: Callable[..., Path]) -> None:
+    expected_dir = run("memory")
+    output_dir = run("chunked", execution={"mode": "chunked", "block_rows": 37})
+
+    assert (output_dir / "train.csv").read_bytes() == (expected_dir / "train.csv").read_bytes()
+    for name in ("train", "validation", "test"):
+        for fmt in FORMATS[1:]:
+            pd.testing.assert_frame_equal(
+                load_split(output_dir, name, fmt=fmt),
+                load_split(expected_dir, name, fmt=fmt),
+                check_exact=True,
+            )
+
+
+def test_split_output_rejects_repeated_formats() -> None:
+    with pytest.raises(ValidationError):
+        SplitOutputConfig(formats=["csv", "csv"])
+    with pytest.raises(ValidationError):
+        SplitOutputConfig(formats=[])
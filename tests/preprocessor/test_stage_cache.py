@@ -0,0 +1,167 @@
+"""Tests for the incremental preprocessing cache."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from k8s_ml_predictive_autoscaling.preprocessor import pipeline as pipeline_module
+from k8s_ml_predictive_autoscaling.preprocessor.cache import first_difference, merge_spans
+from k8s_ml_predictive_autoscaling.preprocessor.config import (
+    AnomalyConfig,
+    FeatureConfig,
+    PreprocessorConfig,
+    SlidingWindowConfig,
+)
+from k8s_ml_predictive_autoscaling.preprocessor.pipeline import PreprocessingPipeline
+
+METRICS = ["cpu_metrics", "request_rate"]
+OUTPUTS = ["train", "validation", "test", "sequences_train", "transform", "manifest"]
+
+
+SETTINGS = {
+    "metrics": METRICS,
+    "resample_rule": "1min",
+    "features": FeatureConfig(lags=[1, 4], rolling_windows=[3, 6]),
+    "anomaly": AnomalyConfig(method="rolling_mad", mode="clip", window=10),
+    "sliding_window": SlidingWindowConfig(
+        sequence_length=5, forecast_steps=[2], target_metric="request_rate"
+    ),
+}
+
+
+@pytest.fixture()
+def write_day(write_raw: Callable[..., Path]) -> Callable[..., Path]:
+    def write(day: int, *, periods: int = 180, seed: int | None = None) -> Path:
+        return write_raw(
+            METRICS,
+            periods=periods,
+            freq="20s",
+            start=f"2024-01-0{day}",
+            seed=day if seed is None else seed,
+            mean=10.0,
+            std=2.0,
+            name=f"metrics_2024010{day}.csv",
+        )
+
+    return write
+
+
+@pytest.fixture()
+def config(
+    tmp_path: Path, make_config: Callable[..., PreprocessorConfig]
+) -> Callable[..., PreprocessorConfig]:
+    def build(output: str, cache: bool, **overrides: object) -> PreprocessorConfig:
+        execution = {"workers": 1, "cache_dir": tmp_path / "cache" if cache else None}
+        return make_config(output, execution=execution, **{**SETTINGS, **overrides})
+
+    return build
+
+
+def _assert_matches_uncached(
+    config: Callable[..., PreprocessorConfig], outputs: dict[str, Path], **overrides: object
+) -> None:
+    expected = PreprocessingPipeline(config("expected", False, **overrides)).run()
+    for key in OUTPUTS:
+        assert outputs[key].read_bytes() == expected[key].read_bytes(), key
+
+
+@pytest.fixture()
+def counted_reads(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    reads: list[str] = []
+    original = pipeline_module.read_raw
+
+    def read_raw(paths: list[str], **kwargs: Any) -> pd.DataFrame:
+        reads.extend(Path(path).name for path in paths)
+        return original(paths, **kwargs)
+
+    monkeypatch.setattr(pipeline_module, "read_raw", read_raw)
+    return reads
+
+
+@pytest.mark.parametrize("change", ["append", "edit", "add", "remove"])
+def test_incremental_run_matches_full_run(
+    tmp_path: Path,
+    counted_reads: list[str],
+    write_day: Callable[..., Path],
+    config: Callable[..., PreprocessorConfig],
+    change: str,
+) -> None:
+    for day in (1, 2, 3):
+        write_day(day)
+    first = PreprocessingPipeline(config("processed", True)).run()
+    _assert_matches_uncached(config, first)
+    counted_reads.clear()
+
+    if change == "append":
+        write_day(3, periods=240)
+    elif change == "edit":
+        write_day(2, seed=42)
+    elif change == "add":
+        write_day(4)
+    else:
+        (tmp_path / "raw" / "metrics_20240101.csv").unlink()
+    cached = PreprocessingPipeline(config("processed", True)).run()
+
+    parsed = {
+        "append": ["metrics_20240103.csv"],
+        "edit": ["metrics_20240102.csv"],
+        "add": ["metrics_20240104.csv"],
+        "remove": [],
+    }
+    assert counted_reads == parsed[change]
+    _assert_matches_uncached(config, cached)
+    index = json.loads((tmp_path / "cache" / "index.json").read_text(encoding="utf-8"))
+    if change != "remove":
+        assert index["features"]["meta"]["start"] > 0
+
+
+def test_unchanged_inputs_reuse_every_stage(
+    tmp_path: Path,
+    counted_reads: list[str],
+    write_day: Callable[..., Path],
+    config: Callable[..., PreprocessorConfig],
+) -> None:
+    for day in (1, 2):
+        write_day(day)
+    PreprocessingPipeline(config("processed", True)).run()
+    assert sorted(counted_reads) == ["metrics_20240101.csv", "metrics_20240102.csv"]
+    counted_reads.clear()
+
+    # Touching a file without changing it is detected by its content hash.
+    (tmp_path / "raw" / "metrics_20240101.csv").touch()
+    outputs = PreprocessingPipeline(config("processed", True)).run()
+    assert counted_reads == []
+    _assert_matches_uncached(config, outputs)
+    counted_reads.clear()
+
+    features = FeatureConfig(lags=[2], rolling_windows=[5])
+    outputs = PreprocessingPipeline(config("processed", True, features=features)).run()
+    assert counted_reads == []
+    index = json.loads((tmp_path / "cache" / "index.json").read_text(encoding="utf-8"))
+    assert index["features"]["meta"]["start"] == 0
+    _assert_matches_uncached(config, outputs, features=features)
+
+    # Features are rebuilt in the new precision, then extended incrementally in it.
+    for day in (2, 3):
+        write_day(day, periods=240)
+        outputs = PreprocessingPipeline(config("processed", True, precision="float32")).run()
+        _assert_matches_uncached(config, outputs, precision="float32")
+    index = json.loads((tmp_path / "cache" / "index.json").read_text(encoding="utf-8"))
+    assert index["features"]["meta"]["start"] > 0
+
+
+def test_first_difference_compares_bits() -> None:
+    index = pd.date_range("2024-01-01", periods=4, freq="1min", tz="UTC")
+    frame = pd.DataFrame({"a": [1.0, np.nan, 0.0, 2.0]}, index=index)
+
+    assert first_difference(frame, frame.copy()) == 4
+    assert first_difference(frame, frame.iloc[:2]) == 2
+    assert first_difference(frame, frame.assign(a=[1.0, np.nan, -0.0, 2.0])) == 2
+    assert first_difference(frame, frame.rename(columns={"a": "b"})) == 0
+    assert merge_spans([(5, 7), (0, 2), (2, 3), (6, 9)]) == [(0, 3), (5, 9)]
@@ -0,0 +1,122 @@
+"""Tests for the raw sample storage writers."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from k8s_ml_predictive_autoscaling.raw_storage import (
+    CsvDaySink,
+    LabelEncoder,
+    ParquetDaySink,
+    SeriesBatch,
+    iter_raw,
+    open_sink,
+    read_raw,
+)
+
+
+def _batch(labels: str, *stamps: datetime) -> SeriesBatch:
+    return SeriesBatch(
+        metric="cpu",
+        promql="cpu_query",
+        labels=labels,
+        timestamps=np.array([int(stamp.timestamp() * 1000) for stamp in stamps], dtype=np.int64),
+        values=np.arange(len(stamps), dtype=np.float64),
+    )
+
+
+def test_csv_day_sink_splits_batches_per_day(tmp_path: Path) -> None:
+    sink = CsvDaySink(tmp_path, "cpu_metrics")
+    sink.write(
+        _batch(
+            "{}",
+            datetime(2024, 1, 1, 23, 59, tzinfo=UTC),
+            datetime(2024, 1, 2, 0, 1, tzinfo=UTC),
+        )
+    )
+    sink.write(_batch("{}", datetime(2024, 1, 2, 0, 2, tzinfo=UTC)))
+
+    written = sink.close()
+
+    assert [path.name for path in written] == [
+        "cpu_metrics_20240101.csv",
+        "cpu_metrics_20240102.csv",
+    ]
+    second_day = written[1].read_text(encoding="utf-8").splitlines()
+    assert second_day[0] == "timestamp,metric,promql,value,labels"
+    assert len(second_day) == 3
+
+
+def test_csv_day_sink_appends_when_day_is_revisited(tmp_path: Path) -> None:
+    sink = CsvDaySink(tmp_path, "cpu_metrics")
+    sink.write(_batch("{}", datetime(2024, 1, 1, 12, tzinfo=UTC)))
+    sink.write(_batch("{}", datetime(2024, 1, 2, 12, tzinfo=UTC)))
+    sink.write(_batch("{}", datetime(2024, 1, 1, 13, tzinfo=UTC)))
+
+    written = sink.close()
+
+    first_day = written[0].read_text(encoding="utf-8").splitlines()
+    assert len(first_day) == 3
+    assert first_day.count("timestamp,metric,promql,value,labels") == 1
+
+
+def test_label_encoder_reuses_encoded_strings() -> None:
+    encoder = LabelEncoder()
+
+    first = encoder.encode({"pod": "demo", "job": "api"})
+    second = encoder.encode({"job": "api", "pod": "demo"})
+
+    assert first is second
+    assert first == '{"job": "api", "pod": "demo"}'
+
+
+def test_parquet_round_trip_pushes_metric_filter(tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    for metric in ("cpu", "memory"):
+        sink = ParquetDaySink(tmp_path, metric, row_group_size=2)
+        batch = _batch(
+            '{"pod": "demo"}',
+            datetime(2024, 1, 1, 23, 58, tzinfo=UTC),
+            datetime(2024, 1, 1, 23, 59, tzinfo=UTC),
+            datetime(2024, 1, 2, 0, 0, tzinfo=UTC),
+        )
+        batch.metric = metric
+        sink.write(batch)
+        sink.close()
+
+    paths = sorted(str(path) for path in tmp_path.glob("metric=*/day=*/*.parquet"))
+    frame = read_raw(paths, storage_format="parquet", metrics=["cpu"])
+
+    assert len(paths) == 4
+    assert frame["metric"].unique().tolist() == ["cpu"]
+    assert frame["timestamp"].dt.tz is not None
+    assert frame["timestamp"].tolist()[0] == pd.Timestamp("2024-01-01 23:58", tz="UTC")
+    assert frame["value"].tolist() == [0.0, 1.0, 2.0]
+
+
+@pytest.mark.parametrize("storage_format", ["csv", "parquet"])
+def test_iter_raw_chunks_concatenate_to_read_raw(tmp_path: Path, storage_format: str) -> None:
+    if storage_format == "parquet":
+        pytest.importorskip("pyarrow")
+    stamps = [datetime(2024, 1, 1, 23, minute, tzinfo=UTC) for minute in range(50, 60)]
+    for metric in ("cpu", "memory"):
+        batch = _batch('{"pod": "demo"}', *stamps)
+        batch.metric = metric
+        sink = open_sink(storage_format, tmp_path, metric=metric, prefix=metric)
+        sink.write(batch)
+        sink.close()
+    pattern = "metric=*/day=*/*.parquet" if storage_format == "parquet" else "*.csv"
+    paths = sorted(str(path) for path in tmp_path.glob(pattern))
+
+    chunks = list(iter_raw(paths, storage_format=storage_format, metrics=["cpu"], chunk_rows=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True),
+        read_raw(paths, storage_format=storage_format, metrics=["cpu"]),
+    )